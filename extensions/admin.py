@@ -1,5 +1,5 @@
 from sqlite3 import DatabaseError
-import discord
+import discord, os
 from discord.ext.commands import Cog as _Cog
 
 from joe import DeveloperJoe
@@ -9,7 +9,9 @@ from sources import (
     database,
     confighandler,
     errors,
-    models
+    models,
+    ttsmodels,
+    history
 )
 from sources.common import (
     commands_utils,
@@ -38,22 +40,76 @@ class Administration(_Cog):
     @discord.app_commands.checks.has_permissions(administrator=True)
     async def backup_database(self, interaction: discord.Interaction):
         if await self.client.is_owner(interaction.user):
-            with database.DGDatabaseSession() as new_database:
-                location = new_database.backup_database()
-                return await interaction.response.send_message(f'Backed up database to "{location}"')
+            await interaction.response.defer(thinking=True)
+            location = await database.backup_async()
+            return await interaction.followup.send(f'Backed up database to "{location}"')
         raise exceptions.DGException(errors.GenericErrors.USER_MISSING_PERMISSIONS)
     
-    @owner_group.command(name="load", description="Loads backup made with /backup")
+    @owner_group.command(name="load", description="Loads the newest backup made with /backup")
     @discord.app_commands.checks.has_permissions(administrator=True)
     async def load_database(self, interaction: discord.Interaction):
         if await self.client.is_owner(interaction.user):
-            with database.DGDatabaseSession(reset_if_failed_check=False) as old_database:
-                try:
-                    location = old_database.load_database_backup()
-                    return await interaction.response.send_message(f'Loaded backup from "{location}"')
-                except DatabaseError:
-                    return await interaction.response.send_message(f'You cannot load this backup as it is too old. The backup has been kept.')
+            def _load() -> str:
+                with database.DGDatabaseSession(reset_if_failed_check=False) as old_database:
+                    return old_database.load_database_backup()
                 
+            await interaction.response.defer(thinking=True)
+            try:
+                location = await database.run_async(_load, transaction=False)
+                confighandler.guild_config_cache.invalidate()
+                modelhandler.permission_index.invalidate()
+                return await interaction.followup.send(f'Loaded backup from "{location}"')
+            except DatabaseError as error:
+                return await interaction.followup.send(f'You cannot load this backup. {error.args[0]} The backup has been kept.')
+                
+        raise exceptions.DGException(errors.GenericErrors.USER_MISSING_PERMISSIONS)
+
+    @owner_group.command(name="compress-history", description="Compresses saved chats that were saved before compression, then shrinks the database file.")
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def compress_history(self, interaction: discord.Interaction):
+        if await self.client.is_owner(interaction.user):
+            await interaction.response.defer(thinking=True)
+
+            def _compress_batch(after: tuple[str, int]) -> tuple[int, tuple[str, int] | None]:
+                with history.DGHistorySession() as history_session:
+                    return history_session.compress_chat_entries(after)
+
+            def _vacuum() -> None:
+                with database.DGDatabaseSession() as vacuum_database:
+                    vacuum_database.database.execute("VACUUM")
+
+            size_before, compressed, position = os.path.getsize(developerconfig.DATABASE_FILE), 0, ("", -1)
+            while position != None: # One transaction per batch, so other database calls are not held up for the whole migration.
+                converted, position = await database.run_async(_compress_batch, position)
+                compressed += converted
+
+            await database.run_async(_vacuum, transaction=False)
+            return await interaction.followup.send(f"Compressed {compressed} saved turns. The database file went from {size_before / 1048576:.1f} MiB to {os.path.getsize(developerconfig.DATABASE_FILE) / 1048576:.1f} MiB.")
+        raise exceptions.DGException(errors.GenericErrors.USER_MISSING_PERMISSIONS)
+
+    @owner_group.command(name="reload-config", description="Reloads the bot configuration file without restarting.")
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def reload_config(self, interaction: discord.Interaction):
+        if await self.client.is_owner(interaction.user):
+            confighandler.reload_config()
+            return await interaction.response.send_message(f'Reloaded "{developerconfig.CONFIG_FILE}" and "{developerconfig.TOKEN_FILE}".')
+        raise exceptions.DGException(errors.GenericErrors.USER_MISSING_PERMISSIONS)
+
+    @owner_group.command(name="cache-stats", description="Shows how well the bots in-memory caches are performing.")
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def cache_stats(self, interaction: discord.Interaction):
+        if await self.client.is_owner(interaction.user):
+            guild_cache = confighandler.guild_config_cache
+            embed = self.client.get_embed("Cache Statistics")
+            embed.add_field(name="Guild Configurations", value=f"Cached: {len(guild_cache)} / {guild_cache.max_size}\nHits: {guild_cache.hits}\nMisses: {guild_cache.misses}\nHit Ratio: {guild_cache.hit_ratio:.1%}", inline=False)
+            
+            tts_cache = ttsmodels.tts_cache
+            embed.add_field(name="Text-to-Speech Audio", value=f"Cached: {len(tts_cache)} clips ({tts_cache.total_bytes / 1048576:.1f} / {tts_cache.max_bytes / 1048576:.0f} MiB)\nHits: {tts_cache.hits}\nMisses: {tts_cache.misses}\nHit Ratio: {tts_cache.hit_ratio:.1%}\nBytes Saved: {tts_cache.bytes_saved / 1048576:.1f} MiB", inline=False)
+            
+            if tts_stages := ttsmodels.tts_timings.as_dict():
+                embed.add_field(name="Text-to-Speech Stages", value="\n".join(f"{stage.capitalize()}: {average * 1000:.0f}ms average ({count} runs)" for stage, (count, average) in tts_stages.items()), inline=False)
+            
+            return await interaction.response.send_message(embed=embed)
         raise exceptions.DGException(errors.GenericErrors.USER_MISSING_PERMISSIONS)
 
     @admin_group.command(name="lock", description="Locks a select AI Model behind a role or permission.")
@@ -63,13 +119,16 @@ class Administration(_Cog):
     @discord.app_commands.check(commands_utils.in_correct_channel)
     async def lock_role(self, interaction: discord.Interaction, ai_model: str, role: discord.Role):
         
-        if confighandler.GuildConfigAttributes.get_guild_model(role.guild).model == ai_model:
+        if (await confighandler.GuildConfigAttributes.get_guild_model_async(role.guild)).model == ai_model:
             return await interaction.response.send_message("You cannot lock this model as it currently is the this servers default AI model. You may change the default with `/admin default-model`")
         
-        with modelhandler.DGGuildDatabaseModelHandler(role.guild) as rules:
-            _gpt_model = commands_utils.get_modeltype_from_name(ai_model)
-            rules.upload_guild_model(_gpt_model, role)
-            await interaction.response.send_message(f"Added {ai_model} behind role {role.mention}.")
+        def _lock_model():
+            with modelhandler.DGGuildDatabaseModelHandler(role.guild) as rules:
+                _gpt_model = commands_utils.get_modeltype_from_name(ai_model)
+                rules.upload_guild_model(_gpt_model, role)
+            
+        await database.run_async(_lock_model)
+        await interaction.response.send_message(f"Added {ai_model} behind role {role.mention}.")
 
     @admin_group.command(name="unlock", description="Unlocks a previously locked AI Model.")
     @discord.app_commands.checks.has_permissions(manage_channels=True)
@@ -77,11 +136,13 @@ class Administration(_Cog):
     @discord.app_commands.describe(ai_model="The AI model you want to unlock.", role="The role that will be removed from the specified model's list of allowed roles.")
     @discord.app_commands.check(commands_utils.in_correct_channel)
     async def unlock_role(self, interaction: discord.Interaction, ai_model: str, role: discord.Role):
-        with modelhandler.DGGuildDatabaseModelHandler(role.guild) as rules:
-            model = commands_utils.get_modeltype_from_name(ai_model)
+        def _unlock_model():
+            with modelhandler.DGGuildDatabaseModelHandler(role.guild) as rules:
+                model = commands_utils.get_modeltype_from_name(ai_model)
+                rules.remove_guild_model(model, role)
             
-            rules.remove_guild_model(model, role)
-            await interaction.response.send_message(f"Removed requirement role {role.mention} from {ai_model}.")
+        await database.run_async(_unlock_model)
+        await interaction.response.send_message(f"Removed requirement role {role.mention} from {ai_model}.")
 
     @admin_group.command(name="locks", description="View all models and which roles may utilise them.")
     @discord.app_commands.checks.has_permissions(manage_channels=True)
@@ -93,22 +154,25 @@ class Administration(_Cog):
                 role = guild.get_role(role_id)
                 return role.mention if role else "Deleted role."
             
-            with modelhandler.DGGuildDatabaseModelHandler(guild) as rules:
-                models = rules.get_guild_models()
-                no_roles = "No added roles. \n\n"
+            def _get_guild_models() -> dict[str, list[int]]:
+                with modelhandler.DGGuildDatabaseModelHandler(guild) as rules:
+                    return rules.get_guild_models()
+                
+            models = await database.run_async(_get_guild_models)
+            no_roles = "No added roles. \n\n"
 
-                model_texts = []
+            model_texts = []
+            
+            for model_code_name, model_roles in models.items():
+                model = commands_utils.get_modeltype_from_name(model_code_name)
+                
+                roles_joint = '\n'.join([_get_valid_role_mention(r_id) for r_id in model_roles])
+                model_text = f"\n{model.display_name}\n{no_roles if not roles_joint else roles_joint}"
+                model_texts.append(model_text)
                 
-                for model_code_name, model_roles in models.items():
-                    model = commands_utils.get_modeltype_from_name(model_code_name)
-                    
-                    roles_joint = '\n'.join([_get_valid_role_mention(r_id) for r_id in model_roles])
-                    model_text = f"\n{model.display_name}\n{no_roles if not roles_joint else roles_joint}"
-                    model_texts.append(model_text)
-                    
-                text = '\n'.join(model_texts) if models else no_roles
-
-                await interaction.response.send_message(text)
+            text = '\n'.join(model_texts) if models else no_roles
+
+            await interaction.response.send_message(text)
     
     @admin_group.command(name="default-model", description="Changes the default model that will be used in certain circumstances.")
     @discord.app_commands.checks.has_permissions(administrator=True)
@@ -116,15 +180,15 @@ class Administration(_Cog):
     @discord.app_commands.choices(ai_model=models.MODEL_CHOICES)
     async def change_default_model_for_server(self, interaction: discord.Interaction, ai_model: str | None=None):
         member = commands_utils.assure_class_is_value(interaction.user, discord.Member)
-        model_object: models.AIModel = commands_utils.get_modeltype_from_name(ai_model if isinstance(ai_model, str) else confighandler.get_guild_config_attribute(member.guild, 'default-ai-model'))(member)
+        model_object: models.AIModel = commands_utils.get_modeltype_from_name(ai_model if isinstance(ai_model, str) else await confighandler.get_guild_config_attribute_async(member.guild, 'default-ai-model'))(member)
         
         if ai_model == None: # Check if user checking what model
             return await interaction.response.send_message(f"Current default AI Model is {model_object.display_name}. {model_object.description}")
         
-        if model_object.get_lock_list() != []: # Make sure it is accessible (Not in lock list)
+        if await model_object.get_lock_list_async() != []: # Make sure it is accessible (Not in lock list)
             return await interaction.response.send_message(f"Cannot set {model_object.display_name} to the default model as it roles attached to it in the lock list. Undo with `/admin unlock`.")
         
-        confighandler.edit_guild_config(member.guild, "default-ai-model", ai_model)
+        await confighandler.edit_guild_config_async(member.guild, "default-ai-model", ai_model)
         await interaction.response.send_message(f"Changed default AI Model to {model_object.display_name}.")
 
     @admin_group.command(name="set-timezone", description="Changes the bots timezone in this server.")
@@ -133,9 +197,9 @@ class Administration(_Cog):
     async def change_tz(self, interaction: discord.Interaction, timezone: str | None=None):
         if guild := commands_utils.assure_class_is_value(interaction.guild, discord.Guild):
             if timezone == None:
-                return await interaction.response.send_message(f"Current timezone is {confighandler.get_guild_config_attribute(guild, 'timezone')}")
+                return await interaction.response.send_message(f"Current timezone is {await confighandler.get_guild_config_attribute_async(guild, 'timezone')}")
             elif timezone in self.client.__tzs__:
-                confighandler.edit_guild_config(guild, "timezone", timezone)
+                await confighandler.edit_guild_config_async(guild, "timezone", timezone)
                 return await interaction.response.send_message(f"Changed bots timezone to {timezone}.")
             await interaction.response.send_message(f"Unknown timezone: {timezone}")\
     
@@ -145,8 +209,8 @@ class Administration(_Cog):
     async def config_voice(self, interaction: discord.Interaction, allow_voice: bool | None=None):
         if guild := commands_utils.assure_class_is_value(interaction.guild, discord.Guild):
             if allow_voice == None:
-                return await interaction.response.send_message(f"Users {'cannot' if confighandler.get_guild_config_attribute(guild, 'voice-enabled') == False else 'can'} use voice.")
-            confighandler.edit_guild_config(guild, "voice-enabled", allow_voice)
+                return await interaction.response.send_message(f"Users {'cannot' if await confighandler.get_guild_config_attribute_async(guild, 'voice-enabled') == False else 'can'} use voice.")
+            await confighandler.edit_guild_config_async(guild, "voice-enabled", allow_voice)
             return await interaction.response.send_message(f"Users {'cannot' if allow_voice == False else 'can'} use voice.")
     
     @admin_group.command(name="reset", description=f"Reset this servers configuration back to default.")
@@ -159,7 +223,7 @@ class Administration(_Cog):
             if not confirm or confirm.content != developerconfig.QUERY_CONFIRMATION:
                 return await interaction.followup.send("Cancelled action.", ephemeral=False)
                 
-            confighandler.reset_guild_config(guild)
+            await confighandler.reset_guild_config_async(guild)
             return await interaction.followup.send("The servers configuration options have been reset. You may view them with /config or /server.")
     
     @admin_group.command(name="config", description="View this discord servers configuration.")
@@ -167,7 +231,7 @@ class Administration(_Cog):
     async def guild_config(self, interaction: discord.Interaction):
         if guild := commands_utils.assure_class_is_value(interaction.guild, discord.Guild):
             
-            _config = confighandler.get_guild_config(guild)
+            _config = await confighandler.get_guild_config_async(guild)
             embed = self.client.get_embed(f"{guild} Configuration Settings")
             
             for c_entry in _config.raw_config_data.items():
@@ -46,7 +46,7 @@ class Communication(commands.Cog):
         chats = self.client.get_all_user_conversations(member)
         name = chat_name if chat_name else f"{member.name}-{len(chats) if isinstance(chats, dict) else '0'}"
         chat_thread: discord.Thread | None = None
-        model = ai_model if isinstance(ai_model, str) else confighandler.GuildConfigAttributes.get_guild_model(member.guild)
+        model = ai_model if isinstance(ai_model, str) else await confighandler.GuildConfigAttributes.get_guild_model_async(member.guild)
         
         # Error Checking
         
@@ -80,7 +80,7 @@ class Communication(commands.Cog):
             convo = chat.DGTextChat(*chat_args)
         elif speak_reply and self.client.is_voice_compatible == False:
             raise exceptions.VoiceError(errors.VoiceConversationErrors.NO_VOICE)
-        elif speak_reply and interaction.guild and confighandler.get_guild_config_attribute(interaction.guild, "voice-enabled") == False:
+        elif speak_reply and interaction.guild and await confighandler.get_guild_config_attribute_async(interaction.guild, "voice-enabled") == False:
             raise exceptions.VoiceError(errors.VoiceConversationErrors.VOICE_IS_LOCKED)
         elif speak_reply and self.client.is_voice_compatible:
             convo = chat.DGVoiceChat(*chat_args, voice=member.voice.channel if member.voice else None)
@@ -179,6 +179,7 @@ class Communication(commands.Cog):
             {"name": "Chat History ID", "value": str(convo.hid), "inline": False},
             {"name": "Chat ID", "value": str(convo.display_name), "inline": False},
             {"name": "AI Model", "value": str(convo.model.display_name), "inline": False},
+            {"name": "Context Tokens", "value": f"{convo.model.context_token_count} / {convo.model.context_token_budget}{'' if models.tiktoken else ' (Estimated)'}", "inline": False},
             {"name": "Is Voice", "value": commands_utils.true_to_yes(isinstance(convo, chat.DGVoiceChat)), "inline": False},
             {"name": "Is Streaming", "value": commands_utils.true_to_yes(convo.stream), "inline": False},
             {"name": "Image Generation", "value": commands_utils.true_to_yes(convo.model.can_generate_images), "inline": False},
@@ -215,7 +216,7 @@ class Communication(commands.Cog):
     @discord.app_commands.choices(ai_model=models.MODEL_CHOICES)
     async def inquire_once(self, interaction: discord.Interaction, query: str, ai_model: str | None):
         member = commands_utils.assure_class_is_value(interaction.user, discord.Member)
-        model_string = ai_model if isinstance(ai_model, str) else confighandler.get_guild_config_attribute(member.guild, "default-ai-model")
+        model_string = ai_model if isinstance(ai_model, str) else await confighandler.get_guild_config_attribute_async(member.guild, "default-ai-model")
         actual_model = commands_utils.get_modeltype_from_name(model_string)
         
         async with actual_model(member) as model:
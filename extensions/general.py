@@ -66,10 +66,10 @@ class General(_Cog):
             {"name": f"{guild.name} Server ID :wrench:", "value": str(guild.id), **default_embed_fields},
             {"name": f"{guild.name} Owner :gun:", "value": str(guild.owner), **default_embed_fields},
             {"name": f"{guild.name} Prefered Language :om_symbol:", "value": str(guild.preferred_locale), **default_embed_fields},
-            {"name": f"{guild.name} Default AI Model :robot:", "value": confighandler.GuildConfigAttributes.get_guild_model(guild).display_name, **default_embed_fields},
-            {"name": f"{guild.name} Voice Enabled :question:", "value": confighandler.GuildConfigAttributes.get_voice_status(guild), **default_embed_fields},
-            {"name": f"{guild.name} Voice Volume :speaker:", "value": str(confighandler.GuildConfigAttributes.get_voice_volume(guild)), **default_embed_fields},
-            {"name": f"{guild.name} Voice Speed :speaking_head:", "value": str(confighandler.GuildConfigAttributes.get_voice_speed(guild)), **default_embed_fields}
+            {"name": f"{guild.name} Default AI Model :robot:", "value": (await confighandler.GuildConfigAttributes.get_guild_model_async(guild)).display_name, **default_embed_fields},
+            {"name": f"{guild.name} Voice Enabled :question:", "value": await confighandler.GuildConfigAttributes.get_voice_status_async(guild), **default_embed_fields},
+            {"name": f"{guild.name} Voice Volume :speaker:", "value": str(await confighandler.GuildConfigAttributes.get_voice_volume_async(guild)), **default_embed_fields},
+            {"name": f"{guild.name} Voice Speed :speaking_head:", "value": str(await confighandler.GuildConfigAttributes.get_voice_speed_async(guild)), **default_embed_fields}
         ]
         embed.set_thumbnail(url=getattr(guild.icon, "url", developerconfig.DEVELOPERJOE_THUMBNAIL_URL))
         embed._fields = embed_fields
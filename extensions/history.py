@@ -1,6 +1,6 @@
-import discord, datetime, io, asyncio
+import discord, datetime, io, asyncio, math
 
-from typing import Any
+from typing import Iterable
 from discord.ext import commands
 from joe import DeveloperJoe
 
@@ -8,43 +8,102 @@ from sources import (
     history, 
     exceptions, 
     errors,
-    confighandler
+    confighandler,
+    database
 )
 from sources.common import (
     commands_utils,
     developerconfig
 )
 
+class HistoryListView(discord.ui.View):
+    """Pages through a users saved chats with buttons. Only the user who used the command can press them."""
+    
+    def __init__(self, user_id: int, total: int):
+        super().__init__()
+        self.user_id = user_id
+        self.total = total
+        self._page_starts: list[int] = [0] # Where each page up to the current one starts. Popped when going back.
+        self._next_start: int | None = None
+    
+    async def get_page(self) -> str:
+        def _retrieve_page() -> tuple[list[history.DGHistoryChat], int | None]:
+            with history.DGHistorySession() as history_session:
+                return history_session.retrieve_user_histories_page(str(self.user_id), self._page_starts[-1])
+            
+        histories, self._next_start = await database.run_async(_retrieve_page)
+        self.previous_page.disabled = len(self._page_starts) == 1
+        self.next_page.disabled = self._next_start == None
+        
+        listing = '\n\n'.join([commands_utils.true_to_yes(f"- {long_history.name}\nIs Private? **{bool(int(long_history.private))}**\nID: `{long_history.history_id}`") for long_history in histories])
+        return f"{listing}\n\nPage {len(self._page_starts)} of {max(math.ceil(self.total / developerconfig.HISTORY_LIST_PAGE_SIZE), 1)} ({self.total} saved chats)"
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user_id
+    
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self._page_starts.pop()
+        await interaction.response.edit_message(content=await self.get_page(), view=self)
+    
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._next_start != None:
+            self._page_starts.append(self._next_start)
+        await interaction.response.edit_message(content=await self.get_page(), view=self)
+
 class History(commands.Cog):
     def __init__(self, _client: DeveloperJoe):
         self.client = _client
         print(f"{self.__cog_name__} Loaded")
+    
+    history_group = discord.app_commands.Group(name="history", description="Commands for finding and reading past saved conversations.")
+
+    def format_entry(self, entry: list, username: str, model: str) -> str:
+        if 'content' in entry[0]:
+            return f"{username}: {entry[0]['content']}\n{model}: {entry[1]['content']}\n\n{'~' * 15}\n\n"
+        elif 'image' in entry[0]:
+            return f"{entry[0]['image']}\n{entry[1]['image_return']}\n\n{'~' * 15}\n\n"   
+        elif 'reader_content' in entry[0]:
+            urls = '\n'.join([f"Image {i + 1}: {url}" for i, url in enumerate(entry[0]["image_urls"])])
+            return f"{username}: {entry[0]['reader_content']}\n\n{urls}\n\n{model}: {entry[1]['reply']}\n\n{'~' * 15}\n\n"
+        return "Unknown data.\n\n"
+    
+    def write_transcript(self, entries: Iterable[list], username: str, model: str) -> io.BytesIO:
+        """Writes a readable transcript one turn at a time, so the transcript is never built as one string.
 
-    def format(self, data: list, username: str, model: str) -> str:
-        final = ""
+        Args:
+            entries (Iterable[list]): The turns of the chat. (Such as `DGHistorySession.iter_chat_entries`)
+            username (str): The name of the user who made the chat.
+            model (str): The name of the AI model.
+
+        Returns:
+            io.BytesIO: The transcript, encoded in UTF-8.
+        """
+        transcript = io.BytesIO()
         
-        for entry in data:
-            if 'content' in entry[0]:
-                final += f"{username}: {entry[0]['content']}\n{model}: {entry[1]['content']}\n\n{'~' * 15}\n\n"
-            elif 'image' in entry[0]:
-                final += f"{entry[0]['image']}\n{entry[1]['image_return']}\n\n{'~' * 15}\n\n"   
-            elif 'reader_content' in entry[0]:
-                urls = '\n'.join([f"Image {i + 1}: {url}" for i, url in enumerate(entry[0]["image_urls"])])
-                final += f"{username}: {entry[0]['reader_content']}\n\n{urls}\n\n{model}: {entry[1]['reply']}\n\n{'~' * 15}\n\n"
-            else:
-                final += "Unknown data.\n\n"
-                
-        return final
+        for entry in entries:
+            transcript.write(self.format_entry(entry, username, model).encode())
+            
+        if not transcript.tell():
+            transcript.write(errors.HistoryErrors.HISTORY_EMPTY.encode())
+            
+        transcript.seek(0)
+        return transcript
 
     @discord.app_commands.command(name="delete", description="Delete a past saved conversation.")
     async def delete_chat_history(self, interaction: discord.Interaction, history_id: str):
         try:
             await interaction.response.defer(thinking=False, ephemeral=True)
-            with history.DGHistorySession() as history_session:
-                reply = await self.client.get_input(interaction, f'Are you sure? \n(Send reply within {developerconfig.QUERY_TIMEOUT} seconds, \nand "{developerconfig.QUERY_CONFIRMATION}" to confirm, anything else to cancel.)')
-                if reply and reply.content == developerconfig.QUERY_CONFIRMATION:
-                    return await interaction.followup.send(history_session.delete_chat_history(history_id))
-                return await interaction.followup.send("Cancelled action.")
+            
+            def _delete_history() -> str:
+                with history.DGHistorySession() as history_session:
+                    return history_session.delete_chat_history(history_id)
+                
+            reply = await self.client.get_input(interaction, f'Are you sure? \n(Send reply within {developerconfig.QUERY_TIMEOUT} seconds, \nand "{developerconfig.QUERY_CONFIRMATION}" to confirm, anything else to cancel.)')
+            if reply and reply.content == developerconfig.QUERY_CONFIRMATION:
+                return await interaction.followup.send(await database.run_async(_delete_history))
+            return await interaction.followup.send("Cancelled action.")
 
         except ValueError:
             raise exceptions.HistoryError(errors.HistoryErrors.INVALID_HISTORY_ID)
@@ -57,39 +116,66 @@ class History(commands.Cog):
 
         member: discord.Member = commands_utils.assure_class_is_value(interaction.user, discord.Member)
         convo = self.client.manage_defaults(member, name)
-        formatted_history_string = (self.format(convo.context._display_context, convo.member.display_name, convo.model.display_name) if convo.context._display_context else errors.HistoryErrors.HISTORY_EMPTY) if export_format in [None, "u"] else str(convo.model.fetch_raw())
-        
-        file_like = io.BytesIO(formatted_history_string.encode())
+        file_like = self.write_transcript(convo.context._display_context, convo.member.display_name, convo.model.display_name) if export_format in [None, "u"] else io.BytesIO(str(convo.model.fetch_raw()).encode())
         file_like.name = f"{convo.display_name}-{datetime.datetime.now()}-transcript.txt"
 
         await interaction.user.send(f"{convo.member.name}'s {confighandler.get_config('bot_name')} Transcript ({convo.display_name})", file=discord.File(file_like))
         await interaction.response.send_message("I have sent the conversation transcript to our direct messages.")
             
-    @discord.app_commands.command(name="history", description="Get a past saved conversation.")
+    @history_group.command(name="view", description="Get a past saved conversation.")
     async def get_chat_history(self, interaction: discord.Interaction, history_id: str):
         try:
-            with history.DGHistorySession() as history_session:
-                if history_chat := history_session.retrieve_chat_history(history_id):
-                    if history_chat.private == False or interaction.user.id == history_chat.user:
-                        list_history: Any = history_chat.data
-                        history_user = self.client.get_user(history_chat.user)
-                        formatted = self.format(data=list_history, username=history_user.display_name if history_user else "Deleted User", model="AI") if list_history else errors.HistoryErrors.HISTORY_EMPTY
-
-                        history_file = io.BytesIO(formatted.encode())
-                        history_file.name = f"{history_chat.name}-transcript.txt"
+            def _retrieve_history() -> history.DGHistoryChat | None:
+                with history.DGHistorySession() as history_session:
+                    return history_session.retrieve_chat_history(history_id)
+                
+            if history_chat := await database.run_async(_retrieve_history):
+                if history_chat.private == False or interaction.user.id == history_chat.user:
+                    history_user = self.client.get_user(history_chat.user)
+                    
+                    def _write_history_transcript() -> io.BytesIO:
+                        with history.DGHistorySession() as history_session:
+                            return self.write_transcript(history_session.iter_chat_entries(history_chat.history_id), username=history_user.display_name if history_user else "Deleted User", model="AI")
+                        
+                    history_file = await database.run_async(_write_history_transcript)
+                    history_file.name = f"{history_chat.name}-transcript.txt"
 
-                        await interaction.user.send(file=discord.File(history_file))
-                        return await interaction.response.send_message("I have sent the history transcript to our direct messages.")
-                raise exceptions.HistoryError(errors.HistoryErrors.HISTORY_DOESNT_EXIST)
+                    await interaction.user.send(file=discord.File(history_file))
+                    return await interaction.response.send_message("I have sent the history transcript to our direct messages.")
+            raise exceptions.HistoryError(errors.HistoryErrors.HISTORY_DOESNT_EXIST)
         except ValueError:
             raise exceptions.HistoryError(errors.HistoryErrors.INVALID_HISTORY_ID)
     
+    @history_group.command(name="search", description="Search past saved conversations for words.")
+    @discord.app_commands.describe(query="The words to search for.", page="The page of results. Defaults to the first page.")
+    async def search_chat_histories(self, interaction: discord.Interaction, query: str, page: discord.app_commands.Range[int, 1]=1):
+        def _search_histories() -> list[tuple[history.DGHistoryChat, str]]:
+            with history.DGHistorySession() as history_session:
+                return history_session.search_chat_histories(query, interaction.user.id, page)
+        
+        results = await database.run_async(_search_histories)
+        if not results:
+            return await interaction.response.send_message("No saved chats matched your search." if page == 1 else f"There are no results on page {page}.")
+        
+        embed = self.client.get_embed(f'Results for "{query[:100]}" (Page {page})')
+        for found_history, snippet in results:
+            embed.add_field(name=found_history.name, value=f"{snippet[:900]}\nID: `{found_history.history_id}`", inline=False)
+        
+        if len(results) == developerconfig.HISTORY_SEARCH_PAGE_SIZE:
+            embed.description = f"Use page {page + 1} to see more results."
+        await interaction.response.send_message(embed=embed)
+    
     @discord.app_commands.command(name="histories", description="Lists all histories a user has.")
     async def fetch_user_history(self, interaction: discord.Interaction):
-        with history.DGHistorySession() as history_session:
-            histories = history_session.retrieve_user_histories(str(interaction.user.id))
-            reply_string = "No saved chats." if bool(histories) == False else '\n\n'.join([commands_utils.true_to_yes(f"- {long_history.name}\nIs Private? **{bool(int(long_history.private))}**\nID: `{long_history.history_id}`") for long_history in histories])
-            await interaction.response.send_message(reply_string)
+        def _count_histories() -> int:
+            with history.DGHistorySession() as history_session:
+                return history_session.count_user_histories(str(interaction.user.id))
+            
+        if not (total := await database.run_async(_count_histories)):
+            return await interaction.response.send_message("No saved chats.")
+        
+        history_view = HistoryListView(interaction.user.id, total)
+        await interaction.response.send_message(await history_view.get_page(), view=history_view)
         
 async def setup(client):
     await client.add_cog(History(client))
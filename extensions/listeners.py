@@ -13,6 +13,7 @@ from sources import (
     database,
     confighandler,
     models,
+    modelhandler,
     errors
 )
 
@@ -54,7 +55,7 @@ class Listeners(commands.Cog):
         convo = None
         try:
             async def respond_to_mention(member: discord.Member):
-                model: Type[models.AIModel] = commands_utils.get_modeltype_from_name(confighandler.get_guild_config_attribute(member.guild, "default-ai-model"))
+                model: Type[models.AIModel] = commands_utils.get_modeltype_from_name(await confighandler.get_guild_config_attribute_async(member.guild, "default-ai-model"))
                 lowered_text = message.clean_content.lower().split(" ")
                 command = lowered_text[1]
                 text_content = ' '.join(lowered_text[2:])
@@ -153,9 +154,30 @@ class Listeners(commands.Cog):
             #[await owner.send(self.client.ADMIN_TEXT[.CHARACTER_LIMIT * t:]) for t in range(ceil(len(self.client.ADMIN_TEXT) / .CHARACTER_LIMIT))]
             await owner.send(file=commands_utils.to_file(self.client.ADMIN_TEXT, "admin-introduction.md"))
 
-        with database.DGDatabaseManager() as _guild_handler:
-            _guild_handler.add_guild_to_database(guild.id)
+        def _add_guild():
+            with database.DGDatabaseManager() as _guild_handler:
+                _guild_handler.add_guild_to_database(guild.id)
+                
+        await database.run_async(_add_guild)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        modelhandler.permission_index.invalidate(role.guild.id) # Creating a role shifts the position of the roles above it.
     
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Role positions may have changed, so the guilds model permission index is rebuilt on the next permission check.
+
+        Args:
+            before (discord.Role): The role before it was updated.
+            after (discord.Role): The updated role.
+        """
+        modelhandler.permission_index.invalidate(after.guild.id)
+        
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        modelhandler.permission_index.invalidate(role.guild.id)
+        
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         """This function listens to if a user has joined a voice channel. This is done to update a VoiceChat instance if the user has one. Read the given comments for more.
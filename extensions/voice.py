@@ -26,9 +26,9 @@ class Voice(Cog):
     async def set_speed(self, interaction: discord.Interaction, speed: float | None=None):
         if guild := commands_utils.assure_class_is_value(interaction.guild, discord.Guild):
             if speed == None:
-                await interaction.response.send_message(f"Voice speed is {confighandler.get_guild_config_attribute(guild, 'voice-speed')}")
+                await interaction.response.send_message(f"Voice speed is {await confighandler.get_guild_config_attribute_async(guild, 'voice-speed')}")
             elif not speed < 1.0 and speed < 4.0: # Arbituary limit on 4.0, if anything less than 1 it becomes glitchy if I remember correctly
-                confighandler.edit_guild_config(guild, "voice-speed", speed)
+                await confighandler.edit_guild_config_async(guild, "voice-speed", speed)
                 await interaction.response.send_message(f"Changed voice speed to {speed}.")
             else:
                 await interaction.response.send_message("You cannot set the bots speaking speed below 1.0 or more than 4.0.")
@@ -38,9 +38,9 @@ class Voice(Cog):
     async def set_volume(self, interaction: discord.Interaction, volume: float | None=None):
         if guild := commands_utils.assure_class_is_value(interaction.guild, discord.Guild):
             if volume != None:
-                confighandler.edit_guild_config(guild, "voice-volume", volume)
+                await confighandler.edit_guild_config_async(guild, "voice-volume", volume)
                 return await interaction.response.send_message(f"Changed voice volume to {volume}.")
-            await interaction.response.send_message(f"Voice volume is {confighandler.get_guild_config_attribute(guild, 'voice-volume')}.")
+            await interaction.response.send_message(f"Voice volume is {await confighandler.get_guild_config_attribute_async(guild, 'voice-volume')}.")
             
     @media_group.command(name="skip", description="If talking, this will stop me from talking. Unlike /media pause, this is not reversible.")
     async def shutup_reply(self, interaction: discord.Interaction):
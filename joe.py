@@ -92,8 +92,10 @@ class DeveloperJoe(commands.Bot):
         self.__tzs__ = pytz.all_timezones
         self.__tz__ = pytz.timezone(confighandler.get_config("timezone"))
         self.config = None
+        self.database_pool = database.connection_pool
+        self.chats = chat.DGChatRegistry() # Kept across reconnects, so live chats survive them.
         
-        self.statuses: dict[str, int | discord.ActivityType] = confighandler.get_config('status_scrolling_options')
+        self.statuses: dict[str, int | discord.ActivityType] = dict(confighandler.get_config('status_scrolling_options'))
         self.statuses[confighandler.get_config('status_text')] = confighandler.get_config('status_type')
         
         super().__init__(*args, **kwargs)
@@ -127,7 +129,7 @@ class DeveloperJoe(commands.Bot):
         Returns:
             Union[Union[DGTextChat, DGVoiceChat], None]: The chat, or None if chat_name is not specified.
         """
-        return self.chats[member.id][chat_name]
+        return self.chats.get_chat(member.id, chat_name)
     
     @decorators.user_exists
     def get_all_user_conversations(self, member: discord.Member) -> dict[str, chat.DGChatType]:
@@ -139,7 +141,7 @@ class DeveloperJoe(commands.Bot):
         Returns:
             Union[dict[str, DGChatType], None]: A dictionary containing the name of the chat as the key, and the chat instance as the value.
         """
-        return self.chats[member.id]
+        return self.chats.get_chats(member.id)
     
     @decorators.user_exists
     def get_all_user_voice_conversations(self, member: discord.Member) -> dict[str, chat.DGVoiceChat]:
@@ -153,7 +155,7 @@ class DeveloperJoe(commands.Bot):
         """
         return {chat_name: voice for chat_name, voice in self.get_all_user_conversations(member).items() if isinstance(voice, chat.DGVoiceChat)}
         
-    def get_user_has_permission(self, member: discord.Member, model: Type[models.AIModel]) -> bool:
+    async def get_user_has_permission(self, member: discord.Member, model: Type[models.AIModel]) -> bool:
         """Return if the user has permission to user a model
 
         Args:
@@ -164,8 +166,7 @@ class DeveloperJoe(commands.Bot):
             bool: True if the user has correct permissions, False if not.
         """
         if isinstance(member, discord.Member):
-            with modelhandler.DGGuildDatabaseModelHandler(member.guild) as check_rules:
-                return bool(check_rules.user_has_model_permissions(member.roles[-1], model))
+            return await modelhandler.user_has_model_permissions_async(member, model)
         else:
             raise TypeError("member must be discord.Member, not {}".format(member.__class__))
     
@@ -179,10 +180,7 @@ class DeveloperJoe(commands.Bot):
         Returns:
             Union[DGChatType, None]: The default chat, or None if the user doesn't have one.
         """
-        try:
-            return self.default_chats[f"{member.id}-latest"]
-        except KeyError:
-            return
+        return self.chats.get_default(member.id)
         
     @decorators.user_exists
     def get_default_voice_conversation(self, member: discord.Member) -> chat.DGVoiceChat | None:
@@ -226,16 +224,12 @@ class DeveloperJoe(commands.Bot):
             await convo.model.end()
             
         del convo
-        del self.chats[member.id][conversation_name]
-        del self.default_chats[f"{member.id}-latest"]
+        self.chats.remove_chat(member.id, conversation_name)
 
     async def delete_all_conversations(self, member: discord.Member) -> None:
         
-        for convo in self.get_all_user_conversations(member).values():
+        for convo in self.chats.clear_chats(member.id):
             await convo.model.end()
-            
-        self.chats[member.id].clear()
-        self.default_chats[f"{member.id}-latest"] = None
         
     @decorators.chat_not_exist
     def add_conversation(self, member: discord.Member | discord.User, name: str, conversation: chat.DGChatType) -> None:
@@ -246,7 +240,7 @@ class DeveloperJoe(commands.Bot):
             name (str): Name of the chat
             conversation (DGChatType): Instance of the conversation.
         """
-        self.chats[member.id][name] = conversation
+        self.chats.add_chat(member.id, name, conversation)
 
     @decorators.user_has_chat
     def set_default_conversation(self, member: discord.Member | discord.User, name: str) -> None:
@@ -256,7 +250,7 @@ class DeveloperJoe(commands.Bot):
             member (discord.Member): The member who's default chat will change.
             name (Union[None, str]): Name of the new chat.
         """
-        self.default_chats[f"{member.id}-latest"] = self.get_user_conversation(member, name)
+        self.chats.set_default(member.id, name)
     
     def reset_default_conversation(self, member: discord.Member):
         """Sets a users default chat no `None`.
@@ -264,7 +258,7 @@ class DeveloperJoe(commands.Bot):
         Args:
             member (discord.Member): The member who's default chat will be set.
         """
-        self.default_chats[f"{member.id}-lastest"] = None
+        self.chats.reset_default(member.id)
         
     @decorators.user_has_chat
     def manage_defaults(self, member: discord.Member, name: str | None=None) -> chat.DGChatType:
@@ -416,25 +410,22 @@ class DeveloperJoe(commands.Bot):
     
     async def close(self) -> Any:
         await super().close()
+        await models.GPTModel.close_openai_client()
+        await asyncio.to_thread(database.database_worker.stop)
+        self.database_pool.close_all()
         
     async def on_ready(self):
         
-        self.chats = {user.id: {} for user in self.users}
-        self.default_chats: dict[str, chat.DGChatType | None] = {f"{user.id}-latest": None for user in self.users if not user.bot}
-    
         if self.application:
             try:
                 with database.DGDatabaseManager() as guild_handler:
                     
                     # NOTE: Guild ID must be present in all required SQL tables (guild_configs, model_rules, permissions)
-                    # TODO: Make function that checks all above (Within DGDatabaseManager)
                     
                     def check_servers():
                         common.send_info_text("Checking guild rule status..")
-                        for guild in self.guilds:
-                            if guild_handler.check_if_guild_in_all(guild) == False:
-                                guild_handler.add_guild_to_database(guild.id)
-                                common.send_info_text(f"Added new guild to all required tables: {guild} / {guild.id}")
+                        for guild_id in guild_handler.add_missing_guilds(self.guilds):
+                            common.send_info_text(f"Added new guild to all required tables: {self.get_guild(guild_id)} / {guild_id}")
                             
                         common.send_info_text("Guilds all added\n")
 
@@ -462,10 +453,10 @@ class DeveloperJoe(commands.Bot):
                             
                     await _check_integrity(0)
                     check_servers()
-                    database.check_and_get_yaml()
+                    confighandler.reload_config()
                     
                     if confighandler.get_config("backup_upon_start") == True:
-                        location = guild_handler.backup_database()
+                        location = await database.backup_async()
                         common.send_info_text(f'Backed up database to "{location}"')
                     
                     has_voice = self.is_voice_compatible
@@ -499,7 +490,10 @@ class DeveloperJoe(commands.Bot):
                 common.send_fatal_error_warning(str(err))
                 
     async def setup_hook(self):
-                
+        
+        if models.GPTModel.is_enabled():
+            models.GPTModel.set_openai_client(models.create_openai_client(confighandler.get_api_key("openai_api_key"))) # One pooled client for every request, so connections to OpenAI are reused.
+            
         print("Cogs\n")
         for file in os.listdir(f"extensions"):
             if file.endswith(".py"):
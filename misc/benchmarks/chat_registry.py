@@ -0,0 +1,42 @@
+"""Measures with tracemalloc the memory used to track the chats of `MEMBERS` visible users, `ACTIVE_USERS` of whom have a chat.
+
+`_per_member_dicts` builds the chat dict and default chat slot `on_ready` used to make for every user. `_registry` adds only the users with a chat to a `DGChatRegistry`.
+"""
+import tracemalloc
+
+from sources import chat
+
+MEMBERS = 1_000_000
+ACTIVE_USERS = 1000
+FIRST_USER_ID = 10 ** 17 # Discord IDs are about this big, so they are not small cached ints.
+
+def _per_member_dicts(user_ids: range, conversation: object) -> tuple:
+    chats = {user_id: {} for user_id in user_ids}
+    default_chats = {f"{user_id}-latest": None for user_id in user_ids}
+    
+    for user_id in user_ids[:ACTIVE_USERS]:
+        chats[user_id]["chat"] = default_chats[f"{user_id}-latest"] = conversation
+    return chats, default_chats
+
+def _registry(user_ids: range, conversation: object) -> chat.DGChatRegistry:
+    registry = chat.DGChatRegistry()
+    
+    for user_id in user_ids[:ACTIVE_USERS]:
+        registry.add_chat(user_id, "chat", conversation) # type: ignore The chat is never used.
+        registry.set_default(user_id, "chat")
+    return registry
+
+def main():
+    user_ids = range(FIRST_USER_ID, FIRST_USER_ID + MEMBERS)
+    
+    for name, track in (("Dicts for every member", _per_member_dicts), ("DGChatRegistry", _registry)):
+        tracemalloc.start()
+        tracked = track(user_ids, object())
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tracked
+        
+        print(f"{name}: {used / 2 ** 20:.2f}MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Times opening a database session and reading one guild config, which a chat request does several times.
+
+`_UnpooledSession` opens and closes its own connection and checks each required table by selecting all of its rows, as sessions did before `DGDatabaseConnectionPool`.
+The database holds `GUILDS` guild configs, so the cost of that check shows.
+"""
+import json, os, sqlite3, tempfile, time
+
+from sources import database
+
+READS = 2000
+GUILDS = 1000
+QUERY = "SELECT json FROM guild_configs WHERE gid=?"
+
+class _UnpooledSession(database.DGDatabaseSession):
+    def __init__(self, database_file: str):
+        super().__init__(database_file)
+        self.database = sqlite3.connect(database_file, timeout=60)
+    
+    def __exit__(self, type_, value_, traceback_):
+        super().__exit__(type_, value_, traceback_)
+        self.database.close()
+    
+    def table_exists(self, table: str) -> bool:
+        try:
+            self._exec_db_command(f"SELECT * FROM {table}")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+def _reads_per_second(session_type: type[database.DGDatabaseSession], database_file: str) -> float:
+    started = time.perf_counter()
+    for _ in range(READS):
+        with session_type(database_file) as session:
+            session._exec_db_command(QUERY, (1,))
+    return READS / (time.perf_counter() - started)
+
+def main():
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        database_file = os.path.join(directory, "benchmark.db")
+        config_json = json.dumps({"voice-speed": 1.0, "voice-volume": 1.0, "timezone": "Europe/London", "padding": "x" * 400})
+        
+        with database.DGDatabaseSession(database_file) as session:
+            session.database.executemany("INSERT INTO guild_configs VALUES(?, ?, ?)", ((gid, 0, config_json) for gid in range(1, GUILDS + 1)))
+        
+        print(f"Own connection, full table check: {_reads_per_second(_UnpooledSession, database_file):.0f} reads/s")
+        print(f"Pooled connection: {_reads_per_second(database.DGDatabaseSession, database_file):.0f} reads/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Saves `CHATS` synthetic chats of `TURNS_PER_CHAT` turns, with each turn stored as plain JSON text and then compressed by `history.encode_chat_entry`.
+
+Prints the stored size of the turns, chats saved per second and the average time to read one chat back with `iter_chat_entries`.
+The turns are random words, which compress worse than real replies.
+"""
+import json, os, random, tempfile, time
+from types import SimpleNamespace
+
+from sources import database, history
+
+CHATS = 300
+TURNS_PER_CHAT = 20
+WORDS = [f"word{number}" for number in range(2000)] + ["the", "a", "is", "to", "and", "of", "python", "discord", "bot", "code"]
+
+class _HistorySession(history.DGHistorySession):
+    def __init__(self, database_file: str):
+        database.DGDatabaseSession.__init__(self, database_file) # DGHistorySession always opens the bot's database.
+
+def _make_chat(rng: random.Random, number: int) -> SimpleNamespace:
+    sentence = lambda length: " ".join(rng.choices(WORDS, k=length)) + "."
+    turns = [[{"role": "user", "content": sentence(rng.randint(5, 30))}, {"role": "ai", "content": sentence(rng.randint(20, 200))}] for _ in range(TURNS_PER_CHAT)]
+    return SimpleNamespace(hid=hex(number), member=SimpleNamespace(id=1), name=f"Chat {number}", private=False, context=SimpleNamespace(_display_context=turns))
+
+def _run(chats: list[SimpleNamespace]) -> tuple[int, float, float]:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        database_file = os.path.join(directory, "benchmark.db")
+        with database.DGDatabaseSession(database_file):
+            pass # Creates the tables
+        
+        with _HistorySession(database_file) as session:
+            started = time.perf_counter()
+            for saved_chat in chats:
+                session.upload_chat_history(saved_chat)
+            uploaded = time.perf_counter() - started
+            
+            stored = int(session._exec_db_command("SELECT SUM(LENGTH(CAST(entry_json AS BLOB))) FROM history_entries")[0][0])
+            
+            started = time.perf_counter()
+            for saved_chat in chats:
+                list(session.iter_chat_entries(saved_chat.hid))
+            read = time.perf_counter() - started
+    return stored, len(chats) / uploaded, read / len(chats)
+
+def main():
+    rng = random.Random(0)
+    chats = [_make_chat(rng, number) for number in range(CHATS)]
+    
+    encode_chat_entry = history.encode_chat_entry
+    history.encode_chat_entry = lambda entry: json.dumps(entry)
+    try:
+        plain = _run(chats)
+    finally:
+        history.encode_chat_entry = encode_chat_entry
+    compressed = _run(chats)
+    
+    for name, (stored, uploads, read) in (("Plain JSON", plain), ("Compressed", compressed)):
+        print(f"{name}: {stored / 2 ** 20:.2f}MiB stored, {uploads:.0f} chats saved/s, {read * 1000:.2f}ms to read a chat")
+    print(f"Compressed turns take {compressed[0] / plain[0]:.0%} of the space")
+
+if __name__ == "__main__":
+    main()
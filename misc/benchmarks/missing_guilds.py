@@ -0,0 +1,36 @@
+"""Adds `GUILD_COUNTS` guilds to an empty database, checking and adding them one at a time as `on_ready` used to, and with `DGDatabaseManager.add_missing_guilds`.
+
+The one-at-a-time loop reads all three guild tables for every guild, so its time grows with the square of the guild count. `LARGE_GUILD_COUNT` is only timed with `add_missing_guilds`.
+"""
+import os, tempfile, time
+
+from sources import database
+
+GUILD_COUNTS = (100, 300)
+LARGE_GUILD_COUNT = 5000
+
+def _one_at_a_time(manager: database.DGDatabaseManager, guild_ids: range) -> None:
+    for guild_id in guild_ids:
+        if not manager.check_if_guild_in_all(guild_id):
+            manager.add_guild_to_database(guild_id)
+
+def _in_one_batch(manager: database.DGDatabaseManager, guild_ids: range) -> None:
+    manager.add_missing_guilds(guild_ids)
+
+def _milliseconds(add_guilds, guild_count: int) -> float:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        with database.DGDatabaseManager(os.path.join(directory, "benchmark.db")) as manager:
+            started = time.perf_counter()
+            add_guilds(manager, range(1, guild_count + 1))
+            elapsed = time.perf_counter() - started
+            
+            assert len(manager.get_guilds_in_permissions()) == guild_count
+    return elapsed * 1000
+
+def main():
+    for guild_count in GUILD_COUNTS:
+        print(f"{guild_count} guilds: {_milliseconds(_one_at_a_time, guild_count):.0f}ms one at a time, {_milliseconds(_in_one_batch, guild_count):.0f}ms in one batch")
+    print(f"{LARGE_GUILD_COUNT} guilds: {_milliseconds(_in_one_batch, LARGE_GUILD_COUNT):.0f}ms in one batch")
+
+if __name__ == "__main__":
+    main()
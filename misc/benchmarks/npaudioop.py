@@ -0,0 +1,44 @@
+"""Times `npaudioop` against the C `audioop` module on the functions pydub calls while turning a gTTS clip into Discord audio, each on one second of audio.
+
+C `audioop` is only in Python 3.12 and older. On 3.13 and newer there is nothing to compare against, so only `npaudioop` is timed.
+"""
+import os, time, warnings
+
+from sources.voice.pydub import npaudioop
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+ROUNDS = 20
+MONO = os.urandom(24000 * 2) # 16-bit, 24kHz mono. (What gTTS returns)
+STEREO = os.urandom(48000 * 2 * 2) # 16-bit, 48kHz stereo. (What Discord plays)
+
+OPERATIONS = {
+    "ratecv 24kHz -> 48kHz": lambda module: module.ratecv(MONO, 2, 1, 24000, 48000, None),
+    "tostereo": lambda module: module.tostereo(MONO, 2, 1, 1),
+    "mul": lambda module: module.mul(STEREO, 2, 0.5),
+    "add": lambda module: module.add(STEREO, STEREO, 2),
+    "rms": lambda module: module.rms(STEREO, 2),
+    "max": lambda module: module.max(STEREO, 2),
+    "lin2lin 16 -> 32 bit": lambda module: module.lin2lin(STEREO, 2, 4),
+}
+
+def _milliseconds(operation, module) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        operation(module)
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+def main():
+    modules = {"C audioop": audioop, "npaudioop": npaudioop} if audioop else {"npaudioop": npaudioop}
+    
+    print(f"{'':<24}" + "".join(f"{name:>14}" for name in modules))
+    for name, operation in OPERATIONS.items():
+        print(f"{name:<24}" + "".join(f"{_milliseconds(operation, module):>12.2f}ms" for module in modules.values()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Sends `REQUESTS` chat completions to a local stand-in for the OpenAI API, `CONCURRENCY` at a time.
+
+The first run creates and closes a client for every request, the second shares one client made by `models.create_openai_client`.
+The stand-in counts the TCP connections it accepts. Over the internet each of those also costs a TLS handshake, which this leaves out.
+"""
+import asyncio, json, time
+
+from sources import models
+
+REQUESTS = 500
+CONCURRENCY = 10
+REPLY = json.dumps({
+    "id": "chatcmpl-0", "object": "chat.completion", "created": 0, "model": "gpt-3.5-turbo",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Hello!"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}).encode()
+
+class _FakeOpenAI:
+    def __init__(self):
+        self.connections = 0
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while head := await reader.readuntil(b"\r\n\r\n"):
+                length = next((int(line.split(b":")[1]) for line in head.lower().split(b"\r\n") if line.startswith(b"content-length")), 0)
+                await reader.readexactly(length)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(REPLY), REPLY))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+async def _run(base_url: str, shared: bool) -> float:
+    shared_client = models.create_openai_client("sk-benchmark").with_options(base_url=base_url) if shared else None
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    
+    async def _request():
+        async with semaphore:
+            client = shared_client or models.create_openai_client("sk-benchmark").with_options(base_url=base_url)
+            await client.chat.completions.create(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "Hi"}])
+            if not shared:
+                await client.close()
+                
+    started = time.perf_counter()
+    await asyncio.gather(*(_request() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    
+    if shared_client:
+        await shared_client.close()
+    return elapsed
+
+async def main():
+    for shared in (False, True):
+        fake_openai = _FakeOpenAI()
+        server = await asyncio.start_server(fake_openai.handle, "127.0.0.1", 0)
+        base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        
+        elapsed = await _run(base_url, shared)
+        print(f"{'Shared client' if shared else 'Client per request'}: {REQUESTS / elapsed:.0f} requests/s, {fake_openai.connections} connections opened")
+        
+        server.close()
+        await server.wait_closed()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+"""Decodes and exports a `CLIP_SECONDS` MP3, `ROUNDS` times each, through ffmpeg pipes and through temporary files, and prints the average time of each.
+
+Temporary-file decoding uses `AudioSegment.from_file_using_temporary_files`. Temporary-file exporting is forced by emptying `PIPE_EXPORT_FORMATS`.
+Decoding passes `format="mp3"` as `GTTSModel` does. Needs ffmpeg and ffprobe.
+"""
+import io, shutil, sys, time
+
+from sources.voice.pydub import audio_segment, generators
+
+ROUNDS = 20
+CLIP_SECONDS = 15
+
+def _milliseconds(function) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        function()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+def main():
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        sys.exit("Needs ffmpeg and ffprobe.")
+        
+    clip = generators.Sine(440, sample_rate=24000).to_audio_segment(CLIP_SECONDS * 1000)
+    mp3 = clip.export(format="mp3").read()
+    
+    temporary_decode = _milliseconds(lambda: audio_segment.AudioSegment.from_file_using_temporary_files(io.BytesIO(mp3), format="mp3"))
+    piped_decode = _milliseconds(lambda: audio_segment.AudioSegment.from_file(io.BytesIO(mp3), format="mp3"))
+    print(f"Decode: {temporary_decode:.1f}ms with temporary files, {piped_decode:.1f}ms piped")
+    
+    piped_export = _milliseconds(lambda: clip.export(format="mp3"))
+    pipe_formats, audio_segment.PIPE_EXPORT_FORMATS = audio_segment.PIPE_EXPORT_FORMATS, ()
+    try:
+        temporary_export = _milliseconds(lambda: clip.export(format="mp3"))
+    finally:
+        audio_segment.PIPE_EXPORT_FORMATS = pipe_formats
+    print(f"Export: {temporary_export:.1f}ms with temporary files, {piped_export:.1f}ms piped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Turns one gTTS-like MP3 (`CLIP_SECONDS` of 24kHz mono) into the Opus frames sent to Discord, `CLIPS` times, and prints wall time, CPU time and ffmpeg processes per clip.
+
+The ffmpeg path exports the sped-up clip back to MP3 and plays it through `discord.FFmpegPCMAudio` and `discord.PCMVolumeTransformer`, which the voice client then encodes.
+The in-process path is `GTTSModel.process_text` (With gTTS replaced by the MP3, so no network is used) played through `DGOpusAudioSource`.
+CPU time includes ffmpeg, which is counted once each process has been waited for. Needs ffmpeg and the Opus library.
+"""
+import io, os, shutil, subprocess, sys, time
+import discord
+
+from sources import ttsmodels
+from sources.voice.pydub import audio_segment, generators
+
+CLIPS = 10
+CLIP_SECONDS = 10
+SPEED = 1.25
+VOLUME = 0.5
+
+class _CountedPopen(subprocess.Popen):
+    started = 0
+    
+    def __init__(self, *args, **kwargs):
+        _CountedPopen.started += 1
+        super().__init__(*args, **kwargs)
+
+class _RecordedGTTS:
+    mp3 = b""
+    
+    def __init__(self, text: str, lang: str):
+        pass
+    
+    def write_to_fp(self, file):
+        file.write(self.mp3)
+
+def _play(source: discord.AudioSource) -> None:
+    encoder = None if source.is_opus() else discord.opus.Encoder()
+    while frame := source.read():
+        if encoder:
+            encoder.encode(frame, discord.opus.Encoder.SAMPLES_PER_FRAME)
+    source.cleanup()
+
+def _ffmpeg_playback() -> None:
+    sped_up = audio_segment.AudioSegment.from_file(io.BytesIO(_RecordedGTTS.mp3)).speedup(playback_speed=SPEED)
+    _play(discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(sped_up.export(format="mp3"), pipe=True), VOLUME))
+
+def _opus_playback() -> None:
+    _play(ttsmodels.DGOpusAudioSource(ttsmodels.GTTSModel(None, "Benchmark").process_text(SPEED), VOLUME)) # type: ignore The member is not used.
+
+def _cpu_time() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def main():
+    if not shutil.which("ffmpeg") or not discord.opus._load_default():
+        sys.exit("Needs ffmpeg and the Opus library.")
+    
+    _RecordedGTTS.mp3 = generators.Sine(220, sample_rate=24000).to_audio_segment(CLIP_SECONDS * 1000).export(format="mp3").read()
+    ttsmodels._gtts.gTTS = _RecordedGTTS
+    subprocess.Popen = _CountedPopen
+    
+    for name, playback in (("ffmpeg", _ffmpeg_playback), ("In-process Opus", _opus_playback)):
+        _CountedPopen.started = 0
+        started, cpu_started = time.perf_counter(), _cpu_time()
+        
+        for _ in range(CLIPS):
+            playback()
+        
+        print(f"{name}: {(time.perf_counter() - started) / CLIPS * 1000:.0f}ms, {(_cpu_time() - cpu_started) / CLIPS * 1000:.0f}ms of CPU, {_CountedPopen.started / CLIPS:.0f} ffmpeg processes per clip")
+
+if __name__ == "__main__":
+    main()
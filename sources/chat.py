@@ -12,6 +12,7 @@ from typing import (
     Union as _Union, 
     Any as _Any, 
     AsyncGenerator as _AsyncGenerator,
+    Callable as _Callable,
     TYPE_CHECKING
 )
 
@@ -19,12 +20,14 @@ from sources import models
 from . import (
     exceptions, 
     confighandler, 
+    database,
     history, 
     ttsmodels,
     models,
     exceptions,
     errors,
-    responses
+    responses,
+    streamhandler
 )
 from .common import (
     decorators,
@@ -41,7 +44,8 @@ if TYPE_CHECKING:
 _openai.api_key = confighandler.get_api_key("openai_api_key")
 __all__ = [
     "DGTextChat",
-    "DGVoiceChat"
+    "DGVoiceChat",
+    "DGChatRegistry"
 ]
     
 
@@ -172,6 +176,7 @@ class DGChat:
         raise NotImplementedError
 
     async def start(self) -> None:
+        await self.model.check_permissions()
         self.bot.add_conversation(self.member, self.display_name, self)
         self.bot.set_default_conversation(self.member, self.display_name)
         await self.model.start_chat()
@@ -250,8 +255,17 @@ class DGTextChat(DGChat):
         self._private = is_p        
     
     @decorators.check_enabled
-    async def ask_stream(self, query: str, channel: developerconfig.InteractableChannel) -> str:
-        
+    async def ask_stream(self, query: str, channel: developerconfig.InteractableChannel, on_text: _Callable[[str], None] | None=None) -> str:
+        """Streams a reply to the query into the channel.
+
+        Args:
+            query (str): The users query.
+            channel (developerconfig.InteractableChannel): Where the reply is sent. (Or the chats private thread)
+            on_text (_Callable[[str], None] | None, optional): Called with each piece of the reply as it arrives. Defaults to None.
+
+        Returns:
+            str: The full reply.
+        """
         if self.model.can_stream == False:
             raise exceptions.DGException(f"{self.model} does not support streaming text.")
         
@@ -261,9 +275,9 @@ class DGTextChat(DGChat):
         
         async def _stream_reply() -> _AsyncGenerator[str, _Any]:
             try:
-                ai_reply: _AsyncGenerator[responses.BaseAIQueryResponseChunk | responses.BaseAIErrorResponse | responses.AIEmptyResponseChunk, None] = await self.model.ask_model_stream(query)
+                ai_reply: _AsyncGenerator[responses.AIResponseDelta | responses.BaseAIErrorResponse, None] = await self.model.ask_model_stream(query)
                 async for chunk in ai_reply:
-                    if isinstance(chunk, responses.BaseAIQueryResponseChunk):
+                    if isinstance(chunk, responses.AIResponseDelta):
                         yield chunk.response
                     
                     elif isinstance(chunk, responses.BaseAIErrorResponse):
@@ -282,40 +296,23 @@ class DGTextChat(DGChat):
             finally:
                 self.is_processing = False
                 
-        msg: list[discord.Message] = [og_message]
-        reply = _stream_reply()
-        full_message = f"## {self.header}\n\n"
-        i, start_message_at = 0, 0
-        sendable_portion = "<>"
-        message = ""
+        writer = streamhandler.DGStreamMessageWriter(og_message, f"## {self.header}\n\n")
         
         try:                
-            async for t in reply:
-                
-                i += 1
-                full_message += t
-                message += t
-                sendable_portion = full_message[start_message_at * developerconfig.CHARACTER_LIMIT:((start_message_at + 1) * developerconfig.CHARACTER_LIMIT)]
-        
-                if len(full_message) and len(full_message) >= (start_message_at + 1) * developerconfig.CHARACTER_LIMIT:
-                    await msg[-1].edit(content=sendable_portion)
-                    msg.append(await msg[-1].channel.send(developerconfig.STREAM_PLACEHOLDER))
-
-                start_message_at = len(full_message) // developerconfig.CHARACTER_LIMIT
-                if i and i % developerconfig.STREAM_UPDATE_MESSAGE_FREQUENCY == 0:
-                    await msg[-1].edit(content=sendable_portion)
-
-            else:
-                if not msg:
-                    await og_message.edit(content=sendable_portion)
-                else:
-                    await msg[-1].edit(content=sendable_portion)
+            async for t in _stream_reply():
+                writer.write(t)
+                if on_text:
+                    on_text(t)
+            message = await writer.close()
             
         except (discord.NotFound, aiohttp.ClientOSError):
             self.is_processing = False
             raise exceptions.DGException("Stopped streaming query as the streamed message was deleted.")
+        except BaseException:
+            writer.cancel()
+            raise
         else:            
-            self.context.add_conversation_entry(query, full_message)
+            self.context.add_conversation_entry(query, writer.text)
             return message
     
     @decorators.check_enabled
@@ -399,29 +396,32 @@ class DGTextChat(DGChat):
         Returns:
             str: A farewell message.
         """
-        with history.DGHistorySession() as dg_history:
-            member: discord.Member = commands_utils.assure_class_is_value(interaction.user, discord.Member)
-            if isinstance(self.chat_thread, discord.Thread) and self.chat_thread.id == interaction.channel_id:
-                raise exceptions.ConversationError(errors.ConversationErrors.CANNOT_STOP_IN_CHANNEL)
-            try:
-                farewell = f"Ended chat: {self.display_name} with {confighandler.get_config('bot_name')}!"
-                await self.bot.delete_conversation(member, self.display_name)
-                self.bot.reset_default_conversation(member)
+        def _upload_history():
+            with history.DGHistorySession() as dg_history:
+                dg_history.upload_chat_history(self)
                 
-                if save_history == True:
-                    dg_history.upload_chat_history(self)
-                    farewell += f"\n\n\n*Saved chat history with ID: {self.hid}*"
-                else:
-                    farewell += "\n\n\n*Not saved chat history*"
-
-                if isinstance(self.chat_thread, discord.Thread):
-                    await self.chat_thread.delete()
-                return farewell
-            
-            # TODO: Return History ID instead of a message
+        member: discord.Member = commands_utils.assure_class_is_value(interaction.user, discord.Member)
+        if isinstance(self.chat_thread, discord.Thread) and self.chat_thread.id == interaction.channel_id:
+            raise exceptions.ConversationError(errors.ConversationErrors.CANNOT_STOP_IN_CHANNEL)
+        try:
+            farewell = f"Ended chat: {self.display_name} with {confighandler.get_config('bot_name')}!"
+            await self.bot.delete_conversation(member, self.display_name)
+            self.bot.reset_default_conversation(member)
             
-            except discord.Forbidden as e:
-                raise exceptions.DGException(f"I have not been granted suffient permissions to delete your thread in this server. Please contact the servers administrator(s).", e)
+            if save_history == True:
+                await database.run_async(_upload_history)
+                farewell += f"\n\n\n*Saved chat history with ID: {self.hid}*"
+            else:
+                farewell += "\n\n\n*Not saved chat history*"
+
+            if isinstance(self.chat_thread, discord.Thread):
+                await self.chat_thread.delete()
+            return farewell
+        
+        # TODO: Return History ID instead of a message
+        
+        except discord.Forbidden as e:
+            raise exceptions.DGException(f"I have not been granted suffient permissions to delete your thread in this server. Please contact the servers administrator(s).", e)
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} type={self.type}, user={self.member} is_active={self.is_active}>"
@@ -488,7 +488,8 @@ class DGVoiceChat(DGTextChat):
         self._voice = voice
         self._client_voice_instance: discord.VoiceClient | None = discord.utils.get(self.bot.voice_clients, guild=member.guild) # type: ignore because all single instances are `discord.VoiceClient`
         self._is_speaking = False
-        self.voice_tss_queue: list[str] = []
+        self._tts_pipeline: ttsmodels.DGTTSPipeline | None = None
+        self._sentence_speakers: set[_asyncio.Task] = set() # Every task still speaking a streamed reply
     
     @property
     def voice(self):
@@ -512,7 +513,18 @@ class DGVoiceChat(DGTextChat):
 
     
     def cleanup_voice(self):
-        self.voice_tss_queue.clear()
+        current_task = _asyncio.current_task()
+        for speaker in self._sentence_speakers - {current_task}: # When a speaker calls this (Through `speak`), it carries on with its own reply
+            speaker.cancel()
+            self._sentence_speakers.discard(speaker)
+        if self._tts_pipeline:
+            self._tts_pipeline.cancel()
+            self._tts_pipeline = None
+    
+    def _on_speaker_done(self, speaker: _asyncio.Task) -> None:
+        self._sentence_speakers.discard(speaker)
+        if not speaker.cancelled() and (error := speaker.exception()): # Nothing awaits speakers, so their errors would otherwise never be seen
+            common.warn_for_error(f"Error speaking a streamed reply: {error!r}")
         
     async def manage_voice(self) -> discord.VoiceClient:
         
@@ -534,34 +546,27 @@ class DGVoiceChat(DGTextChat):
     @decorators.has_voice
     async def speak(self, text: str): 
         try:
-            self.voice_tss_queue.append(text)
             new_voice = await self.manage_voice()
             
-            def _play_voice(index: int, error: _Any=None):
-                if not error:
-                    if not (index >= len(self.voice_tss_queue)):
-                        speed: int = confighandler.get_guild_config_attribute(new_voice.guild, "voice-speed")
-                        volume: int = confighandler.get_guild_config_attribute(new_voice.guild, "voice-volume")
-                        
-                        ffmpeg_pcm = StdinFFmpegPCMAudioFix(source=ttsmodels.GTTSModel(self.member, self.voice_tss_queue[index]).process_text(speed), executable=developerconfig.FFMPEG, pipe=True)
-                        volume_source = discord.PCMVolumeTransformer(ffmpeg_pcm)
-                        volume_source.volume = volume
-                        
-                        return new_voice.play(volume_source, after=lambda error: _play_voice(index + 1, error))
-                        
-                    self.voice_tss_queue.clear()
-                else:
-                    raise exceptions.DGException(f"VoiceError: {str(error)}", log_error=True, send_exceptions=True)
-
-            
             if new_voice.is_paused():
+                self.cleanup_voice()
                 new_voice.stop()
-            _play_voice(0)
+                
+            if self._tts_pipeline == None or self._tts_pipeline.is_finished:
+                speed: float = await confighandler.get_guild_config_attribute_async(new_voice.guild, "voice-speed")
+                volume: float = await confighandler.get_guild_config_attribute_async(new_voice.guild, "voice-volume")
+                
+                def _make_source(audio) -> discord.AudioSource:
+                    return ttsmodels.DGOpusAudioSource(audio, volume)
+                
+                self._tts_pipeline = ttsmodels.DGTTSPipeline(ttsmodels.GTTSModel, self.member, speed)
+                await self._tts_pipeline.submit(text)
+                self._tts_pipeline.start(new_voice, _make_source)
+            else:
+                await self._tts_pipeline.submit(text) # Already speaking, the player picks this up after the queued clips
             
         except discord.ClientException:
             pass
-        except IndexError:
-            self.voice_tss_queue.clear()
     
     @decorators.has_config
     async def speak_and_say(self, text: str, channel: developerconfig.InteractableChannel):
@@ -576,6 +581,7 @@ class DGVoiceChat(DGTextChat):
     @decorators.dg_is_speaking
     async def stop_speaking(self):
         """Stops the bots voice reply for a user. (Cannot be resumed)"""
+        self.cleanup_voice()
         self.client_voice.cleanup()
         self.client_voice.stop() # type: ignore checks in decorators
     
@@ -606,8 +612,35 @@ class DGVoiceChat(DGTextChat):
 
         
         if isinstance(channel, developerconfig.InteractableChannel):
-            text = await super().ask_stream(query, channel)
-            await self.speak(text)
+            segmenter = ttsmodels.DGSentenceSegmenter()
+            sentences: _asyncio.Queue[str | None] = _asyncio.Queue()
+            
+            previous_speakers = set(self._sentence_speakers)
+            
+            async def _speak_sentences():
+                if previous_speakers:
+                    await _asyncio.wait(previous_speakers) # Finish speaking the last reply first
+                    
+                while (sentence := await sentences.get()) != None:
+                    await self.speak(sentence) # Each sentence is synthesised and queued for playback as soon as it completes
+            
+            def _on_text(text: str):
+                for sentence in segmenter.feed(text):
+                    sentences.put_nowait(sentence)
+            
+            speaker = _asyncio.create_task(_speak_sentences())
+            self._sentence_speakers.add(speaker)
+            speaker.add_done_callback(self._on_speaker_done)
+            
+            try:
+                text = await super().ask_stream(query, channel, _on_text)
+            except BaseException:
+                speaker.cancel()
+                raise
+            
+            if remainder := segmenter.flush():
+                sentences.put_nowait(remainder)
+            sentences.put_nowait(None)
         else:
             raise TypeError("channel cannot be {}. types.InteractableChannels only.".format(channel.__class__))
 
@@ -625,4 +658,96 @@ class DGVoiceChat(DGTextChat):
     def __str__(self) -> str:
         return self.display_name
 
-DGChatType = DGTextChat | DGVoiceChat | DGChat
\ No newline at end of file
+DGChatType = DGTextChat | DGVoiceChat | DGChat
+
+class DGChatRegistry:
+    """Keeps track of every users chats and their default chat. Users are only added once they start a chat, and removed when they have none left, so members who never use the bot cost nothing."""
+    
+    __slots__ = ("_chats", "_defaults")
+    
+    def __init__(self) -> None:
+        self._chats: dict[int, dict[str, DGChatType]] = {}
+        self._defaults: dict[int, DGChatType] = {}
+    
+    def __len__(self) -> int:
+        """The amount of users with at least one chat."""
+        return len(self._chats)
+    
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._chats
+    
+    def get_chats(self, user_id: int) -> dict[str, DGChatType]:
+        """Returns a users chats.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict[str, DGChatType]: The name of each chat as the key, and the chat as the value. Empty if the user has no chats.
+        """
+        return self._chats.get(user_id, {})
+    
+    def get_chat(self, user_id: int, name: str) -> DGChatType | None:
+        return self._chats.get(user_id, {}).get(name)
+    
+    def has_chat(self, user_id: int, name: str) -> bool:
+        return name in self._chats.get(user_id, {})
+    
+    def add_chat(self, user_id: int, name: str, conversation: DGChatType) -> None:
+        """Adds a chat to a user, replacing any chat of theirs with the same name.
+
+        Args:
+            user_id (int): The ID of the user.
+            name (str): The name of the chat.
+            conversation (DGChatType): The chat.
+        """
+        self._chats.setdefault(user_id, {})[name] = conversation
+    
+    def remove_chat(self, user_id: int, name: str) -> DGChatType | None:
+        """Removes a users chat. If it was their default chat, they are left without one.
+
+        Args:
+            user_id (int): The ID of the user.
+            name (str): The name of the chat.
+
+        Returns:
+            DGChatType | None: The removed chat, or None if the user had no chat with that name.
+        """
+        if (user_chats := self._chats.get(user_id)) == None or (conversation := user_chats.pop(name, None)) == None:
+            return None
+        
+        if not user_chats:
+            del self._chats[user_id]
+        if self._defaults.get(user_id) is conversation:
+            del self._defaults[user_id]
+        return conversation
+    
+    def clear_chats(self, user_id: int) -> list[DGChatType]:
+        """Removes all of a users chats, including their default.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list[DGChatType]: The removed chats.
+        """
+        self._defaults.pop(user_id, None)
+        return list(self._chats.pop(user_id, {}).values())
+    
+    def get_default(self, user_id: int) -> DGChatType | None:
+        return self._defaults.get(user_id)
+    
+    def set_default(self, user_id: int, name: str) -> None:
+        """Sets a users default chat.
+
+        Args:
+            user_id (int): The ID of the user.
+            name (str): The name of one of the users chats.
+
+        Raises:
+            KeyError: The user has no chat with that name.
+        """
+        self._defaults[user_id] = self._chats[user_id][name]
+    
+    def reset_default(self, user_id: int) -> None:
+        self._defaults.pop(user_id, None)
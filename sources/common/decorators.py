@@ -109,7 +109,7 @@ def _is_joe_class(func: typing.Callable):
     return _self_wrapper
 
 def user_exists(func):
-    """Decorator for checking if a member exists withint the global chat index.
+    """Decorator for methods that take a member. Members do not need to be registered in the chat registry (`DeveloperJoe.chats`) beforehand, they are added when they start their first chat.
 
     Args:
         func (_type_): The non-awaitable function with self and member parameter.
@@ -117,11 +117,7 @@ def user_exists(func):
     
     @_is_joe_class
     def _member_wrapper(self, member: discord.Member, *args, **kwargs):
-        if member.id in list(self.chats):
-            return func(self, member, *args, **kwargs)
-        
-        self.chats[member.id] = {}
-        return func(self, member)
+        return func(self, member, *args, **kwargs)
     
     return _member_wrapper
 
@@ -130,7 +126,7 @@ def user_has_chat(func):
     @user_exists
     def _member_wrapper(self: DeveloperJoe, member: discord.Member, chat_name: str, *args, **kwargs):
         chat_name = str(chat_name or self.get_default_conversation(member))
-        if chat_name in list(self.chats[member.id]):
+        if self.chats.has_chat(member.id, chat_name):
             return func(self, member, chat_name, *args, **kwargs)
         raise exceptions.ConversationError(errors.ConversationErrors.NO_CONVO)
     
@@ -140,7 +136,7 @@ def chat_not_exist(func):
     
     @user_exists
     def _member_wrapper(self, member: discord.Member, name: str, *args, **kwargs):
-        if name not in list(self.chats[member.id]):
+        if not self.chats.has_chat(member.id, name):
             return func(self, member, name, *args, **kwargs)
         raise exceptions.ConversationError(errors.ConversationErrors.HAS_CONVO)
     
@@ -11,10 +11,15 @@ TIMEZONE = "UTC" # Global timezone of the bot. Can be overridden per guild conf
 """ADVANCED. SOURCE CODE EDITORS ONLY"""
     
 GPT_REQUEST_TIMEOUT = 180 # Any less than 30 and the bot is very lightly to crash
+OPENAI_CONNECT_TIMEOUT = 10 # How many seconds to wait when opening a new connection to OpenAI.
+OPENAI_MAX_CONNECTIONS = 100 # How many connections to OpenAI may be open at once. Shared by every user and chat.
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 20 # How many idle connections to OpenAI are kept open for reuse.
+OPENAI_KEEPALIVE_EXPIRY = 30 # How many seconds an idle connection to OpenAI is kept open before it is closed.
 QUERY_TIMEOUT = 10 # Timeout for destructive actions.
 QUERY_CONFIRMATION = "yes" # What keyword to use for confirmation of destructive actions
 
-STREAM_UPDATE_MESSAGE_FREQUENCY = 10 # When streaming a reply, this dictates every set amount of chunks to update the message. Any less that 10 and it will lag.
+STREAM_UPDATE_MESSAGE_INTERVAL = 1.0 # When streaming a reply, the minimum amount of seconds between edits of the streamed message. Text that arrives in between is added in the next edit.
+STREAM_MAX_CONCURRENT_EDITS_PER_CHANNEL = 2 # How many streamed messages can be edited at the same time within one channel. Others wait their turn.
 CHATS_LIMIT = 14 # How many chats a user can have at one time. This cannot be more than 14.
 CHARACTER_LIMIT = 2000 # Do NOT put this anywhere over 2000. If you do, the bot will crash if a long message is sent.
 
@@ -25,10 +30,23 @@ VERSION = "1.4.7"
 # It's really cool to have your own custom version scheme isn't it? But to others it is probably very confusing and unnessersary.
 
 LOGGER_LEVEL = logging.ERROR # Logger level. By default it is `logging.ERROR` during betas it might be `logging.DEBUG`
-DATABASE_VERSION = "1.0.2" # Database version. If bigger than current, the database file will be updated.
+DATABASE_VERSION = "1.0.5" # Database version. If bigger than current, the database file will be updated.
 DATABASE_EXTENSION = "db" # File extension of the local database file. Can also be sqlite3
 DATABASE_FILENAME = "dg_database" # Name of the database file.
 DATABASE_FILE = f"dependencies/{DATABASE_FILENAME}.{DATABASE_EXTENSION}" # Where the SQLite3 Database file is located. (Reletive)
+DATABASE_MMAP_SIZE = 64 * 1024 * 1024 # How many bytes of the database file SQLite may memory-map. Set to 0 to disable memory-mapped reads.
+DATABASE_CACHE_SIZE = 8 * 1024 # Size of the SQLite page cache of each pooled database connection, in kibibytes.
+DATABASE_MAX_BATCH_SIZE = 64 # How many queued database calls may be committed together in a single transaction.
+DATABASE_BACKUP_DIRECTORY = "dependencies/backups" # Where database backups are saved. (Reletive)
+DATABASE_BACKUP_KEEP = 5 # How many database backups are kept. The oldest backup is deleted first.
+DATABASE_BACKUP_PAGES_PER_STEP = 1024 # How many database pages a backup copies at a time. Other database calls can run in between.
+DATABASE_BACKUP_COMPRESS = True # Weather database backups are compressed with gzip.
+DATABASE_BACKUP_CHECKSUM = True # Weather a SHA-256 checksum is saved next to each backup. Backups with a checksum are verified before they are loaded.
+HISTORY_COMPRESSION_LEVEL = 6 # How hard saved chats are compressed, from 1 (Fastest) to 9 (Smallest).
+HISTORY_COMPRESSION_BATCH_SIZE = 500 # How many saved turns `/owner compress-history` looks at in each transaction.
+HISTORY_SEARCH_PAGE_SIZE = 5 # How many saved chats `/history search` shows on each page.
+HISTORY_LIST_PAGE_SIZE = 10 # How many saved chats `/histories` shows on each page.
+GUILD_CONFIG_CACHE_SIZE = 1024 # How many decoded guild configurations are kept in memory. The least recently used guild is dropped first.
 DEVELOPERJOE_THUMBNAIL_URL = "https://i.imgur.com/SgdL99Y.png"
 
 TOKEN_FILE = "dependencies/api-keys.yaml" # Where the API keys for Discord and OpenAI are located. (Reletive)
@@ -36,10 +54,16 @@ WELCOME_FILE = "dependencies/tutorial.md" # Where the introduction / welcome te
 ADMIN_FILE = "dependencies/admin-tutorial.md" # Where the admin introduction / welcome text is located. (Reletive)
 CONFIG_FILE = "bot-config.yaml" # Where the client-configuration file is located (Reletive)
 LOG_FILE = "misc/bot_log.log" # Where the bots log is located (Reletive)
+CONFIG_CHECK_INTERVAL = 5 # How many seconds the cached bot-config.yaml is trusted before the file is checked for changes again.
 
 FFMPEG = voice_checks._get_voice_paths("ffmpeg", False) # FFMPEG executable. Can be an absolute or relative file path. Required for voice services.
 FFPROBE = voice_checks._get_voice_paths("ffprobe", False) # FFPROBE executable. Can be an absolute or relative file path. Required for voice services.
 LIBOPUS = voice_checks._get_voice_paths("opus", True) # Libopus shared library. Can be an absolute or relative file path. Required for voice services.
+TTS_WORKER_THREADS = 2 # How many threads synthesise text-to-speech clips. Shared by every voice chat.
+TTS_PREFETCH_CLIPS = 2 # How many text-to-speech clips of a voice chat can be synthesised ahead of the one playing.
+TTS_MIN_SENTENCE_LENGTH = 24 # When speaking a streamed reply, sentences shorter than this many characters are spoken together with the next one.
+TTS_CACHE_DIRECTORY = "dependencies/tts-cache" # Where processed text-to-speech audio is cached, so repeated phrases are not synthesised again. (Reletive)
+TTS_CACHE_MAX_BYTES = 256 * 1024 * 1024 # How many bytes of text-to-speech audio can be cached. The least recently used audio is deleted first.
 
 STREAM_PLACEHOLDER = "Loading.." # The message that will be sent when streaming. This is needed as a placeholder text so that the initial streaming message is not empty. This can be anything as long as it is not empty, and not more than 2000 characters. It usually doesn't appear for more than half a second.
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-import discord, json, yaml
+import discord, json, yaml, threading
+from collections import OrderedDict
 from typing import Any, TYPE_CHECKING, Self, Type
 
 from . import (
@@ -24,10 +25,15 @@ if TYPE_CHECKING:
 __all__ = [
     "GuildData",
     "DGGuildDatabaseConfigHandler",
+    "DGGuildConfigCache",
     "get_guild_config",
     "edit_guild_config",
     "get_guild_config_attribute",
-    "reset_guild_config"
+    "reset_guild_config",
+    "get_guild_config_async",
+    "edit_guild_config_async",
+    "get_guild_config_attribute_async",
+    "reset_guild_config_async"
 ]
 
 def generate_config_key():
@@ -85,8 +91,7 @@ class DGGuildDatabaseConfigHandler(database.DGDatabaseSession):
         return self
 
     def __exit__(self, type_, value_, traceback_):
-        self.database.commit()
-        self.database.close()
+        self._commit()
     
     def __init__(self, guild: discord.Guild):
         super().__init__()
@@ -97,7 +102,7 @@ class DGGuildDatabaseConfigHandler(database.DGDatabaseSession):
         return self._guild
     
     @decorators.has_config
-    def edit_guild(self, **keys):
+    def edit_guild(self, **keys) -> dict[str, Any]:
         
         if keys and set(keys.keys()).issubset(set(generate_config_key().keys())):
             data: GuildData = self.get_guild()
@@ -105,6 +110,7 @@ class DGGuildDatabaseConfigHandler(database.DGDatabaseSession):
             _raw = data.raw_config_data.copy()
             _raw.update(keys)
             self._exec_db_command("UPDATE guild_configs SET json=? WHERE gid=?", (json.dumps(_raw), self.guild.id))
+            return _raw
         elif not keys:
             raise exceptions.DGException(f"Empty keys would make no change.")
         else:
@@ -124,6 +130,53 @@ class DGGuildDatabaseConfigHandler(database.DGDatabaseSession):
     def add_guild(self):
         self._exec_db_command("INSERT INTO guild_configs VALUES(?, ?, ?)", (self.guild.id, self.guild.owner_id, json.dumps(generate_config_key()),))
 
+class DGGuildConfigCache:
+    """Bounded LRU cache of decoded guild configurations, keyed by guild ID. Kept up to date by `edit_guild_config` and `reset_guild_config`.
+    Configurations are only cached once the database work that read or wrote them has been committed, so a rolled back edit is never cached."""
+    
+    def __init__(self, max_size: int=developerconfig.GUILD_CONFIG_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._configs: OrderedDict[int, dict[str, Any]] = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._configs)
+    
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def get(self, guild_id: int) -> dict[str, Any] | None:
+        """Returns the cached configuration of a guild, or None if it is not cached."""
+        with self._lock:
+            if (config := self._configs.get(guild_id)) != None:
+                self._configs.move_to_end(guild_id)
+                self.hits += 1
+                return config
+            
+            self.misses += 1
+            return None
+    
+    def set(self, guild_id: int, config: dict[str, Any]) -> None:
+        """Caches the configuration of a guild, evicting the least recently used guild if the cache is full."""
+        with self._lock:
+            self._configs[guild_id] = config
+            self._configs.move_to_end(guild_id)
+            
+            while len(self._configs) > self.max_size:
+                self._configs.popitem(last=False)
+    
+    def invalidate(self, guild_id: int | None=None) -> None:
+        """Removes a guild from the cache. If no guild is given, the whole cache is cleared."""
+        with self._lock:
+            self._configs.pop(guild_id, None) if guild_id != None else self._configs.clear()
+
+guild_config_cache = DGGuildConfigCache()
+
 class GuildConfigAttributes:
 
     @staticmethod
@@ -142,6 +195,22 @@ class GuildConfigAttributes:
     def get_voice_speed(guild: discord.Guild) -> float:
         return float(get_guild_config_attribute(guild, "voice-speed"))
     
+    @staticmethod
+    async def get_guild_model_async(guild: discord.Guild) -> Type[models.AIModel]:
+        return commands_utils.get_modeltype_from_name(await get_guild_config_attribute_async(guild, "default-ai-model"))
+    
+    @staticmethod
+    async def get_voice_status_async(guild: discord.Guild) -> bool:
+        return bool(await get_guild_config_attribute_async(guild, "voice-enabled"))
+    
+    @staticmethod
+    async def get_voice_volume_async(guild: discord.Guild) -> float:
+        return float(await get_guild_config_attribute_async(guild, "voice-volume"))
+    
+    @staticmethod
+    async def get_voice_speed_async(guild: discord.Guild) -> float:
+        return float(await get_guild_config_attribute_async(guild, "voice-speed"))
+    
 def get_guild_config(guild: discord.Guild) -> GuildData:
     """Returns a guilds full developerconfig.
 
@@ -152,12 +221,17 @@ def get_guild_config(guild: discord.Guild) -> GuildData:
         GuildData: _description_
     """
     with DGGuildDatabaseConfigHandler(guild) as cs:
-        return cs.get_guild()
+        guild_data = cs.get_guild()
+        database.call_after_commit(lambda: guild_config_cache.set(guild.id, guild_data.raw_config_data))
+        return guild_data
 
 def edit_guild_config(guild: discord.Guild, key: str | None=None, value: Any | None=None, **kwargs) -> None:
     with DGGuildDatabaseConfigHandler(guild) as cs:
         actual_data = {key: value} if key != None and value != None else kwargs
-        return cs.edit_guild(**actual_data)
+        config = cs.edit_guild(**actual_data)
+        
+        guild_config_cache.invalidate(guild.id) # Until the edit is committed, lookups read the database.
+        database.call_after_commit(lambda: guild_config_cache.set(guild.id, config))
 
 def reset_guild_config(guild: discord.Guild) -> None:
     return edit_guild_config(guild, **generate_config_key())
@@ -173,17 +247,55 @@ def get_guild_config_attribute(guild: discord.Guild, attribute: str) -> Any:
     Returns:
         _Union[_Any, None]: The value, or None.
     """
+    if (config := guild_config_cache.get(guild.id)) == None:
+        config = _load_guild_config(guild)
+    return _get_attribute_from_config(config, attribute)
+
+def _load_guild_config(guild: discord.Guild) -> dict[str, Any]:
     with DGGuildDatabaseConfigHandler(guild) as cs:
-        val = cs.get_guild().get_local_guild_config_key(attribute)
-        if val != types.Empty:
-            return val
-        raise KeyError('No config key named "{}"'.format(attribute))
+        config = cs.get_guild().raw_config_data
+        database.call_after_commit(lambda: guild_config_cache.set(guild.id, config))
+        return config
+
+def _get_attribute_from_config(config: dict[str, Any], attribute: str) -> Any:
+    if (val := config.get(attribute, types.Empty)) != types.Empty:
+        return val
+    raise KeyError('No config key named "{}"'.format(attribute))
+
+_api_key_store = database.DGConfigStore(developerconfig.TOKEN_FILE, developerconfig.default_api_keys)
+
+async def get_guild_config_async(guild: discord.Guild) -> GuildData:
+    """Same as `get_guild_config`, but runs on the database thread."""
+    return await database.run_async(get_guild_config, guild)
+
+async def edit_guild_config_async(guild: discord.Guild, key: str | None=None, value: Any | None=None, **kwargs) -> None:
+    """Same as `edit_guild_config`, but runs on the database thread."""
+    return await database.run_async(edit_guild_config, guild, key, value, **kwargs)
+
+async def reset_guild_config_async(guild: discord.Guild) -> None:
+    """Same as `reset_guild_config`, but runs on the database thread."""
+    return await database.run_async(reset_guild_config, guild)
+
+async def get_guild_config_attribute_async(guild: discord.Guild, attribute: str) -> Any:
+    """Same as `get_guild_config_attribute`, but runs on the database thread. Cached guilds are answered straight away."""
+    if (config := guild_config_cache.get(guild.id)) == None:
+        config = await database.run_async(_load_guild_config, guild)
+    return _get_attribute_from_config(config, attribute)
 
 def get_config(key: str) -> Any:
     return database.get_config(key)
 
+def reload_config() -> dict[str, Any]:
+    """Reloads the bot-config.yaml and API key files from disk without restarting the bot.
+
+    Returns:
+        dict[str, Any]: The new bot configuration.
+    """
+    _api_key_store.reload()
+    return database.reload_config()
+
 def get_api_key(api_key: str) -> str:
-    api_config = database.check_and_get_yaml(developerconfig.TOKEN_FILE, developerconfig.default_api_keys)
+    api_config = _api_key_store.get()
     k = api_config.get(api_key, None)
     if k == None:
         raise exceptions.DGException(f'API Key "{api_key}" not found within YAML file.')
@@ -220,4 +332,5 @@ def write_keys(keys: dict[str, str]) -> dict[str, str]:
     with open(developerconfig.TOKEN_FILE, "w+") as key_yaml:
         yaml.safe_dump(new_keys, key_yaml)
     
+    _api_key_store.reload()
     return new_keys
\ No newline at end of file
@@ -1,6 +1,7 @@
-import json
-import sqlite3, shutil, os
-from typing import Any
+import json, threading, time, queue, asyncio, contextlib
+import sqlite3, shutil, os, gzip, hashlib
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, Iterator, TypeVar
 
 import discord
 import yaml
@@ -13,9 +14,263 @@ from .common import (
 from . import errors
 
 __all__ = [
-    "DGDatabaseSession"
+    "DGDatabaseSession",
+    "DGDatabaseConnectionPool",
+    "DGDatabaseWorker",
+    "run_async",
+    "backup_async",
+    "call_after_commit"
 ]
 
+_T = TypeVar("_T")
+_batch_state = threading.local()
+
+def _commits_are_deferred() -> bool:
+    return getattr(_batch_state, "active", False)
+
+def call_after_commit(callback: Callable[[], Any]) -> None:
+    """Calls `callback` once the database work running on this thread has been committed. If the work is rolled back instead, it is never called.
+    Outside of a batch or `DGDatabaseSession.transaction`, every command is committed straight away, so `callback` is called straight away too.
+
+    Args:
+        callback (Callable[[], Any]): The function to call. (Such as a cache update)
+    """
+    if _commits_are_deferred():
+        _batch_state.after_commit.append(callback)
+    else:
+        callback()
+
+def _run_after_commit(callbacks: list[Callable[[], Any]]) -> None:
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as error:
+            common.warn_for_error(f"Error after a database commit: {error}")
+
+class DGDatabaseConnectionPool:
+    """
+        Keeps one long-lived SQLite connection per thread and database file. Connections are configured once, when they are opened.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections: dict[tuple[int, str], sqlite3.Connection] = {}
+    
+    def _open_connection(self, database_file: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(database_file, timeout=60, check_same_thread=False)
+        
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA mmap_size={int(developerconfig.DATABASE_MMAP_SIZE)}")
+        connection.execute(f"PRAGMA cache_size=-{int(developerconfig.DATABASE_CACHE_SIZE)}")
+        return connection
+    
+    def _close_dead_thread_connections(self) -> None:
+        alive_threads = {thread.ident for thread in threading.enumerate()}
+        
+        for key in [key for key in self._connections if key[0] not in alive_threads]:
+            self._connections.pop(key).close()
+            
+    def get_connection(self, database_file: str=developerconfig.DATABASE_FILE) -> sqlite3.Connection:
+        """Returns the calling thread's connection to the database file, opening it if it does not exist yet.
+
+        Args:
+            database_file (str, optional): The database file. Defaults to developerconfig.DATABASE_FILE.
+
+        Returns:
+            sqlite3.Connection: The pooled connection.
+        """
+        key = (threading.get_ident(), database_file)
+        
+        with self._lock:
+            if key not in self._connections:
+                self._close_dead_thread_connections()
+                self._connections[key] = self._open_connection(database_file)
+            return self._connections[key]
+    
+    def get_thread_connections(self) -> list[sqlite3.Connection]:
+        """Returns every connection the calling thread has opened."""
+        with self._lock:
+            return [connection for key, connection in self._connections.items() if key[0] == threading.get_ident()]
+        
+    def close_connection(self, database_file: str=developerconfig.DATABASE_FILE) -> None:
+        """Commits and closes the calling thread's connection to the database file, if it has one. Connections of other threads are never touched, as they may be in use.
+
+        Args:
+            database_file (str, optional): The database file. Defaults to developerconfig.DATABASE_FILE.
+        """
+        with self._lock:
+            if connection := self._connections.pop((threading.get_ident(), database_file), None):
+                connection.commit()
+                connection.close()
+        
+    def close_all(self) -> None:
+        """Commits and closes every pooled connection. Only for shutdown, as connections of other threads are closed without waiting for them.
+
+        Raises:
+            RuntimeError: The database thread is still running.
+        """
+        if database_worker.is_running:
+            raise RuntimeError("Connections can only all be closed once the database thread has stopped. (database_worker.stop())")
+        
+        with self._lock:
+            for connection in self._connections.values():
+                connection.commit()
+                connection.close()
+            self._connections.clear()
+
+connection_pool = DGDatabaseConnectionPool()
+
+class DGDatabaseWorker:
+    """
+        Runs database work on one dedicated thread so the event loop is never blocked by SQLite.
+        Transactional work that queues up while the thread is busy is committed together in a single transaction.
+    """
+    
+    def __init__(self, max_batch_size: int=developerconfig.DATABASE_MAX_BATCH_SIZE):
+        self.max_batch_size = max_batch_size
+        
+        self._queue: queue.SimpleQueue[tuple[Callable[..., Any], tuple, dict, Future, bool] | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+    
+    @property
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+    
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if not self.is_running:
+                self._thread = threading.Thread(target=self._run, name="DGDatabaseWorker", daemon=True)
+                self._thread.start()
+    
+    def submit(self, func: Callable[..., _T], *args, transaction: bool=True, **kwargs) -> Future[_T]:
+        """Queues `func` to be called on the database thread.
+
+        Args:
+            func (Callable[..., _T]): The function to call. It may open any number of database sessions.
+            transaction (bool, optional): Weather the call may share a transaction with other queued calls. Pass False for work that manages the database file itself (backups, etc). Defaults to True.
+
+        Returns:
+            Future[_T]: A future that resolves once the work has been committed.
+        """
+        future: Future[_T] = Future()
+        self._ensure_thread()
+        self._queue.put((func, args, kwargs, future, transaction))
+        return future
+    
+    def stop(self) -> None:
+        """Commits any queued work and stops the database thread."""
+        if self.is_running and self._thread:
+            self._queue.put(None)
+            self._thread.join()
+    
+    def _run(self) -> None:
+        while (job := self._queue.get()) != None:
+            jobs = [job]
+            
+            while len(jobs) < self.max_batch_size:
+                try:
+                    if (next_job := self._queue.get_nowait()) == None:
+                        self._queue.put(None)
+                        break
+                    jobs.append(next_job)
+                except queue.Empty:
+                    break
+            
+            batch = []
+            for job in jobs:
+                if job[4] == True:
+                    batch.append(job)
+                    continue
+                
+                self._run_batch(batch)
+                batch = []
+                self._run_job(job)
+            self._run_batch(batch)
+            
+    def _run_job(self, job: tuple[Callable[..., Any], tuple, dict, Future, bool]) -> None:
+        func, args, kwargs, future, _ = job
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as error:
+                future.set_exception(error)
+    
+    def _run_batch(self, batch: list[tuple[Callable[..., Any], tuple, dict, Future, bool]]) -> None:
+        if not batch:
+            return
+        
+        connection = connection_pool.get_connection()
+        results: list[tuple[Future, bool, Any]] = []
+        
+        _batch_state.active, _batch_state.after_commit = True, []
+        try:
+            connection.commit()
+            connection.execute("BEGIN")
+            
+            for func, args, kwargs, future, _ in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                
+                connection.execute("SAVEPOINT dg_batch_job")
+                callbacks_before = len(_batch_state.after_commit)
+                try:
+                    results.append((future, True, func(*args, **kwargs)))
+                    connection.execute("RELEASE dg_batch_job")
+                except Exception as error:
+                    connection.execute("ROLLBACK TO dg_batch_job") # Only undo the work of the call that failed.
+                    connection.execute("RELEASE dg_batch_job")
+                    del _batch_state.after_commit[callbacks_before:]
+                    results.append((future, False, error))
+            
+            for thread_connection in connection_pool.get_thread_connections():
+                thread_connection.commit()
+            callbacks = _batch_state.after_commit
+                
+        except Exception as error:
+            connection.rollback()
+            results = [(job[3], False, error) for job in batch if not job[3].cancelled()]
+            callbacks = []
+        finally:
+            _batch_state.active, _batch_state.after_commit = False, []
+        
+        _run_after_commit(callbacks) # Before the futures resolve, so callers see the updated caches.
+        for future, succeeded, result in results:
+            future.set_result(result) if succeeded else future.set_exception(result)
+
+database_worker = DGDatabaseWorker()
+
+async def run_async(func: Callable[..., _T], *args, transaction: bool=True, **kwargs) -> _T:
+    """Runs `func` on the database thread and waits for the result without blocking the event loop. The synchronous API is still available for scripts.
+
+    Args:
+        func (Callable[..., _T]): The function to call.
+        transaction (bool, optional): Weather the call may share a transaction with other queued calls. Defaults to True.
+
+    Returns:
+        _T: Whatever `func` returned.
+    """
+    return await asyncio.wrap_future(database_worker.submit(func, *args, transaction=transaction, **kwargs))
+
+async def backup_async(database: str=developerconfig.DATABASE_FILE) -> str:
+    """Backs up the database on a separate thread, so neither the event loop nor the database thread wait for the copy.
+
+    Args:
+        database (str, optional): The database that will be backed up. Defaults to developerconfig.DATABASE_FILE.
+
+    Returns:
+        str: The path where the backup is.
+    """
+    def _backup() -> str:
+        with DGDatabaseSession(database) as backup_session:
+            return backup_session.backup_database()
+    return await asyncio.to_thread(_backup)
+
+def _get_file_checksum(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
 # TODO: Data transfer to new database file (use .check() and detect if a table is missing and replace with parameters that will be specified in a dictionary)
 class DGDatabaseSession:
     """
@@ -28,9 +283,8 @@ class DGDatabaseSession:
         return self
     
     def __exit__(self, type_, value_, traceback_):
-        self.database.commit()
+        self._commit()
         self.cursor.close() if self.cursor else None
-        self.database.close()
     
     def __init__(self, database: str=developerconfig.DATABASE_FILE, reset_if_failed_check: bool=True):
         """Handles connections between the database and the client.
@@ -41,19 +295,20 @@ class DGDatabaseSession:
         """
 
         self._context_manager_reset = reset_if_failed_check
-        self._required_tables = ["history", "model_rules", "guild_configs", "database_file", "permissions"]
+        self._required_tables = ["history", "history_entries", "model_rules", "guild_configs", "database_file", "permissions"]
         
         self.database_file = database
         self.database_file_backup = self.database_file.replace(os.path.splitext(self.database_file)[-1], ".sqlite3")
-        self.database: sqlite3.Connection = sqlite3.connect(self.database_file, timeout=60)
-        self.cursor: sqlite3.Cursor | None = self.database.cursor()
+        self.database: sqlite3.Connection = connection_pool.get_connection(self.database_file)
+        self.cursor: sqlite3.Cursor | None = None
 
+    def _commit(self) -> None:
+        """Commits the connection, unless this session is running inside a batch on the database thread. The batch is committed as a whole instead."""
+        if not _commits_are_deferred():
+            self.database.commit()
+            
     def table_exists(self, table: str) -> bool:
-        try:
-            __has_table = self._exec_db_command("SELECT * FROM {}".format(table))
-            return True
-        except sqlite3.OperationalError:
-            return False
+        return bool(self._exec_db_command("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)))
         
     def check(self, fix_if_broken: bool=True, warn_if_fixable_corruption: bool=True, warn_if_incompatible_versions: bool=False) -> bool:
         """Checks if all required tables exist and the version is correct for normal bot usage.
@@ -62,6 +317,7 @@ class DGDatabaseSession:
             bool: Weather the check succeeded or failed.
         """
         try:
+            self.migrate()
             version = self.get_version()
             if version != developerconfig.DATABASE_VERSION and warn_if_incompatible_versions == True:
                 common.warn_for_error(f"Database version is different than specified. (Needs: {developerconfig.DATABASE_VERSION} Has: {version})")
@@ -93,12 +349,51 @@ class DGDatabaseSession:
 
         fetched = self.cursor.execute(query, args).fetchall()
 
-        self.database.commit()
+        self._commit()
         self.cursor.close()
         self.cursor = None
 
         return fetched
     
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Runs every database command within the block as a single transaction. If the block raises, none of them are applied."""
+        deferred, _batch_state.active = _commits_are_deferred(), True # Sessions commit after every command otherwise.
+        if deferred == False:
+            _batch_state.after_commit = []
+        callbacks_before = len(_batch_state.after_commit)
+        
+        self.database.execute("SAVEPOINT dg_transaction")
+        try:
+            yield
+        except BaseException:
+            self.database.execute("ROLLBACK TO dg_transaction")
+            del _batch_state.after_commit[callbacks_before:]
+            raise
+        finally:
+            self.database.execute("RELEASE dg_transaction")
+            _batch_state.active = deferred
+        self._commit()
+        
+        if deferred == False: # Otherwise the enclosing batch or transaction runs them once it commits.
+            callbacks, _batch_state.after_commit = _batch_state.after_commit, []
+            _run_after_commit(callbacks)
+    
+    def _exec_many_db_command(self, query: str, args: Iterable[tuple]) -> None:
+        """Execute an SQLite3 database command once for every set of values, in one transaction.
+
+        Args:
+            query (str): The SQLite3 database command.
+            args (Iterable[tuple]): The variable values of each execution.
+        """
+        
+        self.cursor = self.database.cursor()
+        self.cursor.executemany(query, args)
+
+        self._commit()
+        self.cursor.close()
+        self.cursor = None
+    
     def init(self, override: bool=False) -> None:
         """Creates tables required for normal bot operation."""
         
@@ -134,7 +429,11 @@ class DGDatabaseSession:
             } 
         """
         
-        self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} history (uid TEXT NOT NULL, author_id INTEGER NOT NULL, chat_name VARCHAR(40) NOT NULL, chat_json TEXT NOT NULL, is_private INTEGER CHECK (is_private IN (0,1)))")
+        self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} history (id INTEGER PRIMARY KEY, uid TEXT NOT NULL, author_id INTEGER NOT NULL, chat_name VARCHAR(40) NOT NULL, is_private INTEGER CHECK (is_private IN (0,1)))")
+        self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} history_entries (history_id TEXT NOT NULL, seq INTEGER NOT NULL, entry_json TEXT NOT NULL, PRIMARY KEY (history_id, seq)) WITHOUT ROWID")
+        self._exec_db_command("CREATE INDEX IF NOT EXISTS history_uid ON history (uid)")
+        self._exec_db_command("CREATE INDEX IF NOT EXISTS history_author_id ON history (author_id)")
+        self.create_search_table()
         self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} model_rules (gid INTEGER NOT NULL UNIQUE, jsontables TEXT NOT NULL)")
         self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} guild_configs (gid INTEGER NOT NULL UNIQUE, oid INTEGER NOT NULL, json TEXT NOT NULL)")
         self._exec_db_command(f"CREATE TABLE {'IF NOT EXISTS' if override == False else ''} database_file (version TEXT NOT NULL, creation_date INTEGER NOT NULL)")
@@ -151,12 +450,32 @@ class DGDatabaseSession:
         
         for table in self._required_tables:
             self._exec_db_command(f"DROP TABLE IF EXISTS {table}") # I know. Do not say it.
+        self._exec_db_command("DROP TABLE IF EXISTS history_search")
+    
+    def create_search_table(self) -> bool:
+        """Creates the full-text search index of saved chats, `history_search`. It is optional, as not every SQLite build has FTS5.
+
+        Returns:
+            bool: Weather the index exists.
+        """
+        try:
+            self._exec_db_command("CREATE VIRTUAL TABLE IF NOT EXISTS history_search USING fts5(history_id, chat_name, transcript)")
+            return True
+        except sqlite3.OperationalError: # SQLite was built without FTS5. Searches fall back to chat names.
+            return False
     
     def reset(self) -> None:
         """Resets the database contents to default (Zero items) This is shorthand for delete() then init()"""
         self.delete()
         self.init(override=True)
     
+    def migrate(self) -> None:
+        """Updates the database file from older database versions, one version at a time. Each update is applied as a single transaction."""
+        while migration := _migrations.get(version := self.get_version()):
+            common.send_info_text(f"Updating database from version {version}..")
+            with self.transaction():
+                migration(self)
+    
     def get_version(self) -> str:
         """Gets database version."""
         try:
@@ -178,33 +497,156 @@ class DGDatabaseSession:
         """Gets the seconds since the database was created."""
         return common.get_posix() - self.get_creation_date() 
     
+    def get_backups(self) -> list[str]:
+        """Gets the backups in `developerconfig.DATABASE_BACKUP_DIRECTORY`, oldest first.
+
+        Returns:
+            list[str]: The paths of the backups.
+        """
+        if not os.path.isdir(developerconfig.DATABASE_BACKUP_DIRECTORY):
+            return []
+        
+        # Backup names start with a sortable timestamp, so sorting by name sorts by age.
+        return [os.path.join(developerconfig.DATABASE_BACKUP_DIRECTORY, name) for name in sorted(os.listdir(developerconfig.DATABASE_BACKUP_DIRECTORY)) if name.startswith(f"{developerconfig.DATABASE_FILENAME}-") and name.endswith((".sqlite3", ".sqlite3.gz"))]
+    
     def backup_database(self) -> str:
-        """Backs up the database by simply copy and pasting the file.
+        """Backs up the database with the SQLite online backup API, `developerconfig.DATABASE_BACKUP_PAGES_PER_STEP` pages at a time, so other connections can use the database in between.
+        The backup is timestamped, optionally compressed and checksummed, and only the newest `developerconfig.DATABASE_BACKUP_KEEP` backups are kept.
+        This can take a while with large databases. Use `backup_async` from the event loop.
 
         Returns:
             str: The path where the backup is.
         """
-        shutil.copy(self.database_file, self.database_file_backup)
-        return self.database_file_backup
-    
-    # TODO: Test saving and loading of backups.
+        self._commit()
+        os.makedirs(developerconfig.DATABASE_BACKUP_DIRECTORY, exist_ok=True)
+        
+        backup_time = time.time()
+        backup_name = f"{developerconfig.DATABASE_FILENAME}-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(backup_time))}-{int(backup_time % 1 * 1_000_000):06d}" # Microseconds, so backups made in the same second don't replace each other.
+        backup_file = os.path.join(developerconfig.DATABASE_BACKUP_DIRECTORY, f"{backup_name}.sqlite3")
+
+        backups = self.get_backups()
+        newest_backup = os.path.basename(backups[-1]) if backups else ""
+        suffix = 1
+        while (newest_backup.startswith(backup_name) and os.path.basename(backup_file) <= newest_backup) or any(os.path.exists(f"{backup_file}{extension}") for extension in (".tmp", ".gz.tmp")): # Clocks on some systems are too coarse for microseconds to be unique.
+            backup_file = os.path.join(developerconfig.DATABASE_BACKUP_DIRECTORY, f"{backup_name}_{suffix:03d}.sqlite3") # "_" sorts after ".", so rotation still sees these as newer.
+            suffix += 1
+        temporary_file = f"{backup_file}.tmp"
+        
+        with contextlib.closing(sqlite3.connect(temporary_file)) as target:
+            self.database.backup(target, pages=developerconfig.DATABASE_BACKUP_PAGES_PER_STEP) # Unlike a file copy, this can never copy a page that is half written.
+        
+        if developerconfig.DATABASE_BACKUP_COMPRESS == True:
+            backup_file += ".gz"
+            with open(temporary_file, "rb") as uncompressed, gzip.open(f"{backup_file}.tmp", "wb") as compressed:
+                shutil.copyfileobj(uncompressed, compressed)
+            os.remove(temporary_file)
+            temporary_file = f"{backup_file}.tmp"
+        
+        if developerconfig.DATABASE_BACKUP_CHECKSUM == True:
+            with open(f"{backup_file}.sha256", "w") as checksum_file:
+                checksum_file.write(f"{_get_file_checksum(temporary_file)}  {os.path.basename(backup_file)}\n") # Same format as `sha256sum`, so backups can be checked by hand.
+        os.replace(temporary_file, backup_file) # Backups only ever appear complete.
+        
+        for old_backup in self.get_backups()[:-max(developerconfig.DATABASE_BACKUP_KEEP, 1)]:
+            os.remove(old_backup)
+            if os.path.isfile(f"{old_backup}.sha256"):
+                os.remove(f"{old_backup}.sha256")
+        return backup_file
     
-    def load_database_backup(self) -> str:  
-        """Loads the database backup. This includes doing the check() method on it (Version checking, table checking, etc)
+    def load_database_backup(self, backup_file: str | None=None) -> str:  
+        """Loads a database backup. Its checksum is verified (If it has one), then the check() method is done on it (Version checking, table checking, etc) before it replaces the database.
+        The backup is copied into the live database with the SQLite backup API as one transaction, so sessions that are already open on other threads keep working and see the loaded backup.
+
+        Args:
+            backup_file (str | None, optional): The backup to load. Defaults to None. (The newest backup)
 
         Raises:
-            sqlite3.DatabaseError: If the database is corrupted at all (check() Fails)
+            sqlite3.DatabaseError: If there is no backup, the checksum does not match or the database is corrupted at all (check() Fails)
 
         Returns:
             str: The path of the backup that was used.
         """
-        with DGDatabaseSession(self.database_file_backup, False) as db_backup:
-            if db_backup.check() == True:
-                os.remove(self.database_file)
-                shutil.copy(self.database_file_backup, self.database_file)
+        if backup_file == None:
+            backups = self.get_backups()
+            backup_file = backups[-1] if backups else self.database_file_backup # Backups made before rotation were kept next to the database file.
             
-                return self.database_file_backup
-            raise sqlite3.DatabaseError(errors.DatabaseErrors.DATABASE_CORRUPTED, self.database_file_backup)
+        if not os.path.isfile(backup_file):
+            raise sqlite3.DatabaseError(errors.DatabaseErrors.NO_BACKUP, backup_file)
+        
+        if os.path.isfile(f"{backup_file}.sha256"):
+            with open(f"{backup_file}.sha256", errors="replace") as checksum_file:
+                expected_checksum = checksum_file.read().split()[:1] # Empty or garbled checksum files count as a mismatch.
+            if expected_checksum != [_get_file_checksum(backup_file)]:
+                raise sqlite3.DatabaseError(errors.DatabaseErrors.BACKUP_CHECKSUM_MISMATCH, backup_file)
+        
+        restored_file = f"{self.database_file}.restore"
+        try:
+            try:
+                with (gzip.open(backup_file, "rb") if backup_file.endswith(".gz") else open(backup_file, "rb")) as backup, open(restored_file, "wb") as restored:
+                    shutil.copyfileobj(backup, restored)
+                
+                with DGDatabaseSession(restored_file, False) as db_backup:
+                    backup_is_valid = db_backup.check()
+            except (sqlite3.DatabaseError, gzip.BadGzipFile, EOFError): # Not an SQLite database (Or gzip file) at all.
+                backup_is_valid = False
+            
+            if backup_is_valid == True:
+                self._commit()
+                connection_pool.get_connection(restored_file).backup(self.database) # One write transaction. Other connections are never closed, they read the loaded pages next time.
+        finally:
+            connection_pool.close_connection(restored_file)
+            for restored_part in (restored_file, f"{restored_file}-wal", f"{restored_file}-shm"):
+                if os.path.isfile(restored_part):
+                    os.remove(restored_part)
+            
+        if backup_is_valid == True:
+            return backup_file
+        raise sqlite3.DatabaseError(errors.DatabaseErrors.DATABASE_CORRUPTED, backup_file)
+
+def _migrate_history_entries(session: DGDatabaseSession) -> None:
+    """1.0.2 -> 1.0.3: Moves each saved chat out of the `history.chat_json` blob into one `history_entries` row per turn, and indexes `history`."""
+    session._exec_db_command("CREATE TABLE IF NOT EXISTS history_entries (history_id TEXT NOT NULL, seq INTEGER NOT NULL, entry_json TEXT NOT NULL, PRIMARY KEY (history_id, seq)) WITHOUT ROWID")
+    cursor = session.database.cursor()
+    
+    for history_id, chat_json in cursor.execute("SELECT uid, chat_json FROM history"):
+        session._exec_many_db_command("INSERT OR IGNORE INTO history_entries VALUES(?, ?, ?)", ((history_id, seq, json.dumps(entry)) for seq, entry in enumerate(json.loads(chat_json))))
+    cursor.close()
+    
+    session._exec_db_command("CREATE TABLE history_migrated (uid TEXT NOT NULL, author_id INTEGER NOT NULL, chat_name VARCHAR(40) NOT NULL, is_private INTEGER CHECK (is_private IN (0,1)))")
+    session._exec_db_command("INSERT INTO history_migrated SELECT uid, author_id, chat_name, is_private FROM history")
+    session._exec_db_command("DROP TABLE history")
+    session._exec_db_command("ALTER TABLE history_migrated RENAME TO history")
+    session._exec_db_command("CREATE INDEX history_uid ON history (uid)")
+    session._exec_db_command("CREATE INDEX history_author_id ON history (author_id)")
+    session._exec_db_command("UPDATE database_file SET version=?", ("1.0.3",))
+
+def _migrate_history_search(session: DGDatabaseSession) -> None:
+    """1.0.3 -> 1.0.4: Creates the full-text search index of saved chats and indexes every chat already saved."""
+    from . import history # history imports this module, so it cannot be imported at the top.
+    
+    if session.create_search_table():
+        cursor = session.database.cursor()
+        
+        for history_id, chat_name in cursor.execute("SELECT uid, chat_name FROM history"):
+            session._exec_db_command("INSERT INTO history_search VALUES(?, ?, ?)", (history_id, chat_name, history.get_chat_search_text(history.DGHistorySession.iter_chat_entries(session, history_id))))
+        cursor.close()
+    session._exec_db_command("UPDATE database_file SET version=?", ("1.0.4",))
+
+def _migrate_history_ids(session: DGDatabaseSession) -> None:
+    """1.0.4 -> 1.0.5: Gives `history` an `id INTEGER PRIMARY KEY`, so the order chats were saved in survives a VACUUM. (Which may renumber an implicit rowid)"""
+    session._exec_db_command("CREATE TABLE history_migrated (id INTEGER PRIMARY KEY, uid TEXT NOT NULL, author_id INTEGER NOT NULL, chat_name VARCHAR(40) NOT NULL, is_private INTEGER CHECK (is_private IN (0,1)))")
+    session._exec_db_command("INSERT INTO history_migrated (id, uid, author_id, chat_name, is_private) SELECT rowid, uid, author_id, chat_name, is_private FROM history")
+    session._exec_db_command("DROP TABLE history")
+    session._exec_db_command("ALTER TABLE history_migrated RENAME TO history")
+    session._exec_db_command("CREATE INDEX history_uid ON history (uid)")
+    session._exec_db_command("CREATE INDEX history_author_id ON history (author_id)")
+    session._exec_db_command("UPDATE database_file SET version=?", ("1.0.5",))
+
+_migrations: dict[str, Callable[[DGDatabaseSession], None]] = {
+    "1.0.2": _migrate_history_entries,
+    "1.0.3": _migrate_history_search,
+    "1.0.4": _migrate_history_ids
+} # The version a database file has, and the function that updates it to the next version.
 
 _get_ids_as_list = lambda db_reply : [gid[0] for gid in db_reply]
 class DGDatabaseManager(DGDatabaseSession):
@@ -233,10 +675,47 @@ class DGDatabaseManager(DGDatabaseSession):
         
     def check_if_guild_in_all(self, guild_id: discord.Guild | int):
         gid = guild_id.id if isinstance(guild_id, discord.Guild) else int(guild_id)
-        gid_is_in_all_tables: bool = len([ids for ids in [self.get_guilds_in_models(), self.get_guilds_in_config(), self.get_guilds_in_config()] if gid in ids]) == 3
+        gid_is_in_all_tables: bool = len([ids for ids in [self.get_guilds_in_models(), self.get_guilds_in_config(), self.get_guilds_in_permissions()] if gid in ids]) == 3
         
         return gid_is_in_all_tables
     
+    def get_missing_guilds(self, guilds: Iterable[discord.Guild | int]) -> dict[str, set[int]]:
+        """Finds which of the given guilds are missing from each required guild table. Every table is only read once, however many guilds are given.
+
+        Args:
+            guilds (Iterable[discord.Guild | int]): The guilds (Or guild IDs) to look for.
+
+        Returns:
+            dict[str, set[int]]: The IDs of the guilds missing from each table. (model_rules, guild_configs and permissions)
+        """
+        guild_ids = {guild.id if isinstance(guild, discord.Guild) else int(guild) for guild in guilds}
+        
+        return {
+            "model_rules": guild_ids.difference(self.get_guilds_in_models()),
+            "guild_configs": guild_ids.difference(self.get_guilds_in_config()),
+            "permissions": guild_ids.difference(self.get_guilds_in_permissions())
+        }
+    
+    def add_missing_guilds(self, guilds: Iterable[discord.Guild | int]) -> set[int]:
+        """Adds the given guilds to every required guild table they are missing from. All of the rows are inserted in a single transaction.
+
+        Args:
+            guilds (Iterable[discord.Guild | int]): The guilds (Or guild IDs) that should be in the database.
+
+        Returns:
+            set[int]: The IDs of the guilds that were missing from at least one table.
+        """
+        missing = self.get_missing_guilds(guilds)
+        default_config = json.dumps(generate_config_key())
+        default_permissions = json.dumps(developerconfig.default_permission_keys)
+        
+        with self.transaction():
+            self._exec_many_db_command("INSERT OR IGNORE INTO model_rules VALUES(?, ?)", ((gid, json.dumps({})) for gid in missing["model_rules"]))
+            self._exec_many_db_command("INSERT OR IGNORE INTO guild_configs VALUES(?, ?, ?)", ((gid, 0, default_config) for gid in missing["guild_configs"]))
+            self._exec_many_db_command("INSERT OR IGNORE INTO permissions VALUES(?, ?)", ((gid, default_permissions) for gid in missing["permissions"]))
+        
+        return set().union(*missing.values())
+    
     # TODO: Make function that lists all guilds within `permissions` table in database. This is done for database integrity checking in joe.py
     
     def create_model_rules_schema(self, guild_id: int) -> None:
@@ -308,9 +787,77 @@ def check_and_get_yaml(yaml_file: str=developerconfig.CONFIG_FILE, check_against
     else:        
         return fix_config(yaml_file, check_against)
     
+class DGConfigStore:
+    """Process-wide cache of a YAML configuration file. The file is only parsed again once it has changed on disk."""
+    
+    def __init__(self, yaml_file: str=developerconfig.CONFIG_FILE, check_against: dict=developerconfig.default_config_keys, check_interval: float=developerconfig.CONFIG_CHECK_INTERVAL):
+        """Caches a YAML configuration file in memory.
+
+        Args:
+            yaml_file (str, optional): The YAML file that will be cached. Defaults to developerconfig.CONFIG_FILE.
+            check_against (dict, optional): The default keys the file is validated against. Defaults to developerconfig.default_config_keys.
+            check_interval (float, optional): How many seconds to wait between checks for changes on disk. Defaults to developerconfig.CONFIG_CHECK_INTERVAL.
+        """
+        self.yaml_file = yaml_file
+        self.check_against = check_against
+        self.check_interval = check_interval
+        
+        self._lock = threading.Lock()
+        self._config: dict[str, Any] | None = None
+        self._signature: tuple[int, int, int] | None = None
+        self._last_checked = 0.0
+    
+    def _get_file_signature(self) -> tuple[int, int, int] | None:
+        try:
+            file_stat = os.stat(self.yaml_file)
+            return (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+        except OSError:
+            return None
+    
+    def _load(self) -> dict[str, Any]:
+        self._config = check_and_get_yaml(self.yaml_file, self.check_against)
+        self._signature = self._get_file_signature()
+        self._last_checked = time.monotonic()
+        return self._config
+    
+    def reload(self) -> dict[str, Any]:
+        """Parses the YAML file again, regardless of if it has changed.
+
+        Returns:
+            dict[str, Any]: The new configuration.
+        """
+        with self._lock:
+            return self._load()
+        
+    def get(self) -> dict[str, Any]:
+        """Returns the cached configuration. The file is only stat'd once every `check_interval` seconds, and only parsed again if it has changed.
+
+        Returns:
+            dict[str, Any]: The configuration.
+        """
+        with self._lock:
+            if self._config == None:
+                return self._load()
+            
+            if time.monotonic() - self._last_checked >= self.check_interval:
+                self._last_checked = time.monotonic()
+                if self._get_file_signature() != self._signature:
+                    return self._load()
+            return self._config
+
+_config_store = DGConfigStore()
+
+def reload_config() -> dict[str, Any]:
+    """Reloads the bot-config.yaml file without restarting the bot.
+
+    Returns:
+        dict[str, Any]: The new configuration.
+    """
+    return _config_store.reload()
+
 def get_config(key: str) -> Any:
     
-    local_config = check_and_get_yaml()
+    local_config = _config_store.get()
     if key in local_config:
         return local_config.get(key)
     elif hasattr(developerconfig, key.upper()):
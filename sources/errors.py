@@ -15,6 +15,8 @@ class GenericErrors:
 
 class DatabaseErrors:
     DATABASE_CORRUPTED = "Database has been corrupted."
+    NO_BACKUP = "There is no database backup to load."
+    BACKUP_CHECKSUM_MISMATCH = "The database backup does not match its checksum. It may be incomplete or corrupted."
     
 class ConversationErrors:
     """Errors pertaining to general conversations."""
@@ -62,6 +64,7 @@ class HistoryErrors:
     HISTORY_DOESNT_EXIST = "No history with the specified name."
     HISTORY_EMPTY = "No chat history."
     HISTORY_NOT_USERS = "This saved chat history is private."
+    UNKNOWN_ENTRY_FORMAT = "This saved chat history was saved by a newer version of the bot, and cannot be read."
 
 class ModelErrors:
     """Errors pertaining to the model lock list."""
@@ -1,15 +1,21 @@
 """Module for anything ralating to conversation storage"""
 from __future__ import annotations
-import json, typing
+import json, typing, zlib
 from . import (
     database, 
     exceptions,
     errors
 )    
+from .common import (
+    developerconfig
+)
     
 __all__ = [
     "DGHistoryChat",
-    "DGHistorySession"
+    "DGHistorySession",
+    "encode_chat_entry",
+    "decode_chat_entry",
+    "get_chat_search_text"
 ]
 
 if typing.TYPE_CHECKING:
@@ -17,14 +23,70 @@ if typing.TYPE_CHECKING:
         chat
     )
 
+HISTORY_ENTRY_FORMAT = 1 # The first byte of every encoded turn. Turns stored as plain JSON text (Saved before compression) have no format byte.
+
+# Deflate preset dictionary of format 1. Each turn is compressed on its own, so without it the keys repeated in every turn would never be shared. Never change it; add a new format instead.
+_ENTRY_DICTIONARY_V1 = b'[{"reader_content":"","image_urls":["https://"]},{"reply":""}][{"image":"https://"},{"image_return":"https://"}][{"content":""},{"content":""}]'
+
+def encode_chat_entry(entry: list) -> bytes:
+    """Encodes a turn of a chat for storage, as compressed JSON prefixed with the format version.
+
+    Args:
+        entry (list): The turn. (The query and the reply)
+
+    Returns:
+        bytes: The encoded turn.
+    """
+    compressor = zlib.compressobj(developerconfig.HISTORY_COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_ENTRY_DICTIONARY_V1)
+    return bytes((HISTORY_ENTRY_FORMAT,)) + compressor.compress(json.dumps(entry, separators=(",", ":")).encode()) + compressor.flush()
+
+def decode_chat_entry(payload: bytes | str) -> list:
+    """Decodes a stored turn of a chat. Turns saved before compression (Plain JSON text) are decoded too.
+
+    Args:
+        payload (bytes | str): The stored turn.
+
+    Raises:
+        HistoryError: The turn was encoded in a format this version does not know.
+
+    Returns:
+        list: The turn. (The query and the reply)
+    """
+    if isinstance(payload, str):
+        return json.loads(payload)
+    
+    if payload[0] == 1:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_ENTRY_DICTIONARY_V1)
+        return json.loads(decompressor.decompress(payload[1:]) + decompressor.flush())
+    raise exceptions.HistoryError(errors.HistoryErrors.UNKNOWN_ENTRY_FORMAT)
+
+def get_chat_search_text(entries: typing.Iterable[list]) -> str:
+    """Joins the text of every turn of a chat, for the full-text search index.
+
+    Args:
+        entries (typing.Iterable[list]): The turns of the chat.
+
+    Returns:
+        str: The text, one query or reply per line.
+    """
+    lines = []
+    for query, reply in entries:
+        lines.extend(str(text) for text in (query.get("content") or query.get("reader_content") or query.get("image"), reply.get("content") or reply.get("reply")) if text)
+    return "\n".join(lines)
+
+def _to_search_query(terms: str) -> str:
+    # Every word is quoted, so FTS5 query syntax typed by users is searched for as text. Only chat names and transcripts are searched, not IDs.
+    return "{chat_name transcript} : (" + " ".join('"' + term.replace('"', '""') + '"' for term in terms.split()) + ")"
+
 class DGHistoryChat:
+    """A saved chat. Only the details of the chat are loaded, its turns are read and decoded when `data` is first accessed."""
     
     def __init__(self, data: list):
         self._id: str = data[0]
         self._user: int = data[1]
         self._name: str = data[2]
-        self._data: dict = json.loads(data[3])
-        self._private: bool = data[4]
+        self._private: bool = data[3]
+        self._data: list[list] | None = None
         
     @property
     def history_id(self) -> str:
@@ -38,13 +100,17 @@ class DGHistoryChat:
     def name(self) -> str:
         return self._name
 
-    @property
-    def data(self) -> dict:
-        return self._data
-
     @property
     def private(self) -> bool:
         return self._private
+    
+    @property
+    def data(self) -> list[list]:
+        """Every turn of the chat. The first access reads them from the database, so it should be done off the event loop. For long chats, prefer `DGHistorySession.iter_chat_entries`."""
+        if self._data == None:
+            with DGHistorySession() as history_session:
+                self._data = list(history_session.iter_chat_entries(self._id))
+        return self._data
  
 class DGHistorySession(database.DGDatabaseSession):
 
@@ -56,8 +122,7 @@ class DGHistorySession(database.DGDatabaseSession):
         return self
 
     def __exit__(self, type_, value_, traceback_):
-        self.database.commit()
-        self.database.close()
+        self._commit()
 
     def __init__(self):
         """
@@ -69,7 +134,10 @@ class DGHistorySession(database.DGDatabaseSession):
         if history_id == None and user_id == None:
             raise TypeError("At least either history_id or user_id must be a string, or stringlike.")
         
-        data = self._exec_db_command("SELECT * FROM history WHERE uid=? OR author_id=?", (str(history_id),str(user_id),))
+        # Two indexed lookups, rather than `uid=? OR author_id=?` which scans the whole table.
+        data = self._exec_db_command("SELECT uid, author_id, chat_name, is_private FROM history WHERE uid=? LIMIT 1", (str(history_id),)) if history_id != None else []
+        if not data and user_id != None:
+            data = self._exec_db_command("SELECT uid, author_id, chat_name, is_private FROM history WHERE author_id=? LIMIT 1", (str(user_id),))
         if data:
             return DGHistoryChat(data[0])
     
@@ -77,19 +145,113 @@ class DGHistorySession(database.DGDatabaseSession):
         if not isinstance(user_id, str):
             raise TypeError("user_id must be a string or stringlike")
         
-        data = self._exec_db_command("SELECT * FROM history WHERE author_id=?", (str(user_id),))
+        data = self._exec_db_command("SELECT uid, author_id, chat_name, is_private FROM history WHERE author_id=?", (str(user_id),))
         
         if data:
             return [DGHistoryChat(history_ent) for history_ent in data]
         return []
     
+    def retrieve_user_histories_page(self, user_id: str, after: int=0, page_size: int=developerconfig.HISTORY_LIST_PAGE_SIZE) -> tuple[list[DGHistoryChat], int | None]:
+        """Gets one page of a users saved chats, oldest first. Pages are found by position rather than offset, so every page costs the same.
+
+        Args:
+            user_id (str): The ID of the user.
+            after (int, optional): The position returned with the previous page. Defaults to 0. (The first page)
+            page_size (int, optional): How many chats are on each page. Defaults to developerconfig.HISTORY_LIST_PAGE_SIZE.
+
+        Returns:
+            tuple[list[DGHistoryChat], int | None]: The chats, and the position the next page starts after. (`None` if this is the last page)
+        """
+        # The `history_author_id` index is ordered by (author_id, id), so this reads only the rows on the page.
+        data = self._exec_db_command("SELECT uid, author_id, chat_name, is_private, id FROM history WHERE author_id=? AND id > ? ORDER BY id LIMIT ?", (str(user_id), after, page_size + 1))
+        return [DGHistoryChat(history_ent) for history_ent in data[:page_size]], (data[page_size - 1][4] if len(data) > page_size else None)
+    
+    def count_user_histories(self, user_id: str) -> int:
+        """Counts a users saved chats, from the `history_author_id` index alone.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: How many chats the user has saved.
+        """
+        return int(self._exec_db_command("SELECT COUNT(*) FROM history WHERE author_id=?", (str(user_id),))[0][0])
+    
+    def iter_chat_entries(self, history_id: str) -> typing.Iterator[list]:
+        """Yields each turn of a saved chat in order. Turns are read from the database one at a time, so the whole chat is never in memory at once.
+
+        Args:
+            history_id (str): The ID of the saved chat.
+
+        Yields:
+            list: The turn. (The query and the reply)
+        """
+        cursor = self.database.cursor()
+        try:
+            for entry_json, in cursor.execute("SELECT entry_json FROM history_entries WHERE history_id=? ORDER BY seq", (history_id,)):
+                yield decode_chat_entry(entry_json)
+        finally:
+            cursor.close()
+    
     def delete_chat_history(self, history_id: str) -> str:
         if self.retrieve_chat_history(history_id):
-            self._exec_db_command("DELETE FROM history WHERE uid=?", (history_id,))
+            with self.transaction():
+                self._exec_db_command("DELETE FROM history_entries WHERE history_id=?", (history_id,))
+                if self.table_exists("history_search"):
+                    self._exec_db_command("DELETE FROM history_search WHERE history_search MATCH ?", ('history_id : "' + history_id.replace('"', '""') + '"',))
+                self._exec_db_command("DELETE FROM history WHERE uid=?", (history_id,))
             return f"Deleted chat history with ID: {history_id}"
         raise exceptions.HistoryError(errors.HistoryErrors.HISTORY_DOESNT_EXIST)
     
-    def upload_chat_history(self, chat: chat.DGChat) -> list:
-        json_dump = json.dumps(chat.context._display_context)
-        return self._exec_db_command("INSERT INTO history VALUES(?, ?, ?, ?, ?)", (chat.hid, chat.member.id, chat.name, json_dump, int(chat.private)))
+    def upload_chat_history(self, chat: chat.DGChat) -> None:
+        with self.transaction():
+            self._exec_db_command("INSERT INTO history (uid, author_id, chat_name, is_private) VALUES(?, ?, ?, ?)", (chat.hid, chat.member.id, chat.name, int(chat.private)))
+            self._exec_many_db_command("INSERT INTO history_entries VALUES(?, ?, ?)", ((chat.hid, seq, encode_chat_entry(entry)) for seq, entry in enumerate(chat.context._display_context)))
+            if self.table_exists("history_search"):
+                self._exec_db_command("INSERT INTO history_search VALUES(?, ?, ?)", (chat.hid, chat.name, get_chat_search_text(chat.context._display_context)))
+    
+    def search_chat_histories(self, terms: str, user_id: int, page: int=1, page_size: int=developerconfig.HISTORY_SEARCH_PAGE_SIZE) -> list[tuple[DGHistoryChat, str]]:
+        """Searches saved chats for words, best matches first. Private chats are only searched if they belong to `user_id`.
+        If SQLite was built without FTS5, only chat names are searched.
+
+        Args:
+            terms (str): The words to search for.
+            user_id (int): The ID of the user searching.
+            page (int, optional): The page of results, starting at 1. Defaults to 1.
+            page_size (int, optional): How many results are on each page. Defaults to developerconfig.HISTORY_SEARCH_PAGE_SIZE.
+
+        Returns:
+            list[tuple[DGHistoryChat, str]]: The matching chats, each with a snippet of the matching text.
+        """
+        if not terms.split():
+            return []
+        
+        offset = (max(page, 1) - 1) * page_size
+        if self.table_exists("history_search"):
+            rows = self._exec_db_command("""SELECT history.uid, history.author_id, history.chat_name, history.is_private, snippet(history_search, -1, '**', '**', '...', 16)
+                FROM history_search JOIN history ON history.uid = history_search.history_id
+                WHERE history_search MATCH ? AND (history.is_private = 0 OR history.author_id = ?)
+                ORDER BY history_search.rank LIMIT ? OFFSET ?""", (_to_search_query(terms), user_id, page_size, offset))
+        else:
+            pattern = "%" + terms.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            rows = self._exec_db_command("SELECT uid, author_id, chat_name, is_private, chat_name FROM history WHERE chat_name LIKE ? ESCAPE '\\' AND (is_private = 0 OR author_id = ?) ORDER BY id DESC LIMIT ? OFFSET ?", (pattern, user_id, page_size, offset))
+            
+        return [(DGHistoryChat(row), row[4]) for row in rows]
+    
+    def compress_chat_entries(self, after: tuple[str, int]=("", -1), batch_size: int=developerconfig.HISTORY_COMPRESSION_BATCH_SIZE) -> tuple[int, tuple[str, int] | None]:
+        """Encodes one batch of turns that were saved as plain JSON text, in a single transaction. Call it again with the returned position until it returns `None`.
+
+        Args:
+            after (tuple[str, int], optional): The (history_id, seq) of the last turn already looked at. Defaults to ("", -1).
+            batch_size (int, optional): How many turns to look at. Defaults to developerconfig.HISTORY_COMPRESSION_BATCH_SIZE.
+
+        Returns:
+            tuple[int, tuple[str, int] | None]: How many turns were encoded, and the position to continue from. (`None` if every turn has been looked at)
+        """
+        with self.transaction():
+            rows = self._exec_db_command("SELECT history_id, seq, entry_json FROM history_entries WHERE (history_id, seq) > (?, ?) ORDER BY history_id, seq LIMIT ?", (*after, batch_size))
+            plain = [(encode_chat_entry(json.loads(entry_json)), history_id, seq) for history_id, seq, entry_json in rows if isinstance(entry_json, str)]
+            self._exec_many_db_command("UPDATE history_entries SET entry_json=? WHERE history_id=? AND seq=?", plain)
+            
+        return len(plain), (tuple(rows[-1][:2]) if len(rows) == batch_size else None)
     
\ No newline at end of file
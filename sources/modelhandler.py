@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, discord
+import json, discord, threading
 
 from typing import ( 
     Any as _Any,
@@ -14,13 +14,69 @@ from . import (
 )
 
 __all__ = [
-    "DGGuildDatabaseModelHandler"
+    "DGGuildDatabaseModelHandler",
+    "DGModelPermissionIndex",
+    "user_has_model_permissions",
+    "get_permitted_roles_for_model",
+    "user_has_model_permissions_async",
+    "get_permitted_roles_for_model_async"
 ]
 
 if TYPE_CHECKING:
     from . import (
         models
     )
+
+_LOCKED_TO_EVERY_ROLE = 2 ** 31 # Position of a model whose roles have all been deleted. No role is that high.
+
+class DGModelPermissionIndex:
+    """Per-guild index of the lowest role position that may use each locked model. A permission check is then a single comparison against the members top role."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._guilds: dict[int, dict[str, int]] = {}
+    
+    def get(self, guild_id: int) -> dict[str, int] | None:
+        """Returns the index of a guild, or None if it has not been built yet."""
+        with self._lock:
+            return self._guilds.get(guild_id)
+    
+    def build(self, guild: discord.Guild, model_rules: dict[str, list[int]]) -> dict[str, int]:
+        """Builds and stores the index of a guild from its lock list. Roles that have since been deleted are ignored.
+        If every role of a model has been deleted, the model stays locked to every role until an administrator locks it behind a role that exists.
+
+        Args:
+            guild (discord.Guild): The guild.
+            model_rules (dict[str, list[int]]): The guilds lock list, as returned by `DGGuildDatabaseModelHandler.get_guild_models`.
+
+        Returns:
+            dict[str, int]: The model code names mapped to the minimum role position allowed to use them. Models that are not present are unrestricted.
+        """
+        guild_index = {}
+        for model_name, role_ids in model_rules.items():
+            if role_ids:
+                guild_index[model_name] = min((role.position for role_id in role_ids if (role := guild.get_role(int(role_id)))), default=_LOCKED_TO_EVERY_ROLE)
+        
+        with self._lock:
+            self._guilds[guild.id] = guild_index
+        return guild_index
+    
+    def invalidate(self, guild_id: int | None=None) -> None:
+        """Drops the index of a guild so it is rebuilt on the next check. If no guild is given, every index is dropped."""
+        with self._lock:
+            self._guilds.pop(guild_id, None) if guild_id != None else self._guilds.clear()
+    
+    def invalidate_after_commit(self, guild_id: int) -> None:
+        """Drops the index of a guild now, and again once the lock list change being made is committed.
+        Otherwise a check on another thread could rebuild the index from the rows before the commit, and keep it until the next change."""
+        self.invalidate(guild_id)
+        database.call_after_commit(lambda: self.invalidate(guild_id))
+
+    @staticmethod
+    def role_is_permitted(guild_index: dict[str, int], role: discord.Role, model: Type[models.AIModel]) -> bool:
+        return model.model not in guild_index or role.position >= guild_index[model.model]
+
+permission_index = DGModelPermissionIndex()
 class DGGuildDatabaseModelHandler(database.DGDatabaseSession):
     # Old: DGRules
     """Database connection that manages model permissions (Model Lock List, or MLL, etc..) maybe more in the future."""
@@ -155,6 +211,7 @@ class DGGuildDatabaseModelHandler(database.DGDatabaseSession):
             return False
         
         self._dump_into_database(guild_rules)
+        permission_index.invalidate_after_commit(self.guild.id)
         
         return True
 
@@ -181,6 +238,7 @@ class DGGuildDatabaseModelHandler(database.DGDatabaseSession):
             return
         
         self._dump_into_database(models_allowed_roles)
+        permission_index.invalidate_after_commit(self.guild.id)
 
     def add_guild(self) -> bool:  
         """Adds a guild to the lock list database.
@@ -207,11 +265,18 @@ class DGGuildDatabaseModelHandler(database.DGDatabaseSession):
         """
         if self.in_database == True:
             self._exec_db_command("DELETE FROM model_rules WHERE gid=?", (self.guild.id,))
+            permission_index.invalidate_after_commit(self.guild.id)
             return not self.has_guild()
         raise exceptions.ModelError(errors.ModelErrors.GUILD_NOT_IN_DATABASE)
     
+    def get_permission_index(self) -> dict[str, int]:
+        """Returns the guilds entry in the model permission index, building it from the lock list if needed."""
+        if (guild_index := permission_index.get(self.guild.id)) == None:
+            guild_index = permission_index.build(self.guild, self.get_guild_models())
+        return guild_index
+    
     def user_has_model_permissions(self, user_role: discord.Role, model: Type[models.AIModel]) -> bool:
-        """Checks if the specified role has permission to used a specified model.
+        """Checks if the specified role has permission to used a specified model. The role may use the model if it is unrestricted, or if the role is at or above the lowest role in the models lock list.
 
         Args:
             user_role (discord.Role): The role to be checked.
@@ -221,24 +286,35 @@ class DGGuildDatabaseModelHandler(database.DGDatabaseSession):
             bool: True if usable, False if otherwise.
         """
         try:
-            model_roles = self.get_guild_model(model)
-            def _does_have_senior_role():
-                return [True for r_id in model_roles if user_role >= user_role.guild.get_role(int(r_id))]
-
-            print(model_roles)
-            return (bool(model_roles) == False) \
-            or (user_role.id in model_roles if isinstance(model_roles, list) else False) \
-            or (not model_roles or bool(_does_have_senior_role())) # Check if the model has no restrictions. The user has a role contained within any possible restrictions, or if the user has a role that is higher that of any lower role.
+            return DGModelPermissionIndex.role_is_permitted(self.get_permission_index(), user_role, model)
         except exceptions.ModelError:
             return True
 
-def user_has_model_permissions(member: discord.Member, model: Type[models.AIModel]):
+def _get_guild_permission_index(guild: discord.Guild) -> dict[str, int]:
+    try:
+        with DGGuildDatabaseModelHandler(guild) as check_rules:
+            return check_rules.get_permission_index()
+    except exceptions.ModelError:
+        return {}
+
+def user_has_model_permissions(member: discord.Member, model: Type[models.AIModel]) -> bool:
     if isinstance(member, discord.Member):
-        with DGGuildDatabaseModelHandler(member.guild) as check_rules:
-            return bool(check_rules.user_has_model_permissions(member.roles[-1], model))
+        if (guild_index := permission_index.get(member.guild.id)) == None:
+            guild_index = _get_guild_permission_index(member.guild)
+        return DGModelPermissionIndex.role_is_permitted(guild_index, member.top_role, model)
     else:
         raise TypeError("member must be discord.Member, not {}".format(member.__class__))
 
 def get_permitted_roles_for_model(guild: discord.Guild, model: Type[models.AIModel]) -> list[int]:
     with DGGuildDatabaseModelHandler(guild) as model_handler:
-        return model_handler.get_guild_model(model) 
\ No newline at end of file
+        return model_handler.get_guild_model(model)
+
+async def user_has_model_permissions_async(member: discord.Member, model: Type[models.AIModel]) -> bool:
+    """Same as `user_has_model_permissions`, but runs on the database thread. Guilds that are already indexed are answered straight away."""
+    if isinstance(member, discord.Member) and permission_index.get(member.guild.id) != None:
+        return user_has_model_permissions(member, model)
+    return await database.run_async(user_has_model_permissions, member, model)
+
+async def get_permitted_roles_for_model_async(guild: discord.Guild, model: Type[models.AIModel]) -> list[int]:
+    """Same as `get_permitted_roles_for_model`, but runs on the database thread."""
+    return await database.run_async(get_permitted_roles_for_model, guild, model)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import logging
+import logging, importlib.util, asyncio
 import json, openai, discord, typing, requests
 import httpx
 
@@ -26,7 +26,13 @@ from . import (
 from discord.app_commands import Choice
 import google.generativeai as google_ai
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None # Token counts are estimated without it.
+
 __all__ = [
+    "create_openai_client",
     "AIModel",
     "GPT3Turbo",
     "GPT4",
@@ -40,6 +46,29 @@ logger = logging.getLogger(__name__)
 
 registered_models: Dict[str, typing.Type[AIModel]] = {}
 MODEL_CHOICES: list[Choice] = []
+_encodings: dict[str, Any] = {}
+
+def count_tokens(text: str, model: str | None=None) -> int:
+    """Counts the tokens of some text. If `tiktoken` is not installed, this is an estimate (About 4 characters per token).
+
+    Args:
+        text (str): The text to count.
+        model (str | None, optional): The model whose tokenizer to use. Defaults to None.
+
+    Returns:
+        int: How many tokens the text is.
+    """
+    if tiktoken == None:
+        return len(text) // 4 + 1
+    
+    if (encoding := _encodings.get(str(model))) == None:
+        try:
+            encoding = tiktoken.encoding_for_model(str(model))
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[str(model)] = encoding
+        
+    return len(encoding.encode(text))
 
 # Contexts
 
@@ -96,10 +125,34 @@ class ReaderContext:
 # GPT Contexts
 
 class GPTConversationContext:
-    def __init__(self) -> None:
+    """The messages sent to a GPT model with each query. Only the most recent messages that fit within `token_budget` are kept; the oldest are dropped first, but the newest query and answer are never dropped. (The full conversation is kept in `ReadableContext`)"""
+    
+    MESSAGE_OVERHEAD = 4 # Tokens each message costs on top of its content.
+    
+    def __init__(self, token_budget: int | None=None, model: str | None=None) -> None:
         super().__init__()
         self._context = []
+        self._token_counts: list[int] = []
+        self.token_count = 0
+        self.token_budget = token_budget
+        self.model = model
+    
+    def _count_message_tokens(self, content: str) -> int:
+        return count_tokens(content, self.model) + self.MESSAGE_OVERHEAD
     
+    def _trim(self) -> None:
+        if self.token_budget == None:
+            return
+        
+        dropped = 0
+        while dropped < len(self._context) - 2 and self.token_count > self.token_budget: # The newest pair is always kept, even if it alone is over budget
+            self.token_count -= self._token_counts[dropped] + self._token_counts[dropped + 1] # Entries are dropped as query and answer pairs
+            dropped += 2
+        
+        if dropped:
+            del self._context[:dropped]
+            del self._token_counts[:dropped]
+            
     def add_conversation_entry(self, query: str, answer: str) -> list:
         
         data_query = {"role": "user", "content": query}    
@@ -107,18 +160,37 @@ class GPTConversationContext:
         context_entry = [data_query, data_reply]
         
         self._context.extend(context_entry)
+        
+        counts = (self._count_message_tokens(query), self._count_message_tokens(answer))
+        self._token_counts.extend(counts)
+        self.token_count += sum(counts)
+        self._trim()
+        
         return context_entry
 
     def clear(self) -> None:
         self._context.clear()
+        self._token_counts.clear()
+        self.token_count = 0
     
     def get_temporary_context(self, query: str) -> list:
+        """Returns the messages to send with `query`. If the query does not fit within the budget alongside the stored messages, the oldest ones are left out of this request. (They are not removed)
+
+        Args:
+            query (str): The users query.
 
-        data = {"content": query, "role": "user"}    
-        _temp_context = self._context.copy()
-        _temp_context.append(data)
+        Returns:
+            list: The messages to send.
+        """
+        data = {"content": query, "role": "user"}
+        start, total = 0, self.token_count + self._count_message_tokens(query)
         
-        return _temp_context
+        if self.token_budget != None:
+            while start < len(self._context) and total > self.token_budget:
+                total -= self._token_counts[start] + self._token_counts[start + 1]
+                start += 2
+            
+        return self._context[start:] + [data]
     
     @staticmethod
     def get_empty_image_context(query: str, image_url: str) -> list:
@@ -197,26 +269,45 @@ class GPTReaderContext(ReaderContext):
     
 def _handle_error(response: responses.BaseAIErrorResponse) -> None:
     raise exceptions.DGException(response.error_message, response.error_code)
-    
-async def _gpt_ask_base(query: str, context: GPTConversationContext | None,  model: str, api_key: str, **kwargs) -> responses.OpenAIQueryResponse:
+
+def create_openai_client(api_key: str) -> openai.AsyncOpenAI:
+    """Creates an OpenAI client backed by a connection pool, so connections to OpenAI are kept alive and reused between requests. HTTP/2 is used if the `h2` package is installed.
+
+    Args:
+        api_key (str): The OpenAI API key.
+
+    Returns:
+        openai.AsyncOpenAI: The client. It must be closed with `await client.close()` once it is no longer needed.
+    """
+    http_client = httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") != None,
+        limits=httpx.Limits(
+            max_connections=developerconfig.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=developerconfig.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=developerconfig.OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(developerconfig.GPT_REQUEST_TIMEOUT, connect=developerconfig.OPENAI_CONNECT_TIMEOUT)
+    )
+    return openai.AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=developerconfig.GPT_REQUEST_TIMEOUT)
+    
+async def _gpt_ask_base(query: str, context: GPTConversationContext | None,  model: str, client: openai.AsyncOpenAI, **kwargs) -> responses.OpenAIQueryResponse:
     temp_context: list = context.get_temporary_context(query) if context else GPTConversationContext.generate_empty_context(query)
     
     if not isinstance(context, GPTConversationContext | None):
         raise TypeError("context should be of type GPTConversationContext or None, not {}".format(type(context)))
     
     try:
-        async with openai.AsyncOpenAI(api_key=api_key, timeout=developerconfig.GPT_REQUEST_TIMEOUT) as async_openai_client:
-            _reply = await async_openai_client.chat.completions.create(model=model, messages=temp_context, **kwargs)
-            response = responses._gpt_response_factory(_reply.model_dump_json())
-            
-            if isinstance(response, responses.BaseAIErrorResponse):
-                _handle_error(response)
-            elif isinstance(response, responses.OpenAIQueryResponse):
-                if isinstance(context, GPTConversationContext):
-                    context.add_conversation_entry(query, str(response.response))
-                    
-                return response
+        _reply = await client.chat.completions.create(model=model, messages=temp_context, **kwargs)
+        response = responses._gpt_response_factory(_reply.model_dump_json())
+        
+        if isinstance(response, responses.BaseAIErrorResponse):
+            _handle_error(response)
+        elif isinstance(response, responses.OpenAIQueryResponse):
+            if isinstance(context, GPTConversationContext):
+                context.add_conversation_entry(query, str(response.response))
                 
+            return response
+            
     except (TimeoutError, httpx.ReadTimeout):
         raise exceptions.DGException(errors.AIErrors.AI_TIMEOUT_ERROR)
     
@@ -226,64 +317,49 @@ async def _gpt_ask_stream_base(
     query: str, 
     context: GPTConversationContext | None, 
     model: str, 
-    api_key: str, 
-    **kwargs) -> AsyncGenerator[responses.OpenAIQueryResponseChunk | responses.OpenAIErrorResponse | responses.AIEmptyResponseChunk, None]:
+    client: openai.AsyncOpenAI, 
+    **kwargs) -> AsyncGenerator[responses.AIResponseDelta | responses.OpenAIErrorResponse, None]:
     
     """Streams a response from the AI. This is not meant to be used directly.
 
     Raises:
-        TypeError: If a chunk of a response is not of type AIErrorResponse or AIQueryResponse.
+        ValueError: If an event of the stream is not a reply chunk or an error.
         exceptions.exceptions.DGException: If the API key is invalid.
-        GPTReachedLimit: If the response has reached the token limit.
-        GPTContentFilter: If the response has been filtered by the content filter for explicit terms. 
 
     Returns:
         _type_: None
 
     Yields:
-        _type_: FIXME: Add new description
+        responses.AIResponseDelta | responses.OpenAIErrorResponse: Each piece of the reply as it arrives, or an error sent mid-stream.
     """
     history: list = context.get_temporary_context(query) if context else GPTConversationContext.generate_empty_context(query)
 
-    def _is_valid_chunk(chunk_data: str) -> bool:
-        try:
-            # NOTE: json.loads can take byte array
-            if chunk_data not in ['', '[DONE]'] and bool(json.loads(chunk_data)):
-                return True
-            else:
-                return False
-        except:
-            return False
-
-
     try:
-        async with openai.AsyncOpenAI(api_key=api_key) as async_openai_client:
-            _reply = await async_openai_client.chat.completions.create(messages=history, model=model, stream=True, **kwargs)
+        _reply = await client.chat.completions.create(messages=history, model=model, stream=True, **kwargs)
 
-            async for raw_chunk in _reply.response.aiter_text():
-                readable_chunks = filter(_is_valid_chunk, raw_chunk.replace("data: ", "").split("\n\n"))
+        reply_text: list[str] = []
+        try:
+            async for delta in responses._iter_gpt_stream(_reply.response.aiter_bytes()):
+                if isinstance(delta, responses.AIResponseDelta):
+                    reply_text.append(delta.response)
+                yield delta
                 
-                for chunk_text in readable_chunks:
-                    chunk = responses._gpt_response_factory(chunk_text)
-
-                    if isinstance(chunk, responses.OpenAIQueryResponseChunk | responses.OpenAIErrorResponse):
-                        yield chunk
-                    else:
-                        raise TypeError(
-                            "Expected AIErrorResponse or AIQueryResponseChunk, got {}".format(type(chunk)))
-                        
+            if isinstance(context, GPTConversationContext):
+                context.add_conversation_entry(query, "".join(reply_text))
+        finally:
+            await _reply.response.aclose() # Return the connection to the pool even if the reader stops early.
+                    
     except openai.AuthenticationError:
         raise exceptions.DGException("**OpenAI API Key is invalid.** Please contact bot owner to resolve this issue.")
 
-async def _gpt_image_base(prompt: str, image_engine: types.ImageEngine, api_key: str) -> responses.OpenAIImageResponse:
-    async with openai.AsyncOpenAI(api_key=api_key) as async_openai_client:
-        _image_reply = await async_openai_client.images.generate(prompt=prompt, model=image_engine)
-        response = responses._gpt_response_factory(_image_reply.model_dump_json())
-        
-        if isinstance(response, responses.OpenAIErrorResponse):
-            _handle_error(response)
-        elif isinstance(response, responses.OpenAIImageResponse):
-            return response
+async def _gpt_image_base(prompt: str, image_engine: types.ImageEngine, client: openai.AsyncOpenAI) -> responses.OpenAIImageResponse:
+    _image_reply = await client.images.generate(prompt=prompt, model=image_engine)
+    response = responses._gpt_response_factory(_image_reply.model_dump_json())
+    
+    if isinstance(response, responses.OpenAIErrorResponse):
+        _handle_error(response)
+    elif isinstance(response, responses.OpenAIImageResponse):
+        return response
     
     raise TypeError("Expected AIImageResponse or AIErrorResponse, got {}".format(type(response)))
 
@@ -355,24 +431,32 @@ class AIModel(ABC):
     can_generate_images: bool = False
     can_read_images: bool = False
     enabled: bool = is_enabled()
+    context_token_budget: int = 4096 # How many tokens of past messages are sent with each query. Must leave room for the reply within the models context window.
     
     async def __aenter__(self):
+        await self.check_permissions()
         await self.start_chat()
         return self
     
     async def __aexit__(self, blah, blah1, blah2) -> None:
         await self.end()
     
-    def _check_user_permissions(self):
-        return modelhandler.user_has_model_permissions(self.member, type(self))
+    async def _check_user_permissions_async(self) -> bool:
+        return await modelhandler.user_has_model_permissions_async(self.member, type(self))
+    
+    async def check_permissions(self) -> None:
+        """Checks if the member may use this model. The permissions are read on the database thread, so this is done before the model is used instead of when it is created.
+
+        Raises:
+            exceptions.ModelError: The member does not have permission to use this model.
+        """
+        if not await self._check_user_permissions_async():
+            raise exceptions.ModelError(missing_perms)
     
     def __init__(self, member: discord.Member) -> None:
         self._context: ReadableContext = ReadableContext()
         self._image_reader_context: ReaderContext | None = None
         self.member = member
-        
-        if not self._check_user_permissions():
-            raise exceptions.ModelError(missing_perms)
 
         
     def is_init(self):
@@ -383,11 +467,22 @@ class AIModel(ABC):
             return [self.member.guild.get_role(r_id) for r_id in modelhandler.get_permitted_roles_for_model(self.member.guild, type(self))]
         except exceptions.ModelError:
             return []
+    
+    async def get_lock_list_async(self) -> list[discord.Role | None]:
+        try:
+            return [self.member.guild.get_role(r_id) for r_id in await modelhandler.get_permitted_roles_for_model_async(self.member.guild, type(self))]
+        except exceptions.ModelError:
+            return []
         
     @property
     def context(self) -> ReadableContext:
         return self._context
     
+    @property
+    def context_token_count(self) -> int:
+        """How many tokens of past messages will be sent with the next query."""
+        return 0
+    
     def fetch_raw(self) -> dict:
         raise NotImplementedError
     
@@ -406,7 +501,7 @@ class AIModel(ABC):
     async def ask_model(self, query: str) -> responses.BaseAIQueryResponse:
         raise NotImplementedError
     
-    async def ask_model_stream(self, query: str) -> AsyncGenerator[responses.BaseAIQueryResponseChunk | responses.BaseAIErrorResponse | responses.AIEmptyResponseChunk, None]:
+    async def ask_model_stream(self, query: str) -> AsyncGenerator[responses.AIResponseDelta | responses.BaseAIErrorResponse, None]:
         raise NotImplementedError
     
     @check_can_generate_images
@@ -434,10 +529,64 @@ class AIModel(ABC):
     
 class GPTModel(AIModel):
     
+    _openai_client: openai.AsyncOpenAI | None = None
+    _retired_openai_clients: dict[openai.AsyncOpenAI, asyncio.Task | None] = {} # Clients made with an old API key, and the tasks that will close them.
+    
     @staticmethod
     def is_enabled() -> bool:
         return confighandler.has_api_key("openai_api_key")
     
+    @staticmethod
+    def set_openai_client(client: openai.AsyncOpenAI | None) -> None:
+        """Sets the OpenAI client shared by every GPT model. The bot sets this in `setup_hook`.
+
+        Args:
+            client (openai.AsyncOpenAI | None): The client to share. Made with `create_openai_client`.
+        """
+        GPTModel._openai_client = client
+    
+    @staticmethod
+    def get_openai_client() -> openai.AsyncOpenAI:
+        """Returns the shared OpenAI client. If the bot has not set one (For example, if models are used outside of the bot), one is created.
+        If the OpenAI API key has changed since the client was made (`/owner reload-config`, `confighandler.write_keys` or an edit of the key file), the client is replaced with one that uses the new key.
+
+        Returns:
+            openai.AsyncOpenAI: The shared client.
+        """
+        api_key = confighandler.get_api_key("openai_api_key")
+        
+        if GPTModel._openai_client != None and GPTModel._openai_client.api_key != api_key:
+            GPTModel._retire_openai_client(GPTModel._openai_client)
+            GPTModel.set_openai_client(None)
+            
+        if GPTModel._openai_client == None:
+            GPTModel._openai_client = create_openai_client(api_key)
+        return GPTModel._openai_client
+    
+    @staticmethod
+    def _retire_openai_client(client: openai.AsyncOpenAI) -> None:
+        async def _close_when_idle():
+            await asyncio.sleep(developerconfig.GPT_REQUEST_TIMEOUT) # Requests already sent with the old key can finish first.
+            GPTModel._retired_openai_clients.pop(client, None)
+            await client.close()
+            
+        try:
+            GPTModel._retired_openai_clients[client] = asyncio.get_running_loop().create_task(_close_when_idle())
+        except RuntimeError: # No event loop yet. It is closed with the shared client instead.
+            GPTModel._retired_openai_clients[client] = None
+    
+    @staticmethod
+    async def close_openai_client() -> None:
+        """Closes the shared OpenAI client and its connection pool, along with any client still open from before the API key changed."""
+        if GPTModel._openai_client != None:
+            await GPTModel._openai_client.close()
+            GPTModel._openai_client = None
+        
+        while GPTModel._retired_openai_clients:
+            client, close_task = GPTModel._retired_openai_clients.popitem()
+            close_task.cancel() if close_task else None
+            await client.close()
+    
     def __init__(self, member: discord.Member) -> None:
         super().__init__(member)
         self._gpt_context: GPTConversationContext | None = None
@@ -450,11 +599,15 @@ class GPTModel(AIModel):
             self._gpt_context.clear() # type: ignore shutup, that is what the check is for.
             self.context.clear()
 
+    @property
+    def context_token_count(self) -> int:
+        return self._gpt_context.token_count if self._gpt_context else 0
+    
     def fetch_raw(self) -> Any:
         return json.dumps(self._gpt_context._context, indent=3) if self._gpt_context else {}
     
     async def start_chat(self) -> None:
-        self._gpt_context = GPTConversationContext()
+        self._gpt_context = GPTConversationContext(self.context_token_budget, self.model)
 
 @register_model
 class GPT3Turbo(GPTModel):
@@ -462,6 +615,7 @@ class GPT3Turbo(GPTModel):
     model: types.AIModels = "gpt-3.5-turbo-16k"
     description = "Cost effective, smart, image generation. Everything normal users need."
     display_name = "GPT 3.5 Turbo"
+    context_token_budget = 12288
 
     can_talk = True
     can_stream = True
@@ -471,20 +625,20 @@ class GPT3Turbo(GPTModel):
     
     @check_can_talk
     async def ask_model(self, query: str) -> responses.OpenAIQueryResponse:
-        if self._check_user_permissions():
-            return await _gpt_ask_base(query, self._gpt_context, self.model, confighandler.get_api_key("openai_api_key"))
+        if await self._check_user_permissions_async():
+            return await _gpt_ask_base(query, self._gpt_context, self.model, self.get_openai_client())
         raise exceptions.DGException(missing_perms)
     
     @check_can_stream
-    async def ask_model_stream(self, query: str) -> AsyncGenerator[responses.OpenAIQueryResponseChunk | responses.OpenAIErrorResponse | responses.AIEmptyResponseChunk, None]:
-        if self._check_user_permissions():
-            return _gpt_ask_stream_base(query, self._gpt_context, self.model, confighandler.get_api_key("openai_api_key"))
+    async def ask_model_stream(self, query: str) -> AsyncGenerator[responses.AIResponseDelta | responses.OpenAIErrorResponse, None]:
+        if await self._check_user_permissions_async():
+            return _gpt_ask_stream_base(query, self._gpt_context, self.model, self.get_openai_client())
         raise exceptions.DGException(missing_perms)
     
     @check_can_generate_images
     async def generate_image(self, image_prompt: str) -> responses.OpenAIImageResponse:
-        if self._check_user_permissions():
-            return await _gpt_image_base(image_prompt, "dall-e-2", confighandler.get_api_key("openai_api_key"))
+        if await self._check_user_permissions_async():
+            return await _gpt_image_base(image_prompt, "dall-e-2", self.get_openai_client())
         raise exceptions.DGException(missing_perms)
 
 @register_model
@@ -493,6 +647,7 @@ class GPT4(GPT3Turbo):
     model = "gpt-4"
     description = "Slightly better at everything that GPT-3 does, costs more. For normal use, use GPT-3."
     display_name = "GPT 4"
+    context_token_budget = 6144
     
     can_talk = True
     can_stream = True
@@ -506,6 +661,7 @@ class GPT4Turbo(GPT4):
     model = "gpt-4-turbo-preview"
     description = "Best version of GPT currently. Very expensive. Again, stick to GPT 3.5 Turbo for most queries."
     display_name = "GPT 4 Turbo (Preview)"
+    context_token_budget = 32768 # The context window is much larger, but long histories are costly.
 
 @register_model
 class GPT4Vision(GPT4):
@@ -513,6 +669,7 @@ class GPT4Vision(GPT4):
     model = "gpt-4-vision-preview"
     description = "GPT 4 Turbo Engine with added image reading support. Good for describing photos and translating latin-derived languages. Do keep note that this AI model is in preview, and may have usage limits."
     display_name = "GPT 4 Turbo with Vision (Preview)"
+    context_token_budget = 32768
     
     can_talk = True
     can_stream = True
@@ -536,7 +693,7 @@ class GPT4Vision(GPT4):
         await super().start_chat()
         self._image_reader_context = GPTReaderContext()
     
-    async def _gpt4_read_image_base(self, query: str, _api_key: str) -> responses.OpenAIQueryResponse:
+    async def _gpt4_read_image_base(self, query: str, client: openai.AsyncOpenAI) -> responses.OpenAIQueryResponse:
 
         if not self._image_reader_context:
             raise exceptions.DGException(unknown_internal_context)
@@ -550,17 +707,16 @@ class GPT4Vision(GPT4):
             raise TypeError("context should be of type GPTConversationContext or None, not {}".format(type(self._gpt_context)))
         
         try:
-            async with openai.AsyncOpenAI(api_key=_api_key, timeout=developerconfig.GPT_REQUEST_TIMEOUT) as async_openai_client:
-                logger.debug(f"Image read raw request: {reader_context}")
-                _reply = await async_openai_client.chat.completions.create(model="gpt-4-vision-preview", messages=reader_context, max_tokens=4096)
-                response = responses._gpt_response_factory(_reply.model_dump_json())
-                
-                if isinstance(response, responses.OpenAIErrorResponse):
-                    _handle_error(response)
-                elif isinstance(response, responses.OpenAIQueryResponse):
-                    if isinstance(self._image_reader_context, GPTReaderContext):
-                        self._image_reader_context.add_reader_context(query, str(response.response)) # Note to self; this updates INTERNAL CONTEXT.. Not Readable
-                    return response
+            logger.debug(f"Image read raw request: {reader_context}")
+            _reply = await client.chat.completions.create(model="gpt-4-vision-preview", messages=reader_context, max_tokens=4096)
+            response = responses._gpt_response_factory(_reply.model_dump_json())
+            
+            if isinstance(response, responses.OpenAIErrorResponse):
+                _handle_error(response)
+            elif isinstance(response, responses.OpenAIQueryResponse):
+                if isinstance(self._image_reader_context, GPTReaderContext):
+                    self._image_reader_context.add_reader_context(query, str(response.response)) # Note to self; this updates INTERNAL CONTEXT.. Not Readable
+                return response
                     
         except (TimeoutError, httpx.ReadTimeout):
             raise exceptions.ModelError(errors.AIErrors.AI_TIMEOUT_ERROR)
@@ -583,9 +739,9 @@ class GPT4Vision(GPT4):
     
     @check_can_read
     async def ask_image(self, query: str) -> responses.OpenAIQueryResponse:
-        if self._check_user_permissions() and self._image_reader_context:
+        if await self._check_user_permissions_async() and self._image_reader_context:
             if isinstance(query, str):
-                return await self._gpt4_read_image_base(query, confighandler.get_api_key("openai_api_key"))    
+                return await self._gpt4_read_image_base(query, self.get_openai_client())    
             raise TypeError(f"`query` must be of type `str` not {query.__class__.__name__}")
         
         else: 
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-import time
-from typing import Any
+import time, codecs
+from typing import Any, AsyncGenerator, AsyncIterable
 import json
 
 # XXX: Listen to type checker
@@ -197,6 +197,76 @@ class AIEmptyResponseChunk(BaseAIResponse):
 
 type EmptyResponse = AIEmptyResponseChunk
 
+class AIResponseDelta:
+    """A single streamed piece of a reply. Unlike `OpenAIQueryResponseChunk`, this does not keep the event it was parsed from."""
+    
+    __slots__ = ("response", "finish_reason", "timestamp")
+    
+    def __init__(self, response: str, finish_reason: str | None=None, timestamp: int=0) -> None:
+        self.response = response
+        self.finish_reason = finish_reason
+        self.timestamp = timestamp
+    
+    def __bool__(self):
+        return bool(self.response)
+    
+    def __len__(self):
+        return len(self.response)
+    
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} response={self.response!r} finish_reason={self.finish_reason!r}>"
+
+"""Stream parsing"""
+
+class ServerSentEventDecoder:
+    """Incrementally decodes a Server-Sent Events byte stream into event data.
+    Network chunks do not line up with events (Or UTF-8 characters), so anything incomplete is kept until the rest of it arrives."""
+    
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._data: list[str] = []
+    
+    def _feed_text(self, text: str) -> list[str]:
+        lines = (self._buffer + text).split("\n")
+        self._buffer = lines.pop()
+        events = []
+        
+        for line in lines:
+            if line.endswith("\r"):
+                line = line[:-1]
+                
+            if line == "":
+                if self._data:
+                    events.append("\n".join(self._data))
+                    self._data = []
+            elif line.startswith("data:"):
+                self._data.append(line[6:] if line.startswith("data: ") else line[5:])
+            # Comments (":") and other fields ("event", "id", "retry") are not used by OpenAI
+            
+        return events
+    
+    def feed(self, raw: bytes) -> list[str]:
+        """Feeds bytes from the stream into the decoder.
+
+        Args:
+            raw (bytes): The next bytes of the stream.
+
+        Returns:
+            list[str]: The data of every event that was completed by `raw`.
+        """
+        return self._feed_text(self._decoder.decode(raw))
+    
+    def flush(self) -> list[str]:
+        """Ends the stream, returning the data of an event that was not followed by a blank line.
+
+        Returns:
+            list[str]: The remaining event data.
+        """
+        events = self._feed_text(self._decoder.decode(b"", final=True) + "\n\n")
+        self._buffer = ""
+        return events
+
 """Response factories"""
 
 def _gpt_response_factory(data: str | dict[Any, Any] = {}) -> OpenAIResponse | EmptyResponse:
@@ -216,5 +286,53 @@ def _gpt_response_factory(data: str | dict[Any, Any] = {}) -> OpenAIResponse | E
     else:
         raise ValueError("Incorrect GPT response data.")
 
+def _gpt_delta_factory(data: str) -> AIResponseDelta | OpenAIErrorResponse | None:
+    """Parses the data of one streamed OpenAI event. Each event is only parsed once.
+
+    Args:
+        data (str): The event data.
+
+    Returns:
+        AIResponseDelta | OpenAIErrorResponse | None: The delta, an error, or None if the event carries no text or finish reason (Such as the first event, which only gives the role).
+    """
+    actual_data: dict = json.loads(data)
+    
+    if actual_data.get("error", False):
+        return OpenAIErrorResponse(actual_data)
+    elif actual_data.get("object", False) == "chat.completion.chunk" and actual_data["choices"]:
+        choice = actual_data["choices"][0]
+        content = choice["delta"].get("content")
+        finish_reason = choice.get("finish_reason")
+        
+        if content or finish_reason:
+            return AIResponseDelta(content or "", finish_reason, actual_data.get("created", 0))
+        return None
+    else:
+        raise ValueError("Incorrect GPT stream data.")
+
+async def _iter_gpt_stream(byte_stream: AsyncIterable[bytes]) -> AsyncGenerator[AIResponseDelta | OpenAIErrorResponse, None]:
+    """Decodes a streamed OpenAI reply into deltas. Stops at the `[DONE]` event.
+
+    Args:
+        byte_stream (AsyncIterable[bytes]): The raw body of the reply. (Such as `httpx.Response.aiter_bytes()`)
+
+    Yields:
+        AIResponseDelta | OpenAIErrorResponse: Each delta of the reply, or an error sent mid-stream.
+    """
+    decoder = ServerSentEventDecoder()
+    
+    async def _decoded():
+        async for raw in byte_stream:
+            for event in decoder.feed(raw):
+                yield event
+        for event in decoder.flush():
+            yield event
+    
+    async for event in _decoded():
+        if event == "[DONE]":
+            return
+        if (delta := _gpt_delta_factory(event)) != None:
+            yield delta
+
 def _google_response_factory(data: str | dict[Any, Any]) -> GoogleAIResponse | EmptyResponse:
     ...
\ No newline at end of file
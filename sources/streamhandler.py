@@ -0,0 +1,137 @@
+"""Module for writing streamed replies into Discord messages."""
+from __future__ import annotations
+import asyncio, discord, time, weakref
+
+from .common import (
+    developerconfig
+)
+
+__all__ = [
+    "DGStreamMessageWriter",
+    "get_channel_edit_limiter"
+]
+
+_channel_edit_limiters: weakref.WeakValueDictionary[int, asyncio.Semaphore] = weakref.WeakValueDictionary()
+
+def get_channel_edit_limiter(channel_id: int) -> asyncio.Semaphore:
+    """Returns the semaphore that caps how many streamed messages can be edited at once in a channel. Every writer in the channel shares it.
+
+    Args:
+        channel_id (int): The ID of the channel.
+
+    Returns:
+        asyncio.Semaphore: The channels semaphore.
+    """
+    if (limiter := _channel_edit_limiters.get(channel_id)) == None:
+        limiter = asyncio.Semaphore(developerconfig.STREAM_MAX_CONCURRENT_EDITS_PER_CHANNEL)
+        _channel_edit_limiters[channel_id] = limiter
+    return limiter
+
+class DGStreamMessageWriter:
+    """Writes a streamed reply into Discord messages, splitting it over as many messages as needed.
+
+    Text given to `write` is buffered and returns immediately. A separate task edits the messages, so waiting on Discord never blocks reading the stream.
+    Edits are coalesced, so each message is edited at most once every `interval` seconds with whatever text has arrived since. If an edit takes longer than the interval (For example, because discord.py is waiting out a rate limit), the writer waits that long before editing again."""
+
+    def __init__(self, message: discord.Message, header: str="", interval: float=developerconfig.STREAM_UPDATE_MESSAGE_INTERVAL) -> None:
+        """Writes a streamed reply into Discord messages.
+
+        Args:
+            message (discord.Message): The placeholder message the reply starts in.
+            header (str, optional): Text put before the reply. Defaults to "".
+            interval (float, optional): The minimum amount of seconds between edits. Defaults to developerconfig.STREAM_UPDATE_MESSAGE_INTERVAL.
+        """
+        self._messages: list[discord.Message] = [message]
+        self._sent: list[str] = [message.content]
+        self._parts: list[str] = [header]
+        self._header_length = len(header)
+
+        self._interval = interval
+        self._edit_cooldown = interval
+        self._last_edit = 0.0
+        self._limiter = get_channel_edit_limiter(message.channel.id)
+
+        self._changed = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def messages(self) -> list[discord.Message]:
+        return self._messages
+
+    @property
+    def text(self) -> str:
+        """The full text written, including the header."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0]
+
+    @property
+    def reply(self) -> str:
+        """The text written, without the header."""
+        return self.text[self._header_length:]
+
+    def write(self, text: str) -> None:
+        """Adds text to the reply. The messages are updated in the background.
+
+        Args:
+            text (str): The text to add.
+
+        Raises:
+            Exception: Whatever error stopped the messages from being edited. (Such as `discord.NotFound` if a message was deleted)
+        """
+        if self._task.done() and not self._task.cancelled() and (error := self._task.exception()):
+            raise error
+
+        if text:
+            self._parts.append(text)
+            self._changed.set()
+
+    async def close(self) -> str:
+        """Waits for the final edit and stops the background task.
+
+        Returns:
+            str: The text written, without the header.
+        """
+        self._closed = True
+        self._changed.set()
+        await self._task
+        return self.reply
+
+    def cancel(self) -> None:
+        """Stops the background task without making the final edit."""
+        self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            await self._changed.wait()
+
+            if not self._closed and (wait := self._last_edit + self._edit_cooldown - time.monotonic()) > 0:
+                await asyncio.sleep(wait) # Anything written while waiting goes in this same edit
+
+            self._changed.clear()
+            await self._flush()
+
+            if self._closed and not self._changed.is_set():
+                return
+
+    async def _send_or_edit(self, index: int, content: str) -> None:
+        async with self._limiter:
+            if index < len(self._messages):
+                await self._messages[index].edit(content=content)
+                self._sent[index] = content
+            else:
+                self._messages.append(await self._messages[-1].channel.send(content))
+                self._sent.append(content)
+
+    async def _flush(self) -> None:
+        limit = developerconfig.CHARACTER_LIMIT
+        text = self.text
+        started = time.monotonic()
+
+        for index in range(len(self._messages) - 1, max(-(-len(text) // limit), 1)):
+            if (content := text[index * limit:(index + 1) * limit]) != (self._sent[index] if index < len(self._sent) else None):
+                await self._send_or_edit(index, content)
+
+        self._last_edit = time.monotonic()
+        self._edit_cooldown = max(self._interval, self._last_edit - started)
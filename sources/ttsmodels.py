@@ -1,21 +1,211 @@
-import io as _io, gtts as _gtts, json as _json
+import io as _io, gtts as _gtts, json as _json, time as _time, asyncio as _asyncio, threading as _threading
+import os as _os, mmap as _mmap, hashlib as _hashlib, re as _re
 import discord
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from typing import Any as _Any, Callable as _Callable, Type as _Type
 from .voice import pydub as _pydub # type: ignore Again, Python is being dumb. The dependency does exist.
+from .voice.pydub.utils import audioop as _audioop # type: ignore
 
 from . import (
     exceptions
 )
+from .common import (
+    developerconfig
+)
 
 """I want to put more TTS models here, but using one that is not system dependent and has a package for python is difficult."""
 
 __all__ = [
     "TTSModel",
-    "GTTSModel"
+    "GTTSModel",
+    "DGTTSTimings",
+    "DGTTSCache",
+    "DGTTSClip",
+    "DGOpusAudioSource",
+    "DGSentenceSegmenter",
+    "DGTTSPipeline",
+    "tts_timings",
+    "tts_cache"
 ]
 
+class DGTTSTimings:
+    """Records how long each stage of text-to-speech takes. Safe to use from multiple threads."""
+    
+    def __init__(self) -> None:
+        self._lock = _threading.Lock()
+        self._totals: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        
+    def record(self, stage: str, seconds: float) -> None:
+        """Records one run of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            seconds (float): How long the stage took.
+        """
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+    
+    def average(self, stage: str) -> float:
+        """Returns the average amount of seconds a stage takes, or 0.0 if it has not run."""
+        with self._lock:
+            return self._totals.get(stage, 0.0) / self._counts[stage] if self._counts.get(stage) else 0.0
+    
+    def as_dict(self) -> dict[str, tuple[int, float]]:
+        """Returns how many times each stage has run, and its average time in seconds."""
+        with self._lock:
+            return {stage: (self._counts[stage], self._totals[stage] / self._counts[stage]) for stage in self._totals}
+
+tts_timings = DGTTSTimings()
+
+class DGTTSCache:
+    """A disk cache of processed text-to-speech audio. Files are named by the SHA-256 of what produced them (Model, text, language and speed), so identical phrases are only synthesised once.
+    Once the cache is bigger than `max_bytes`, the least recently used files are deleted. Hits are memory-mapped instead of read into memory."""
+    
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """A disk cache of processed text-to-speech audio.
+
+        Args:
+            directory (str): Where the cached audio is stored.
+            max_bytes (int): How big the cache can get before the least recently used files are deleted.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        
+        self._lock = _threading.Lock()
+        self._sizes: dict[str, int] | None = None
+        self._total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._sizes) if self._sizes != None else 0
+    
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+    
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+    
+    @staticmethod
+    def make_key(model: str, text: str, language: str, speed: float, audio_format: str) -> str:
+        """Returns the cache key of some audio.
+
+        Args:
+            model (str): The name of the TTS model.
+            text (str): The spoken text.
+            language (str): The language of the voice.
+            speed (float): The speed at which the bot talks.
+            audio_format (str): The format of the audio. (So audio stored in an old format is never read as a new one)
+
+        Returns:
+            str: The key.
+        """
+        return _hashlib.sha256(_json.dumps([model, text, language, float(speed), audio_format]).encode()).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return _os.path.join(self.directory, key)
+    
+    def _load_index(self) -> dict[str, int]:
+        if self._sizes == None:
+            _os.makedirs(self.directory, exist_ok=True)
+            self._sizes = {}
+            for entry in _os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    self._sizes[entry.name] = entry.stat().st_size
+            self._total_bytes = sum(self._sizes.values())
+        return self._sizes
+    
+    def get(self, key: str) -> _mmap.mmap | None:
+        """Returns cached audio as a read-only memory map, which can be read like a file.
+
+        Args:
+            key (str): The cache key. (From `make_key`)
+
+        Returns:
+            _mmap.mmap | None: The audio, or None if it is not cached.
+        """
+        with self._lock:
+            sizes = self._load_index()
+            if not sizes.get(key):
+                self.misses += 1
+                return None
+            
+            try:
+                with open(self._path(key), "rb") as cached_file:
+                    audio = _mmap.mmap(cached_file.fileno(), 0, access=_mmap.ACCESS_READ)
+                _os.utime(self._path(key)) # Marks the file as recently used
+            except (OSError, ValueError):
+                self._total_bytes -= sizes.pop(key)
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self.bytes_saved += sizes[key]
+            return audio
+    
+    def put(self, key: str, audio: bytes) -> None:
+        """Stores processed audio, deleting the least recently used files if the cache is too big.
+
+        Args:
+            key (str): The cache key. (From `make_key`)
+            audio (bytes): The audio.
+        """
+        if not audio or len(audio) > self.max_bytes:
+            return
+        
+        with self._lock:
+            sizes = self._load_index()
+            temp_path = f"{self._path(key)}.{_threading.get_ident()}.tmp"
+            
+            with open(temp_path, "wb") as temp_file:
+                temp_file.write(audio)
+            _os.replace(temp_path, self._path(key)) # Readers never see a half written file
+            
+            self._total_bytes += len(audio) - sizes.get(key, 0)
+            sizes[key] = len(audio)
+            
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self) -> None:
+        sizes = self._load_index()
+        by_last_use = sorted(sizes, key=lambda key: _os.stat(self._path(key)).st_mtime_ns if _os.path.exists(self._path(key)) else 0)
+        
+        for key in by_last_use:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                _os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue # Still mapped by a reader (Windows)
+            self._total_bytes -= sizes.pop(key)
+    
+    def clear(self) -> None:
+        """Deletes every cached file."""
+        with self._lock:
+            for key in list(self._load_index()):
+                try:
+                    _os.remove(self._path(key))
+                except OSError:
+                    continue
+                self._total_bytes -= self._sizes.pop(key) # type: ignore loaded above
+
+tts_cache = DGTTSCache(developerconfig.TTS_CACHE_DIRECTORY, developerconfig.TTS_CACHE_MAX_BYTES)
+_tts_executor = _ThreadPoolExecutor(max_workers=developerconfig.TTS_WORKER_THREADS, thread_name_prefix="dg-tts")
+
 class TTSModel:
     """Base class for generating text-to-speach for discord.py"""
     
+    language: str = "en" # Language of the voice. Part of the TTS cache key.
+    audio_format: str = "s16le-48000-2" # What `process_text` returns. Raw 16-bit, 48kHz stereo PCM, which is what Discord voice uses.
+    
     def __init__(self, text: str) -> None:
         """Base class for generating text-to-speach for discord.py
 
@@ -44,7 +234,7 @@ class TTSModel:
         return self._emulated_file_object
 
     def process_text(self, speed: float) -> _io.BytesIO:
-        """This must translate the text to a `io.BytesIO` object.
+        """This must translate the text to a `io.BytesIO` object of raw 16-bit, 48kHz stereo PCM. (See `audio_format`)
 
         Args:
             speed (float): The speed at which the bot will talk.
@@ -53,6 +243,24 @@ class TTSModel:
             _io.BytesIO: The spoken response.
         """
         raise NotImplementedError
+    
+    def process_text_cached(self, speed: float) -> _io.BytesIO | _mmap.mmap:
+        """Same as `process_text`, but the result is taken from (Or added to) `tts_cache`.
+
+        Args:
+            speed (float): The speed at which the bot will talk.
+
+        Returns:
+            _io.BytesIO | _mmap.mmap: The spoken response. A memory map if it was cached.
+        """
+        key = tts_cache.make_key(self.__class__.__name__, self.text, self.language, speed, self.audio_format)
+        
+        if (cached := tts_cache.get(key)) != None:
+            return cached
+        
+        audio = self.process_text(speed)
+        tts_cache.put(key, audio.getvalue())
+        return audio
 
 class GTTSModel(TTSModel):
     """Google Text-to-Speech model."""
@@ -67,24 +275,240 @@ class GTTSModel(TTSModel):
             speed (float): The speed at which the bot will talk
 
         Returns:
-            _io.BytesIO: The spoken response.
+            _io.BytesIO: The spoken response, as raw 16-bit, 48kHz stereo PCM. Empty if the audio could not be decoded.
         """
         
         _temp_file = _io.BytesIO()
-        _gtts.gTTS(self.text).write_to_fp(_temp_file)
+        started = _time.perf_counter()
+        _gtts.gTTS(self.text, lang=self.language).write_to_fp(_temp_file)
         _temp_file.seek(0)
+        tts_timings.record("synthesis", (decoded := _time.perf_counter()) - started)
         
         try:
-            speed_up = _pydub.AudioSegment.from_file(_temp_file)
-        except _json.decoder.JSONDecodeError: # pydub may not work sometimes depending on ffmpeg / ffprobe version, return non-speedup file instead
+            speed_up = _pydub.AudioSegment.from_file(_temp_file, format="mp3").as_view() # gTTS always returns MP3, so ffprobe is skipped
+            tts_timings.record("decode", (sped_up := _time.perf_counter()) - decoded)
+        except _json.decoder.JSONDecodeError: # pydub may not work sometimes depending on ffmpeg / ffprobe version, return an empty (Silent) file instead
             return self.emulated_file_object
         except OSError as ose:
             if ose.errno == 216:
                 raise exceptions.DGException("The host machine is running an incompatible version of Windows. (10 and above only)")
+            return self.emulated_file_object
+            
+        speed_up = speed_up.speedup(playback_speed=speed)
+        tts_timings.record("speedup", (converted := _time.perf_counter()) - sped_up)
+        
+        # Converted in-process to what Discord plays, so no ffmpeg is needed to play it
+        pcm = speed_up.set_frame_rate(discord.opus.Encoder.SAMPLING_RATE).set_channels(discord.opus.Encoder.CHANNELS).set_sample_width(2)
+        self.emulated_file_object.write(pcm.raw_data)
+        self.emulated_file_object.seek(0)
+        tts_timings.record("convert", _time.perf_counter() - converted)
+        return self.emulated_file_object
+
+class DGSentenceSegmenter:
+    """Splits streamed text into sentences as they complete, so each one can be spoken without waiting for the rest of the reply."""
+    
+    _SENTENCE_END = _re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+    _TRAILING_PUNCTUATION = _re.compile(r"[.!?\"')\]]*$")
+    
+    def __init__(self, min_length: int=developerconfig.TTS_MIN_SENTENCE_LENGTH) -> None:
+        """Splits streamed text into sentences as they complete.
+
+        Args:
+            min_length (int, optional): Sentences shorter than this are joined with the next one. (So "Dr. Smith" or "1. " is not spoken on its own) Defaults to developerconfig.TTS_MIN_SENTENCE_LENGTH.
+        """
+        self.min_length = min_length
+        self._buffer: list[str] = []
+        self._searched = 0 # Where the next search starts. (Everything before it is known to not contain a sentence end)
+        self._may_end = False # If the buffer ends in punctuation that only needs whitespace to end a sentence
+    
+    def feed(self, text: str) -> list[str]:
+        """Adds streamed text.
+
+        Args:
+            text (str): The next piece of the reply.
+
+        Returns:
+            list[str]: Every sentence completed by `text`.
+        """
+        self._buffer.append(text)
+        if not self._may_end and not any(character in text for character in ".!?\n"):
+            return [] # Text without punctuation can't complete a sentence
+        
+        pending = "".join(self._buffer)
+        sentences, start = [], 0
+        
+        for match in self._SENTENCE_END.finditer(pending, self._searched):
+            if match.end() - start >= self.min_length and (sentence := pending[start:match.end()].strip()):
+                sentences.append(sentence)
+                start = match.end()
+        
+        remainder = pending[start:].lstrip() if start else pending # Whitespace after a sentence end is part of it, even if it arrives later
+        self._buffer = [remainder] if remainder else []
+        self._searched = self._TRAILING_PUNCTUATION.search(remainder.rstrip()).start() # A sentence end may have started in the punctuation at the end, so search it again
+        self._may_end = remainder[-1:] in (".", "!", "?", "\"", "'", ")", "]")
+        return sentences
+    
+    def flush(self) -> str:
+        """Ends the stream.
+
+        Returns:
+            str: The text after the last complete sentence. (May be empty)
+        """
+        remainder = "".join(self._buffer).strip()
+        self._buffer.clear()
+        self._searched = 0
+        self._may_end = False
+        return remainder
+
+class DGOpusAudioSource(discord.AudioSource):
+    """Plays raw 16-bit, 48kHz stereo PCM (What `TTSModel.process_text` returns), encoding it into 20ms Opus frames in-process.
+    Unlike `discord.FFmpegPCMAudio`, no ffmpeg process is started for each clip."""
+    
+    def __init__(self, pcm: _io.BytesIO | _mmap.mmap, volume: float=1.0) -> None:
+        """Plays raw 16-bit, 48kHz stereo PCM.
+
+        Args:
+            pcm (_io.BytesIO | _mmap.mmap): The audio. It is read directly, without copying.
+            volume (float, optional): The volume. 1.0 is unchanged. Defaults to 1.0.
+        """
+        self._pcm = pcm.getbuffer() if isinstance(pcm, _io.BytesIO) else memoryview(pcm)
+        self._position = 0
+        self._encoder = discord.opus.Encoder()
+        self.volume = volume
+    
+    @property
+    def volume(self) -> float:
+        return self._volume
+    
+    @volume.setter
+    def volume(self, value: float) -> None:
+        self._volume = max(value, 0.0)
+    
+    def is_opus(self) -> bool:
+        return True
+    
+    def read(self) -> bytes:
+        frame_size = discord.opus.Encoder.FRAME_SIZE
+        frame = bytes(self._pcm[self._position:self._position + frame_size])
+        self._position += frame_size
+        
+        if not frame:
+            return b""
+        if len(frame) < frame_size:
+            frame += b"\x00" * (frame_size - len(frame)) # The last frame must still be 20ms long
+        if self._volume != 1.0:
+            frame = _audioop.mul(frame, 2, min(self._volume, 2.0))
             
-        else:
-            return speed_up.speedup(playback_speed=speed).export(self.emulated_file_object)
-        return _temp_file
+        return self._encoder.encode(frame, discord.opus.Encoder.SAMPLES_PER_FRAME)
+    
+    def cleanup(self) -> None:
+        self._pcm.release()
+
+class DGTTSClip:
+    """A synthesised text-to-speech clip, ready to be played."""
+    
+    def __init__(self, text: str, audio: _io.BytesIO | _mmap.mmap) -> None:
+        self.text = text
+        self.audio = audio
+
+class DGTTSPipeline:
+    """Synthesises text-to-speech clips ahead of playback and plays them in order.
+
+    Text given to `submit` starts synthesising straight away on a shared thread pool, so the next clip is usually ready before the current one ends.
+    The clips are passed to the player through an asyncio queue. The player stops once the queue is empty, after which the pipeline is finished and a new one must be made."""
+    
+    def __init__(self, tts_model: _Type[TTSModel], member: discord.Member, speed: float, prefetch: int=developerconfig.TTS_PREFETCH_CLIPS) -> None:
+        """Synthesises text-to-speech clips ahead of playback and plays them in order.
+
+        Args:
+            tts_model (_Type[TTSModel]): The TTS model used to synthesise the text.
+            member (discord.Member): The member the voice is for.
+            speed (float): The speed at which the bot will talk.
+            prefetch (int, optional): How many clips can be synthesised ahead of the one playing. Defaults to developerconfig.TTS_PREFETCH_CLIPS.
+        """
+        self.tts_model = tts_model
+        self.member = member
+        self.speed = speed
+        
+        self._queue: _asyncio.Queue[_asyncio.Future[DGTTSClip]] = _asyncio.Queue(maxsize=prefetch)
+        self._player: _asyncio.Task | None = None
+        self._finished = False
+    
+    @property
+    def is_finished(self) -> bool:
+        return self._finished
+        
+    def _synthesise(self, text: str) -> DGTTSClip:
+        audio = self.tts_model(self.member, text).process_text_cached(self.speed)
+        audio.seek(0)
+        return DGTTSClip(text, audio)
+    
+    async def submit(self, text: str) -> None:
+        """Queues text to be spoken, and starts synthesising it. Waits if `prefetch` clips are already queued.
+
+        Args:
+            text (str): The text to speak.
+        """
+        if self._finished:
+            raise exceptions.VoiceError("This TTS pipeline has finished.")
         
+        started = _time.perf_counter()
+        await self._queue.put(_asyncio.get_running_loop().run_in_executor(_tts_executor, self._synthesise, text))
+        tts_timings.record("queue", _time.perf_counter() - started)
         
-        
\ No newline at end of file
+    def start(self, voice_client: discord.VoiceClient, make_source: _Callable[[_io.BytesIO | _mmap.mmap], discord.AudioSource]) -> _asyncio.Task:
+        """Starts playing queued clips.
+
+        Args:
+            voice_client (discord.VoiceClient): The voice client to play through.
+            make_source (_Callable[[_io.BytesIO], discord.AudioSource]): Turns a clips audio into something `VoiceClient.play` accepts.
+
+        Returns:
+            _asyncio.Task: The player task.
+        """
+        if self._player == None:
+            self._player = _asyncio.create_task(self._play(voice_client, make_source))
+        return self._player
+    
+    async def _play(self, voice_client: discord.VoiceClient, make_source: _Callable[[_io.BytesIO | _mmap.mmap], discord.AudioSource]) -> None:
+        loop = _asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except _asyncio.QueueEmpty:
+                    return # Nothing is left to be spoken
+                
+                waited_from = _time.perf_counter()
+                clip = await pending
+                tts_timings.record("wait", _time.perf_counter() - waited_from) # How long playback waited on synthesis. Ideally 0.
+                
+                finished = _asyncio.Event()
+                play_errors: list[_Any] = []
+                
+                def _after(error: _Any=None):
+                    if error:
+                        play_errors.append(error)
+                    loop.call_soon_threadsafe(finished.set)
+                
+                voice_client.play(make_source(clip.audio), after=_after)
+                started = _time.perf_counter()
+                await finished.wait()
+                tts_timings.record("playback", _time.perf_counter() - started)
+                
+                if play_errors:
+                    raise exceptions.DGException(f"VoiceError: {str(play_errors[0])}", log_error=True, send_exceptions=True)
+        finally:
+            self._finished = True
+            self._cancel_pending()
+    
+    def _cancel_pending(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait().cancel()
+    
+    def cancel(self) -> None:
+        """Stops the pipeline. Clips that have not been played yet are dropped."""
+        self._finished = True
+        self._cancel_pending()
+        if self._player:
+            self._player.cancel()
@@ -86,6 +86,16 @@ AUDIO_FILE_EXT_ALIASES = {
     "wave": "wav",
 }
 
+# formats that only ever hold lossy audio, which is always decoded to 16-bit
+# samples (see the fltp workaround in from_file), so there is no need to ask
+# ffprobe about them first. mp4/ogg/webm are left out as they can hold
+# lossless codecs (alac, flac) with more bits per sample.
+PROBELESS_FORMATS = ("mp3",)
+
+# formats ffmpeg can encode to a pipe, without seeking back in the output.
+# wav is left out as ffmpeg can't go back to fill in the RIFF/data sizes.
+PIPE_EXPORT_FORMATS = ("mp3", "ogg", "opus", "adts", "s16le", "u8")
+
 WavSubChunk = namedtuple('WavSubChunk', ['id', 'position', 'size'])
 WavData = namedtuple('WavData', ['audio_format', 'channels', 'sample_rate',
                                  'bits_per_sample', 'raw_data'])
@@ -134,6 +144,22 @@ def read_wav_audio(data, headers=None):
                    data[pos:pos + data_hdr.size])
 
 
+def read_piped_wav_audio(data):
+    """
+    Reads wav audio that ffmpeg wrote to a pipe. ffmpeg can't go back and fill
+    in the chunk sizes of a pipe, so the audio runs to the end of data.
+
+    raw_data is a memoryview of data, so the audio isn't copied.
+    """
+    data = memoryview(data)
+    headers = extract_wav_headers(data)
+    if headers and headers[-1].id == b'data':
+        data_hdr = headers[-1]
+        headers[-1] = data_hdr._replace(size=len(data) - data_hdr.position - 8)
+
+    return read_wav_audio(data, headers)
+
+
 def fix_wav_headers(data):
     headers = extract_wav_headers(data)
     if not headers or headers[-1].id != b'data':
@@ -264,15 +290,42 @@ class AudioSegment(object):
         """
         public access to the raw audio data as a bytestring
         """
+        if isinstance(self._data, memoryview):
+            return self._data.tobytes()
         return self._data
 
+    def as_view(self):
+        """
+        Returns this audio segment backed by a memoryview of its data.
+
+        Slicing a view-backed segment (and anything built on slicing, like
+        make_chunks or get_sample_slice) returns views of the same buffer
+        instead of copying it. Effects that change samples still return
+        new, bytes-backed segments, and raw_data always returns bytes.
+        """
+        if isinstance(self._data, memoryview):
+            return self
+        return self._spawn(memoryview(self._data))
+
+    def __getstate__(self):
+        """
+        memoryviews can't be pickled, so view-backed segments are pickled
+        (and deep copied) with a bytes copy of their data
+        """
+        state = self.__dict__.copy()
+        if isinstance(state.get('_data'), memoryview):
+            state['_data'] = state['_data'].tobytes()
+        return state
+
     def get_array_of_samples(self, array_type_override=None):
         """
         returns the raw_data as an array of samples
         """
         if array_type_override is None:
             array_type_override = self.array_type
-        return array.array(array_type_override, self._data)
+        samples = array.array(array_type_override)
+        samples.frombytes(self._data)
+        return samples
 
     @property
     def array_type(self):
@@ -332,7 +385,7 @@ class AudioSegment(object):
                     "missing frames: %s" % missing_frames)
             silence = audioop.mul(data[:self.frame_width],
                                   self.sample_width, 0)
-            data += (silence * missing_frames)
+            data = bytes(data) + (silence * missing_frames)
 
         return self._spawn(data)
 
@@ -399,7 +452,7 @@ class AudioSegment(object):
         if isinstance(arg, AudioSegment):
             return self.overlay(arg, position=0, loop=True)
         else:
-            return self._spawn(data=self._data * arg)
+            return self._spawn(data=bytes(self._data) * arg)
 
     def _spawn(self, data, overrides={}):
         """
@@ -732,6 +785,9 @@ class AudioSegment(object):
 
         if codec:
             info = None
+        elif format in PROBELESS_FORMATS: # only when told, a file named .mp3 may not be one
+            info = None
+            conversion_command += ["-acodec", "pcm_s16le"]
         else:
             info = mediainfo_json(orig_file, read_ahead_limit=read_ahead_limit)
         if info:
@@ -782,10 +838,16 @@ class AudioSegment(object):
                 "Decoding failed. ffmpeg returned error code: {0}\n\nOutput from ffmpeg/avlib:\n\n{1}".format(
                     p.returncode, p_err.decode(errors='ignore') ))
 
-        p_out = bytearray(p_out)
-        fix_wav_headers(p_out)
-        p_out = bytes(p_out)
-        obj = cls(p_out)
+        wav_data = read_piped_wav_audio(p_out)
+        pcm = wav_data.raw_data
+        if wav_data.bits_per_sample == 8:
+            # convert from unsigned integers in wav
+            pcm = audioop.bias(pcm, 1, -128)
+
+        # pcm is a view of ffmpeg's output (unless it had to be biased), so
+        # the segment is view-backed, like as_view(), and nothing is copied
+        obj = cls(data=pcm, sample_width=wav_data.bits_per_sample // 8,
+                  frame_rate=wav_data.sample_rate, channels=wav_data.channels)
 
         if close_file:
             file.close()
@@ -883,8 +945,14 @@ class AudioSegment(object):
         # wav with no ffmpeg parameters can just be written directly to out_f
         easy_wav = format == "wav" and codec is None and parameters is None
 
+        # formats that can be streamed are piped through ffmpeg without
+        # writing temporary files
+        piped = format in PIPE_EXPORT_FORMATS
+
         if easy_wav:
             data = out_f
+        elif piped:
+            data = BytesIO()
         else:
             data = NamedTemporaryFile(mode="wb", delete=False)
 
@@ -908,13 +976,13 @@ class AudioSegment(object):
             out_f.seek(0)
             return out_f
 
-        output = NamedTemporaryFile(mode="w+b", delete=False)
+        output = None if piped else NamedTemporaryFile(mode="w+b", delete=False)
 
         # build converter command to export
         conversion_command = [
             FFMPEG,
             '-y',  # always overwrite existing files
-            "-f", "wav", "-i", data.name,  # input options (filename last)
+            "-f", "wav", "-i", "-" if piped else data.name,  # input options (filename last)
         ]
 
         if codec is None:
@@ -961,17 +1029,23 @@ class AudioSegment(object):
             conversion_command.extend(["-write_xing", "0"])
 
         conversion_command.extend([
-            "-f", format, output.name,  # output options (filename last)
+            "-f", format, "-" if piped else output.name,  # output options (filename last)
         ])
 
         log_conversion(conversion_command)
 
-        # read stdin / write stdout
-        with open(os.devnull, 'rb') as devnull:
-            p = subprocess.Popen(conversion_command, stdin=devnull, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        p_out, p_err = p.communicate()
+        if piped:
+            # wav in through stdin, encoded audio out through stdout
+            p = subprocess.Popen(conversion_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with data.getbuffer() as wav:
+                p_out, p_err = p.communicate(input=wav)
+        else:
+            # read stdin / write stdout
+            with open(os.devnull, 'rb') as devnull:
+                p = subprocess.Popen(conversion_command, stdin=devnull, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            p_out, p_err = p.communicate()
+            log_subprocess_output(p_out)
 
-        log_subprocess_output(p_out)
         log_subprocess_output(p_err)
 
         if p.returncode != 0:
@@ -979,6 +1053,13 @@ class AudioSegment(object):
                 "Encoding failed. ffmpeg/avlib returned error code: {0}\n\nCommand:{1}\n\nOutput from ffmpeg/avlib:\n\n{2}".format(
                     p.returncode, conversion_command, p_err.decode(errors='ignore') ))
 
+        if piped:
+            out_f.write(p_out)
+            data.close()
+
+            out_f.seek(0)
+            return out_f
+
         output.seek(0)
         out_f.write(output.read())
 
@@ -1259,7 +1340,7 @@ class AudioSegment(object):
         seg1, seg2 = AudioSegment._sync(self, seg)
 
         if not crossfade:
-            return seg1._spawn(seg1._data + seg2._data)
+            return seg1._spawn(b''.join((seg1._data, seg2._data)))
         elif crossfade > len(self):
             raise ValueError("Crossfade is longer than the original AudioSegment ({}ms > {}ms)".format(
                 crossfade, len(self)
@@ -12,6 +12,11 @@ from .utils import (
 from .silence import split_on_silence
 from .exceptions import TooManyMissingFrames, InvalidDuration
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if sys.version_info >= (3, 0):
     xrange = range
 
@@ -49,6 +54,140 @@ def normalize(seg, headroom=0.1):
     return seg.apply_gain(needed_boost)
 
 
+_NUMPY_DTYPES = {1: "int8", 2: "int16", 4: "int32"}
+
+
+def _ms_to_frames(seg, ms):
+    # the same rounding AudioSegment uses when slicing by milliseconds
+    return int(seg.frame_count(ms=ms))
+
+
+def _frames_to_ms(seg, frames):
+    # the same rounding as len(AudioSegment)
+    return round(1000 * (frames / seg.frame_rate))
+
+
+def _fade_gains(seg, frames, from_gain, to_gain):
+    """
+    Per frame gains of AudioSegment.fade(from_gain, to_gain, start=0, end=inf)
+    on a segment <frames> long, or None if that fade would not use precise
+    (per sample) fading. Like fade(), any frames past the rounded length in
+    milliseconds are dropped, so there may be fewer gains than frames.
+    """
+    duration = _frames_to_ms(seg, frames)
+    if not 0 < duration <= 100:
+        return None
+
+    fade_frames = seg.frame_count(ms=duration)
+    from_power = db_to_float(from_gain)
+    scale_step = (db_to_float(to_gain) - from_power) / fade_frames
+    return from_power + (scale_step * np.arange(min(int(fade_frames), frames), dtype=np.float64))
+
+
+def _apply_gains(samples, gains, sample_width):
+    # audioop.mul, one gain per frame
+    min_val, max_val = get_min_max_value(sample_width * 8)
+    scaled = samples[:len(gains)].astype(np.float64) * gains[:, None]
+    scaled = np.where(scaled > max_val, float(max_val), np.where(scaled < min_val + 1.0, float(min_val), scaled))
+    return np.floor(scaled)
+
+
+def _speedup_in_place(seg, chunk_length, ms_to_remove_per_chunk, crossfade):
+    """
+    Produces the same audio as chaining AudioSegment.append(chunk, crossfade)
+    over the truncated chunks in speedup(), but writes every chunk and
+    crossfade straight into one output buffer instead of copying the
+    accumulated audio on every append.
+
+    Returns None if the chunk geometry hits an edge case the append chain
+    handles differently (the caller then falls back to it).
+    """
+    channels = seg.channels
+    total_frames = int(seg.frame_count())
+    samples = np.frombuffer(seg._data, dtype=_NUMPY_DTYPES[seg.sample_width])
+    samples = samples[:total_frames * channels].reshape(-1, channels)
+
+    seg_ms = len(seg)
+    crossfade_frames = _ms_to_frames(seg, crossfade)
+    head_gains = _fade_gains(seg, crossfade_frames, -120, 0)
+    chunk_count = int(math.ceil(seg_ms / float(chunk_length)))
+    if head_gains is None or chunk_count < 2:
+        return None
+
+    # first pass: work out where every piece of the output comes from and
+    # goes to, without touching any audio. every piece is
+    # (source start, source end, padding frames)
+    pieces = []
+    for i in range(chunk_count):
+        start = _ms_to_frames(seg, min(i * chunk_length, seg_ms))
+        end = _ms_to_frames(seg, min((i + 1) * chunk_length, seg_ms))
+        padding = max(0, end - max(start, total_frames))
+        if padding and (padding > seg.frame_count(ms=2) or start >= total_frames):
+            return None
+        end = min(end, total_frames)
+
+        if i < chunk_count - 1:
+            keep = _ms_to_frames(seg, _frames_to_ms(seg, end - start + padding) - ms_to_remove_per_chunk)
+            if not 0 <= keep <= end - start:
+                return None
+            end, padding = start + keep, 0
+        pieces.append((start, end, padding))
+
+    # (tail start, tail frames, tail gains, rest end) for every crossfade
+    crossfades = []
+    out_frames = pieces[0][1] - pieces[0][0] + pieces[0][2]
+    for start, end, padding in pieces[1:-1]:
+        out_ms = _frames_to_ms(seg, out_frames)
+        piece_ms = _frames_to_ms(seg, end - start)
+        if crossfade > out_ms or crossfade > piece_ms:
+            return None
+
+        tail_start = _ms_to_frames(seg, out_ms - crossfade)
+        tail_end = _ms_to_frames(seg, out_ms)
+        rest_end = _ms_to_frames(seg, piece_ms)
+        if not 0 <= tail_start < min(tail_end, out_frames) or not crossfade_frames <= rest_end <= end - start:
+            return None
+        if tail_end - out_frames > seg.frame_count(ms=2):
+            return None
+        if (tail_gains := _fade_gains(seg, tail_end - tail_start, 0, -120)) is None:
+            return None
+
+        crossfades.append((tail_start, tail_end - tail_start, tail_gains, rest_end))
+        out_frames = tail_start + len(tail_gains) + rest_end - crossfade_frames
+
+    start, end, padding = pieces[-1]
+    out = np.empty((out_frames + end - start + padding, channels), dtype=samples.dtype)
+    min_val, max_val = get_min_max_value(seg.sample_width * 8)
+
+    # second pass: copy the audio, crossfading as we go
+    start, end, padding = pieces[0]
+    out[:end - start] = samples[start:end]
+    position = end - start
+
+    for (tail_start, tail_frames, tail_gains, rest_end), (start, end, padding) in zip(crossfades, pieces[1:-1]):
+        # a tail running past the end of the output is padded with silence
+        tail = np.zeros((tail_frames, channels), dtype=samples.dtype)
+        available = min(tail_frames, position - tail_start)
+        tail[:available] = out[tail_start:tail_start + available]
+
+        tail = _apply_gains(tail, tail_gains, seg.sample_width)
+        head = _apply_gains(samples[start:start + crossfade_frames], head_gains, seg.sample_width)
+        # overlay(loop=True) repeats the head if it is shorter than the tail
+        head = np.resize(head, tail.shape)
+
+        out[tail_start:tail_start + len(tail)] = np.clip(tail + head, min_val, max_val)
+        position = tail_start + len(tail)
+
+        rest = samples[start + crossfade_frames:start + rest_end]
+        out[position:position + len(rest)] = rest
+        position += len(rest)
+
+    start, end, padding = pieces[-1]
+    out[position:position + end - start] = samples[start:end]
+    out[position + end - start:] = 0
+    return seg._spawn(out.tobytes())
+
+
 @register_pydub_effect
 def speedup(seg, playback_speed=1.5, chunk_size=150, crossfade=25):
     # we will keep audio in 150ms chunks since one waveform at 20Hz is 50ms long
@@ -72,6 +211,13 @@ def speedup(seg, playback_speed=1.5, chunk_size=150, crossfade=25):
     # DEBUG
     #print("chunk: {0}, rm: {1}".format(chunk_size, ms_to_remove_per_chunk))
 
+    # with numpy, the chunks are crossfaded straight into one buffer rather
+    # than appended one by one (which copies everything kept so far each time)
+    if np is not None and seg.sample_width in _NUMPY_DTYPES and 0 < crossfade <= 100:
+        out = _speedup_in_place(seg, chunk_size + ms_to_remove_per_chunk, ms_to_remove_per_chunk - crossfade, crossfade)
+        if out is not None:
+            return out
+
     chunks = make_chunks(seg, chunk_size + ms_to_remove_per_chunk)
     if len(chunks) < 2:
         raise Exception("Could not speed up AudioSegment, it was too short {2:0.2f}s for the current settings:\n{0}ms chunks at {1:0.1f}x speedup".format(
@@ -0,0 +1,402 @@
+"""NumPy implementation of the audioop primitives used by pydub.
+
+Results are byte-identical to the C `audioop` module (Removed in Python 3.13). Where
+C accumulates in floating point one sample at a time, the same order is kept whenever
+the result could otherwise differ. Importing this module raises ImportError if NumPy
+is not installed, in which case `utils` falls back to `pyaudioop`.
+"""
+import math
+
+import numpy as np
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
+
+class error(Exception):
+    pass
+
+
+_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+_MAXVALS = {1: 0x7f, 2: 0x7fff, 3: 0x7fffff, 4: 0x7fffffff}
+_MINVALS = {1: -0x80, 2: -0x8000, 3: -0x800000, 4: -0x80000000}
+_EXACT_FLOAT_LIMIT = 2.0 ** 53
+
+
+def _check_size(size):
+    if size not in (1, 2, 3, 4):
+        raise error("Size should be 1, 2, 3 or 4")
+
+
+def _check_params(length, size):
+    _check_size(size)
+    if length % size != 0:
+        raise error("not a whole number of frames")
+
+
+def _buffer(cp):
+    view = memoryview(cp)
+    return view.cast("B") if view.format != "B" or view.ndim != 1 else view
+
+
+def _samples(cp, size):
+    """Returns the samples of a fragment as an int64 array."""
+    data = _buffer(cp)
+    if size == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int64)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        return values - ((values & 0x800000) << 1)
+    return np.frombuffer(data, dtype=_DTYPES[size]).astype(np.int64)
+
+
+def _pack(values, size):
+    """Packs integer samples (Already in range, or to be wrapped) into a fragment."""
+    if size == 3:
+        return values.astype(np.int32).view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return values.astype(_DTYPES[size]).tobytes()
+
+
+def _float_sum(terms, bound):
+    """Sums float64 terms the way C does (One at a time, left to right).
+    When every partial sum is an exact integer (Below 2**53) the order does not matter, so the faster pairwise sum is used."""
+    if len(terms) == 0:
+        return 0.0
+    if bound * len(terms) < _EXACT_FLOAT_LIMIT:
+        return float(terms.sum())
+    return float(np.cumsum(terms)[-1])
+
+
+def _fbound(values, size):
+    """Clamps float samples to the range of `size`, then rounds towards minus infinity. (audioop.c `fbound`)"""
+    maxval, minval = float(_MAXVALS[size]), float(_MINVALS[size])
+    values = np.where(values > maxval, maxval, np.where(values < minval + 1.0, minval, values))
+    return np.floor(values).astype(np.int64)
+
+
+def _to_sample32(values, size):
+    return values << (32 - 8 * size)
+
+
+def _from_sample32(values, size):
+    return values >> (32 - 8 * size)
+
+
+def getsample(cp, size, i):
+    _check_params(len(_buffer(cp)), size)
+    if not (0 <= i < len(_buffer(cp)) // size):
+        raise error("Index out of range")
+    return int(_samples(_buffer(cp)[i * size:(i + 1) * size], size)[0])
+
+
+def max(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size)
+    if len(samples) == 0:
+        return 0
+    return int(np.abs(samples).max())
+
+
+def minmax(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size)
+    if len(samples) == 0:
+        return 0x7fffffff, -0x80000000
+    return int(samples.min()), int(samples.max())
+
+
+def avg(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size)
+    if len(samples) == 0:
+        return 0
+    total = _float_sum(samples.astype(np.float64), _MAXVALS[size] + 1)
+    return int(math.floor(total / float(len(samples))))
+
+
+def rms(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size).astype(np.float64)
+    if len(samples) == 0:
+        return 0
+    total = _float_sum(samples * samples, float(_MAXVALS[size] + 1) ** 2)
+    return int(math.sqrt(total / float(len(samples))))
+
+
+def _divide(a, b):
+    """Divides like C does, giving inf or nan instead of raising ZeroDivisionError."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.float64(a) / np.float64(b))
+
+
+def _sum2(a, b):
+    return _float_sum(a.astype(np.float64) * b.astype(np.float64), 2.0 ** 30)
+
+
+def _sliding_sum2(samples, length):
+    """The sum of squares of every `length` long window, as C computes it. (Adding the sample entering the window and subtracting the one leaving it)"""
+    squares = samples * samples
+    if (len(samples) + 1) * 2.0 ** 30 < _EXACT_FLOAT_LIMIT:
+        totals = np.concatenate(([0], np.cumsum(squares)))
+        return (totals[length:] - totals[:-length] if length else np.zeros(len(samples) + 1, dtype=np.int64)).astype(np.float64)
+
+    result = np.empty(len(samples) - length + 1, dtype=np.float64)
+    result[0] = _sum2(samples[:length], samples[:length])
+    floats = squares.astype(np.float64)
+    for i in range(1, len(result)):
+        result[i] = result[i - 1] + floats[i + length - 1] - floats[i - 1]
+    return result
+
+
+def findfit(cp1, cp2):
+    if len(_buffer(cp1)) % 2 != 0 or len(_buffer(cp2)) % 2 != 0:
+        raise error("Strings should be even-sized")
+    samples1, samples2 = _samples(cp1, 2), _samples(cp2, 2)
+    len1, len2 = len(samples1), len(samples2)
+    if len1 < len2:
+        raise error("First sample should be longer")
+
+    sum_ri_2 = _sum2(samples2, samples2)
+    sum_aij_2 = _sliding_sum2(samples1, len2)
+    if len2 == 0:
+        sum_aij_ri = np.zeros(len1 + 1, dtype=np.float64)
+    elif (len2 + 1) * 2.0 ** 30 < _EXACT_FLOAT_LIMIT:
+        sum_aij_ri = np.correlate(samples1, samples2, mode="valid").astype(np.float64)
+    else:
+        sum_aij_ri = np.array([_sum2(samples1[j:j + len2], samples2) for j in range(len1 - len2 + 1)])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results = (sum_ri_2 * sum_aij_2 - sum_aij_ri * sum_aij_ri) / sum_aij_2
+
+    best_i = 0
+    if not math.isnan(results[0]):
+        best_i = int(np.argmin(np.where(np.isnan(results), np.inf, results)))
+        if not results[best_i] < results[0]:
+            best_i = 0
+
+    return best_i, _divide(_sum2(samples1[best_i:best_i + len2], samples2), sum_ri_2)
+
+
+def findfactor(cp1, cp2):
+    if len(_buffer(cp1)) % 2 != 0:
+        raise error("Strings should be even-sized")
+    if len(_buffer(cp1)) != len(_buffer(cp2)):
+        raise error("Samples should be same size")
+    samples1, samples2 = _samples(cp1, 2), _samples(cp2, 2)
+    return _divide(_sum2(samples1, samples2), _sum2(samples2, samples2))
+
+
+def findmax(cp, len2):
+    if len(_buffer(cp)) % 2 != 0:
+        raise error("Strings should be even-sized")
+    samples = _samples(cp, 2)
+    if len2 < 0 or len(samples) < len2:
+        raise error("Input sample should be longer")
+    if len(samples) == 0:
+        return 0
+    # Strictly greater, so the first of equal windows is kept
+    return int(np.argmax(_sliding_sum2(samples, len2)))
+
+
+def _extremes(samples):
+    """Returns the local extremes of a fragment the same way audioop.c finds them for avgpp and maxpp."""
+    if len(samples) < 2:
+        return samples[:0]
+
+    changed = np.concatenate(([True], samples[1:] != samples[:-1]))
+    values = samples[changed]
+    if len(values) < 2:
+        return samples[:0]
+
+    falling = values[1:] < values[:-1]
+    previous = np.empty(len(falling), dtype=np.int64)
+    previous[0] = 17 # Anything but 0 or 1, so the first sample is never an extreme
+    previous[1:] = falling[:-1]
+    is_extreme = previous == (~falling).astype(np.int64)
+    return values[:-1][is_extreme]
+
+
+def avgpp(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    extremes = _extremes(_samples(cp, size))
+    if len(extremes) < 2:
+        return 0
+    total = _float_sum(np.abs(np.diff(extremes)).astype(np.float64), 2.0 ** 32)
+    return int(total / float(len(extremes) - 1))
+
+
+def maxpp(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    extremes = _extremes(_samples(cp, size))
+    if len(extremes) < 2:
+        return 0
+    return int(np.abs(np.diff(extremes)).max())
+
+
+def cross(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    negative = _samples(cp, size) < 0
+    if len(negative) == 0:
+        return -1
+    return int(np.count_nonzero(negative[1:] != negative[:-1]))
+
+
+def mul(cp, size, factor):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size).astype(np.float64)
+    return _pack(_fbound(samples * float(factor), size), size)
+
+
+def tomono(cp, size, fac1, fac2):
+    _check_params(len(_buffer(cp)), size)
+    if len(_buffer(cp)) % (2 * size) != 0:
+        raise error("not a whole number of frames")
+    samples = _samples(cp, size).astype(np.float64)
+    mono = samples[0::2] * float(fac1) + samples[1::2] * float(fac2)
+    return _pack(_fbound(mono, size), size)
+
+
+def tostereo(cp, size, fac1, fac2):
+    _check_params(len(_buffer(cp)), size)
+    samples = _samples(cp, size).astype(np.float64)
+    stereo = np.empty(len(samples) * 2, dtype=np.int64)
+    stereo[0::2] = _fbound(samples * float(fac1), size)
+    stereo[1::2] = _fbound(samples * float(fac2), size)
+    return _pack(stereo, size)
+
+
+def add(cp1, cp2, size):
+    _check_params(len(_buffer(cp1)), size)
+    if len(_buffer(cp1)) != len(_buffer(cp2)):
+        raise error("Lengths should be the same")
+    total = _samples(cp1, size) + _samples(cp2, size)
+    return _pack(np.clip(total, _MINVALS[size], _MAXVALS[size]), size)
+
+
+def bias(cp, size, bias):
+    _check_params(len(_buffer(cp)), size)
+    if not -0x80000000 <= bias <= 0x7fffffff:
+        raise OverflowError("Python int too large to convert to C int")
+    mask = (1 << (8 * size)) - 1
+    unsigned = _samples(cp, size) & mask
+    return _pack((unsigned + (bias & 0xffffffff)) & mask, size)
+
+
+def reverse(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    return _pack(_samples(cp, size)[::-1], size)
+
+
+def byteswap(cp, size):
+    _check_params(len(_buffer(cp)), size)
+    data = np.frombuffer(_buffer(cp), dtype=np.uint8).reshape(-1, size)
+    return data[:, ::-1].tobytes()
+
+
+def lin2lin(cp, size, size2):
+    _check_params(len(_buffer(cp)), size)
+    _check_size(size2)
+    if size == size2:
+        return bytes(_buffer(cp))
+    samples = _to_sample32(_samples(cp, size), size)
+    return _pack(_from_sample32(samples, size2), size2)
+
+
+def _ratecv_filtered(samples, nchannels, weightA, weightB, prev_i, cur_i):
+    """Applies ratecv's filter (Which depends on its own previous output) one frame at a time, as C does."""
+    filtered = np.empty(samples.shape, dtype=np.int64)
+    for frame in range(samples.shape[0]):
+        for chan in range(nchannels):
+            prev_i[chan] = cur_i[chan]
+            cur_i[chan] = int((float(weightA) * float(samples[frame, chan]) + float(weightB) * float(prev_i[chan])) / (float(weightA) + float(weightB)))
+            filtered[frame, chan] = cur_i[chan]
+    return filtered
+
+
+def ratecv(cp, size, nchannels, inrate, outrate, state, weightA=1, weightB=0):
+    _check_size(size)
+    if nchannels < 1:
+        raise error("# of channels should be >= 1")
+    bytes_per_frame = size * nchannels
+    if weightA < 1 or weightB < 0:
+        raise error("weightA should be >= 1, weightB should be >= 0")
+    if len(_buffer(cp)) % bytes_per_frame != 0:
+        raise error("not a whole number of frames")
+    if inrate <= 0 or outrate <= 0:
+        raise error("sampling rate not > 0")
+
+    d = gcd(inrate, outrate)
+    inrate //= d
+    outrate //= d
+    d = gcd(weightA, weightB)
+    weightA //= d
+    weightB //= d
+
+    if state is None:
+        d = -outrate
+        prev_i, cur_i = [0] * nchannels, [0] * nchannels
+    else:
+        if not isinstance(state, tuple):
+            raise TypeError("state must be a tuple or None")
+        try:
+            d, samps = state
+        except ValueError:
+            raise TypeError("ratecv(): illegal state argument")
+        if not isinstance(samps, tuple) or len(samps) != nchannels:
+            raise error("illegal state argument")
+        prev_i, cur_i = [], []
+        for channel in samps:
+            if not isinstance(channel, tuple) or len(channel) != 2:
+                raise TypeError("ratecv(): illegal state argument")
+            prev_i.append(int(channel[0]))
+            cur_i.append(int(channel[1]))
+
+    samples = _to_sample32(_samples(cp, size), size).reshape(-1, nchannels)
+    frame_count = samples.shape[0]
+
+    if weightB == 0:
+        filtered = samples # The filter does nothing (weightA * x / weightA)
+    else:
+        filtered = _ratecv_filtered(samples, nchannels, weightA, weightB, list(prev_i), list(cur_i))
+
+    # Every input frame (After the two from the state) in the order C loads them into prev_i / cur_i
+    history = np.concatenate((np.array([prev_i, cur_i], dtype=np.int64), filtered))
+
+    # Output frame m is written once k_m input frames have been read, where k_m is the smallest k with d + k*outrate - m*inrate >= 0
+    end = d + frame_count * outrate
+    output_count = end // inrate + 1 if end >= 0 else 0
+    m = np.arange(output_count, dtype=np.int64)
+    k = np.maximum(0, -((d - m * inrate) // outrate))
+    d_m = (d + k * outrate - m * inrate).astype(np.float64)[:, None]
+
+    prev, cur = history[k].astype(np.float64), history[k + 1].astype(np.float64)
+    output = np.trunc((prev * d_m + cur * (float(outrate) - d_m)) / float(outrate)).astype(np.int64)
+
+    final_d = int(end - output_count * inrate)
+    samps = tuple((int(history[frame_count][chan]), int(history[frame_count + 1][chan])) for chan in range(nchannels))
+    return _pack(_from_sample32(output.reshape(-1), size), size), (final_d, samps)
+
+
+def lin2ulaw(cp, size):
+    raise NotImplementedError()
+
+
+def ulaw2lin(cp, size):
+    raise NotImplementedError()
+
+
+def lin2alaw(cp, size):
+    raise NotImplementedError()
+
+
+def alaw2lin(cp, size):
+    raise NotImplementedError()
+
+
+def lin2adpcm(cp, size, state):
+    raise NotImplementedError()
+
+
+def adpcm2lin(cp, size, state):
+    raise NotImplementedError()
@@ -2,8 +2,107 @@
 Various functions for finding/manipulating silence in AudioSegments
 """
 import itertools
+import math
 
-from .utils import db_to_float
+from .utils import db_to_float, ratio_to_db
+from .exceptions import TooManyMissingFrames
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _cumulative_squares(audio_segment):
+    """
+    Running totals of the squared samples of audio_segment, starting at 0, so
+    the sum of squares of samples a..b is totals[b] - totals[a].
+    """
+    samples = audio_segment.get_array_of_samples()
+    if np is not None:
+        totals = np.zeros(len(samples) + 1, dtype=np.int64)
+        squares = np.frombuffer(samples, dtype=samples.typecode).astype(np.int64)
+        np.cumsum(squares * squares, out=totals[1:])
+        return totals
+    return list(itertools.accumulate((sample * sample for sample in samples), initial=0))
+
+
+def _windowed_rms_numpy(audio_segment, window_len, starts, totals):
+    # windowed_rms() with every window measured at once
+    seg_len = len(audio_segment)
+    channels = audio_segment.channels
+    frames_per_ms = audio_segment.frame_rate / 1000.0
+    starts = np.asarray(starts, dtype=np.int64)
+
+    start = (np.minimum(starts, seg_len) * frames_per_ms).astype(np.int64)
+    end = (np.minimum(starts + window_len, seg_len) * frames_per_ms).astype(np.int64)
+    available = np.maximum(0, np.minimum(end, int(audio_segment.frame_count())) - start)
+
+    missing_frames = np.where(available > 0, end - start - available, 0)
+    if len(starts) and missing_frames.max() > audio_segment.frame_count(ms=2):
+        raise TooManyMissingFrames(
+            "You should never be filling in "
+            "   more than 2 ms with silence here, "
+            "missing frames: %s" % missing_frames.max())
+
+    sample_count = np.where(available > 0, end - start, 0) * channels
+    sum_squares = (totals[(start + available) * channels] - totals[start * channels]).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rms_values = np.sqrt(sum_squares / sample_count.astype(np.float64))
+    return np.where(sample_count > 0, rms_values, 0).astype(np.int64).tolist()
+
+
+def windowed_rms(audio_segment, window_len, starts):
+    """
+    Returns the rms of audio_segment[start:start + window_len] for every start
+    (in ms) in starts, exactly as AudioSegment.rms would, without slicing the
+    segment for every window.
+
+    For 8 and 16 bit audio the squared samples are summed once and every window
+    is a difference of two running totals, so the whole segment is O(n). Every
+    partial sum fits in a double exactly, so the result matches audioop.rms.
+    Wider samples can lose precision in audioop's floating point sum, so they
+    are still measured one slice at a time.
+    """
+    starts = list(starts)
+    if audio_segment.sample_width > 2:
+        return [audio_segment[i:i + window_len].rms for i in starts]
+
+    seg_len = len(audio_segment)
+    channels = audio_segment.channels
+    frame_count = int(audio_segment.frame_count())
+    max_missing_frames = audio_segment.frame_count(ms=2)
+    totals = _cumulative_squares(audio_segment)
+
+    if np is not None:
+        return _windowed_rms_numpy(audio_segment, window_len, starts, totals)
+
+    rms_values = []
+    for i in starts:
+        # the same millisecond to frame rounding as AudioSegment.__getitem__
+        start = audio_segment._parse_position(min(i, seg_len))
+        end = audio_segment._parse_position(min(i + window_len, seg_len))
+        available = max(0, min(end, frame_count) - start)
+
+        # short slices are padded with silence, which counts towards the rms
+        sample_count = available
+        if available:
+            missing_frames = end - start - available
+            if missing_frames > max_missing_frames:
+                raise TooManyMissingFrames(
+                    "You should never be filling in "
+                    "   more than 2 ms with silence here, "
+                    "missing frames: %s" % missing_frames)
+            sample_count = end - start
+
+        if not sample_count:
+            rms_values.append(0)
+            continue
+
+        sum_squares = float(totals[(start + available) * channels] - totals[start * channels])
+        rms_values.append(int(math.sqrt(sum_squares / float(sample_count * channels))))
+
+    return rms_values
 
 
 def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, seek_step=1):
@@ -38,9 +137,9 @@ def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, seek
     if last_slice_start % seek_step:
         slice_starts = itertools.chain(slice_starts, [last_slice_start])
 
-    for i in slice_starts:
-        audio_slice = audio_segment[i:i + min_silence_len]
-        if audio_slice.rms <= silence_thresh:
+    slice_starts = list(slice_starts)
+    for i, rms in zip(slice_starts, windowed_rms(audio_segment, min_silence_len, slice_starts)):
+        if rms <= silence_thresh:
             silence_starts.append(i)
 
     # short circuit when there is no silence
@@ -173,7 +272,12 @@ def detect_leading_silence(sound, silence_threshold=-50.0, chunk_size=10):
     """
     trim_ms = 0 # ms
     assert chunk_size > 0 # to avoid infinite loop
-    while sound[trim_ms:trim_ms+chunk_size].dBFS < silence_threshold and trim_ms < len(sound):
+    max_possible_amplitude = sound.max_possible_amplitude
+    for rms in windowed_rms(sound, chunk_size, range(0, len(sound), chunk_size)):
+        # same as sound[trim_ms:trim_ms+chunk_size].dBFS
+        dBFS = ratio_to_db(rms / max_possible_amplitude) if rms else -float("infinity")
+        if not dBFS < silence_threshold:
+            break
         trim_ms += chunk_size
 
     # if there is no end it should return the length of the segment
@@ -16,7 +16,10 @@ from ...common import (
 try:
     import audioop
 except ImportError:
-    import pyaudioop as audioop
+    try:
+        from . import npaudioop as audioop
+    except ImportError:
+        from . import pyaudioop as audioop
 
 from ...common.developerconfig import FFMPEG, FFPROBE
 if sys.version_info >= (3, 0):
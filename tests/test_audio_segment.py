@@ -0,0 +1,81 @@
+"""Tests for memoryview-backed audio segments (`AudioSegment.as_view`)."""
+import copy, io, os, pickle, tracemalloc, wave
+
+import pytest
+
+from sources.voice.pydub import audio_segment
+from sources.voice.pydub.audio_segment import AudioSegment
+from sources.voice.pydub.utils import make_chunks
+
+FIVE_MINUTES = AudioSegment(os.urandom(24000 * 2 * 300), sample_width=2, frame_rate=24000, channels=1) # What gTTS returns, decoded
+
+def _peak_memory(function) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _process(segment: AudioSegment) -> bytes:
+    # The same steps as `GTTSModel.process_text`, after decoding
+    return segment.speedup(playback_speed=1.25).set_frame_rate(48000).set_channels(2).set_sample_width(2).raw_data
+
+def test_view_matches_bytes():
+    view = FIVE_MINUTES.as_view()
+    assert view[1000:2500].raw_data == FIVE_MINUTES[1000:2500].raw_data
+    assert [chunk.raw_data for chunk in make_chunks(view, 150)[:20]] == [chunk.raw_data for chunk in make_chunks(FIVE_MINUTES, 150)[:20]]
+    assert _process(view[:10000]) == _process(FIVE_MINUTES[:10000])
+
+def test_chunking_a_view_does_not_copy():
+    copied = _peak_memory(lambda: make_chunks(FIVE_MINUTES, 150))
+    viewed = _peak_memory(lambda: make_chunks(FIVE_MINUTES.as_view(), 150))
+    
+    assert copied >= len(FIVE_MINUTES.raw_data)
+    assert viewed < copied / 10
+
+def test_pipeline_peak_memory():
+    view = FIVE_MINUTES.as_view()
+    assert _peak_memory(lambda: _process(view)) <= _peak_memory(lambda: _process(FIVE_MINUTES)) * 1.05
+
+def test_pickle_view():
+    view = FIVE_MINUTES[:1000].as_view()[100:600]
+    
+    for restored in (pickle.loads(pickle.dumps(view)), copy.deepcopy(view)):
+        assert isinstance(restored._data, bytes)
+        assert restored.raw_data == view.raw_data
+        assert (restored.frame_rate, restored.channels, restored.sample_width) == (view.frame_rate, view.channels, view.sample_width)
+    
+    assert isinstance(view._data, memoryview) # Pickling does not change the original
+
+class _PipedFFmpeg:
+    # Writes a wav to stdout like `ffmpeg ... -f wav -`, with the chunk sizes it can't fill in on a pipe
+    def __init__(self, frames: bytes, sample_width: int):
+        self.returncode = 0
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(sample_width)
+            writer.setframerate(24000)
+            writer.writeframes(frames)
+        self.output = bytearray(wav.getvalue())
+        self.output[4:8] = self.output[-len(frames) - 4:-len(frames)] = b"\xff\xff\xff\xff"
+    
+    def __call__(self, *args, **kwargs):
+        return self
+    
+    def communicate(self, input=None):
+        return bytes(self.output), b""
+
+@pytest.mark.parametrize("sample_width", [1, 2])
+def test_from_file_does_not_copy(monkeypatch, sample_width: int):
+    frames = os.urandom(24000 * sample_width)
+    monkeypatch.setattr(audio_segment.subprocess, "Popen", _PipedFFmpeg(frames, sample_width))
+    
+    decoded = AudioSegment.from_file(io.BytesIO(b"mp3"), "mp3")
+    assert (decoded.frame_rate, decoded.channels, decoded.sample_width, len(decoded)) == (24000, 1, sample_width, 1000)
+    if sample_width == 1:
+        assert decoded.raw_data == bytes((byte - 128) % 256 for byte in frames) # 8-bit wav is unsigned, so it has to be biased (And copied)
+    else:
+        assert isinstance(decoded._data, memoryview)
+        assert decoded.raw_data == frames
@@ -0,0 +1,32 @@
+"""Tests for `models.GPTConversationContext` trimming."""
+from sources import models
+
+def _context(budget: int) -> models.GPTConversationContext:
+    context = models.GPTConversationContext(budget, "gpt-4")
+    context._count_message_tokens = lambda content: len(content) # One token per character keeps the arithmetic obvious.
+    return context
+
+def test_oldest_pairs_are_dropped_first():
+    context = _context(10)
+    context.add_conversation_entry("aa", "bb")
+    context.add_conversation_entry("cc", "dd")
+    context.add_conversation_entry("ee", "ff")
+    assert [message["content"] for message in context._context] == ["cc", "dd", "ee", "ff"]
+    assert context.token_count == 8
+
+def test_newest_pair_is_kept_when_over_budget():
+    context = _context(10)
+    context.add_conversation_entry("aa", "bb")
+    context.add_conversation_entry("x" * 20, "y" * 20)
+    assert [message["content"] for message in context._context] == ["x" * 20, "y" * 20]
+    assert context.token_count == 40
+
+    context.add_conversation_entry("cc", "dd")
+    assert [message["content"] for message in context._context] == ["cc", "dd"]
+    assert context.token_count == 4
+
+def test_unlimited_budget():
+    context = _context(None)
+    for _ in range(5):
+        context.add_conversation_entry("x" * 20, "y" * 20)
+    assert len(context._context) == 10
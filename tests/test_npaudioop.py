@@ -0,0 +1,94 @@
+"""Checks that `npaudioop` gives the same results as the C `audioop` module, on random fragments of every sample width. Skipped where `audioop` is missing. (Python 3.13 and newer)"""
+import random, warnings
+
+import pytest
+
+from sources.voice.pydub import npaudioop
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    audioop = pytest.importorskip("audioop")
+
+SIZES = (1, 2, 3, 4)
+SEEDS = range(20)
+
+def _fragment(rng: random.Random, size: int, frames: int, channels: int=1) -> bytes:
+    return rng.randbytes(frames * channels * size)
+
+def _both(function: str, *args):
+    return getattr(audioop, function)(*args), getattr(npaudioop, function)(*args)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_measurements(size: int, seed: int):
+    rng = random.Random(seed)
+    fragment = _fragment(rng, size, rng.randint(1, 500))
+    
+    for function in ("max", "minmax", "avg", "rms", "avgpp", "maxpp", "cross"):
+        expected, actual = _both(function, fragment, size)
+        assert actual == expected, function
+    
+    index = rng.randrange(len(fragment) // size)
+    assert npaudioop.getsample(fragment, size, index) == audioop.getsample(fragment, size, index)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_transforms(size: int, seed: int):
+    rng = random.Random(seed)
+    frames = rng.randint(1, 500)
+    fragment, other, stereo = _fragment(rng, size, frames), _fragment(rng, size, frames), _fragment(rng, size, frames, 2)
+    factor, left, right = rng.uniform(-3, 3), rng.uniform(-2, 2), rng.uniform(-2, 2)
+    
+    cases = {
+        "mul": (fragment, size, factor),
+        "tomono": (stereo, size, left, right),
+        "tostereo": (fragment, size, left, right),
+        "add": (fragment, other, size),
+        "bias": (fragment, size, rng.randint(-2 ** 31, 2 ** 31 - 1)),
+        "reverse": (fragment, size),
+        "byteswap": (fragment, size),
+    }
+    for function, args in cases.items():
+        expected, actual = _both(function, *args)
+        assert actual == expected, function
+    
+    for new_size in SIZES:
+        expected, actual = _both("lin2lin", fragment, size, new_size)
+        assert actual == expected, new_size
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fitting(seed: int):
+    rng = random.Random(seed)
+    reference = _fragment(rng, 2, rng.randint(1, 100))
+    fragment = _fragment(rng, 2, len(reference) // 2 + rng.randint(0, 200))
+    
+    for function, args in {"findfit": (fragment, reference), "findfactor": (reference, reference[::-1])}.items():
+        expected, actual = _both(function, *args)
+        assert actual == expected, function
+    
+    length = rng.randint(1, len(fragment) // 2)
+    assert npaudioop.findmax(fragment, length) == audioop.findmax(fragment, length)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ratecv(size: int, seed: int):
+    rng = random.Random(seed)
+    channels = rng.choice((1, 2))
+    rates = rng.choice(((24000, 48000), (48000, 24000), (44100, 48000), (22050, 8000), (8000, 8000)))
+    weights = rng.choice(((1, 0), (2, 1), (3, 7)))
+    c_state = np_state = None
+    
+    for _ in range(3): # The state returned by each call carries on into the next
+        fragment = _fragment(rng, size, rng.randint(0, 300), channels)
+        expected, c_state = audioop.ratecv(fragment, size, channels, *rates, c_state, *weights)
+        actual, np_state = npaudioop.ratecv(fragment, size, channels, *rates, np_state, *weights)
+        
+        assert actual == expected
+        assert np_state == c_state
+
+def test_errors():
+    for module in (audioop, npaudioop):
+        with pytest.raises(module.error):
+            module.max(b"\x00" * 3, 2)
+        with pytest.raises(module.error):
+            module.mul(b"\x00" * 4, 5, 1.0)
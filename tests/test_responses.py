@@ -0,0 +1,82 @@
+"""Tests for decoding streamed OpenAI replies (`responses.ServerSentEventDecoder` and `responses._iter_gpt_stream`)."""
+import asyncio, json, pathlib, random
+
+import pytest
+
+from sources import responses
+
+STREAM = (pathlib.Path(__file__).parent / "fixtures" / "openai_chat_stream.txt").read_bytes()
+REPLY = "Héllo, wörld! 日本語 🎉🚀 naïve café"
+
+def _split(raw: bytes, cuts: list[int]) -> list[bytes]:
+    bounds = [0, *sorted(cuts), len(raw)]
+    return [raw[start:end] for start, end in zip(bounds, bounds[1:])]
+
+def _decode(chunks: list[bytes]) -> list[str]:
+    decoder = responses.ServerSentEventDecoder()
+    events = [event for chunk in chunks for event in decoder.feed(chunk)]
+    return events + decoder.flush()
+
+def _reply_of(events: list[str]) -> str:
+    return "".join(delta.response for event in events if event != "[DONE]" and (delta := responses._gpt_delta_factory(event)))
+
+EXPECTED_EVENTS = _decode([STREAM])
+
+def test_whole_stream():
+    assert len(EXPECTED_EVENTS) == 8
+    assert EXPECTED_EVENTS[-1] == "[DONE]"
+    assert _reply_of(EXPECTED_EVENTS) == REPLY
+
+def test_every_single_split():
+    # Covers splits in the middle of lines, between "\n\n", and inside every multibyte UTF-8 character.
+    for cut in range(1, len(STREAM)):
+        assert _decode(_split(STREAM, [cut])) == EXPECTED_EVENTS, cut
+
+def test_byte_by_byte():
+    assert _decode([STREAM[i:i + 1] for i in range(len(STREAM))]) == EXPECTED_EVENTS
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_splits(seed: int):
+    rng = random.Random(seed)
+    cuts = rng.sample(range(1, len(STREAM)), rng.randint(1, 40))
+    assert _decode(_split(STREAM, cuts)) == EXPECTED_EVENTS
+
+def test_splits_inside_multibyte_characters():
+    for character in ("é", "日", "🎉"):
+        encoded = character.encode()
+        start = STREAM.index(encoded)
+
+        for offset in range(1, len(encoded)):
+            chunks = _split(STREAM, [start + offset])
+            assert len(chunks[0]) and chunks[0][-1] >= 0x80 # The chunk really ends inside the character.
+            assert _decode(chunks) == EXPECTED_EVENTS
+
+def test_crlf_line_endings():
+    crlf_stream = STREAM.replace(b"\n", b"\r\n")
+    for cut in range(1, len(crlf_stream)):
+        assert _decode(_split(crlf_stream, [cut])) == EXPECTED_EVENTS, cut
+
+def test_flush_returns_unterminated_event():
+    decoder = responses.ServerSentEventDecoder()
+    assert decoder.feed(b'data: {"a": 1}\n\ndata: {"b"') == ['{"a": 1}']
+    assert decoder.feed(b': 2}') == []
+    assert decoder.flush() == ['{"b": 2}']
+
+def test_multiline_data_and_comments():
+    assert _decode([b": comment\ndata:first\ndata: second\nevent: ignored\n\n"]) == ["first\nsecond"]
+
+def test_iter_gpt_stream_stops_at_done():
+    async def _stream():
+        for chunk in _split(STREAM + b'data: {"never": "parsed"}\n\n', [7, 300, 301, 302, 900]):
+            yield chunk
+
+    async def _collect():
+        return [delta async for delta in responses._iter_gpt_stream(_stream())]
+
+    deltas = asyncio.run(_collect())
+    assert "".join(delta.response for delta in deltas) == REPLY
+    assert deltas[-1].finish_reason == "stop"
+
+def test_error_event():
+    error = json.dumps({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+    assert isinstance(responses._gpt_delta_factory(error), responses.OpenAIErrorResponse)
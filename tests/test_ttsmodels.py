@@ -0,0 +1,47 @@
+"""Tests for splitting streamed replies into sentences (`ttsmodels.DGSentenceSegmenter`)."""
+import random
+
+import pytest
+
+from sources import ttsmodels
+
+TEXTS = [
+    'He said "Stop!" Then he left.',
+    'Wow!!) This is a test.',
+    "Dr. Smith is here to see you. Please let him in!!! He has been waiting (for a while.) Okay?\n\nA new paragraph... with an ellipsis. [Really?] Yes.",
+    "No punctuation at all",
+    "Ends with whitespace after a sentence.   \n  And more text that is not finished",
+]
+
+def _segment(chunks: list[str], min_length: int) -> list[str]:
+    segmenter = ttsmodels.DGSentenceSegmenter(min_length)
+    sentences = [sentence for chunk in chunks for sentence in segmenter.feed(chunk)]
+    return sentences + ([remainder] if (remainder := segmenter.flush()) else [])
+
+def _random_chunks(text: str, rng: random.Random) -> list[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 12))))
+    return [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+
+@pytest.mark.parametrize("min_length", [0, 10, 24])
+@pytest.mark.parametrize("text", TEXTS)
+def test_chunking_does_not_change_sentences(text: str, min_length: int):
+    whole = _segment([text], min_length)
+    assert _segment(list(text), min_length) == whole
+    
+    rng = random.Random(text)
+    for _ in range(50):
+        assert _segment(_random_chunks(text, rng), min_length) == whole
+
+def test_closing_punctuation():
+    assert _segment(['He said "Stop!" Then he left.'], 0) == ['He said "Stop!"', 'Then he left.']
+    assert _segment(list('Wow!!) This is a test.'), 0) == ['Wow!!)', 'This is a test.']
+
+def test_short_sentences_are_joined():
+    assert _segment(list("Dr. Smith is here to see you. Hi."), 24) == ["Dr. Smith is here to see you.", "Hi."]
+
+def test_sentences_are_returned_as_they_complete():
+    segmenter = ttsmodels.DGSentenceSegmenter(0)
+    assert segmenter.feed("First one.") == []
+    assert segmenter.feed(" Second") == ["First one."]
+    assert segmenter.feed(" one.\n") == ["Second one."]
+    assert segmenter.flush() == ""